@@ -0,0 +1,134 @@
+# File:        aggregate_cube.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class AggregateCube providing precomputed aggregate stats grouped by UN Region/UN Sub-Region and year
+
+import pandas as pd
+
+
+class AggregateCube:
+    """
+    Class to precompute the aggregate stats of every numeric column of the dataset, grouped by
+    UN Sub-Region and year, and by UN Region and year. The stats are materialized once, with the
+    regions as rows and the column, stat and year as columns, so a query only selects columns.
+
+    The sub-region aggregates are calculated from the dataset, and the region aggregates are rolled
+    up from them where that is exact (sum, count, min and max, and so mean as sum / count). Median
+    cannot be rolled up, so it is calculated from the dataset for both groupings.
+
+    When only some years of the dataset change, update recalculates the stats of those years and
+    keeps the others.
+
+    Attributes:
+        version (int):                  version of the dataset the cube was built from
+        _columns (list):                numeric columns of the dataset the stats are calculated for
+        _cube (dict):                   aggregate stats keyed by the grouping
+
+    Methods:
+        _build(dataset):                        Method to calculate the aggregate stats of the rows of a dataset
+        update(dataset, years, version):        Method to recalculate the aggregate stats of some years only
+        lookup(region_type, column, stat):      Method to get the aggregate stats of a column
+    """
+
+    # stats available in the cube
+    stats = ["mean", "median", "min", "max", "count", "sum"]
+
+    def __init__(self, dataset, version=0):
+        self.version = version
+        self._columns = [column for column in dataset.columns
+                         if column != "Year" and pd.api.types.is_numeric_dtype(dataset[column])]
+        self._cube = self._build(dataset)
+
+
+
+    def _build(self, dataset):
+        """
+        Method to calculate the aggregate stats of the rows of a dataset
+
+            Parameters:
+                dataset (dataframe): rows of the dataset, indexed on UN Region, UN Sub-Region and Country
+
+            Returns:
+                dict: aggregate stats keyed by the grouping, with the regions as rows and
+                      (column, stat, year) as columns
+        """
+        columns = self._columns
+
+        # the finest grouping keeps the UN Region, so the region aggregates can be rolled up from it
+        by_sub_region = dataset.groupby(["UN Region", "UN Sub-Region", "Year"], observed=True)[columns]
+        sub_region = by_sub_region.aggregate(["sum", "count", "min", "max", "median"])
+
+        by_region = sub_region.groupby(level=["UN Region", "Year"], observed=True)
+        region = pd.concat([by_region.sum().loc[:, (slice(None), ["sum", "count"])],
+                            by_region.min().loc[:, (slice(None), "min")],
+                            by_region.max().loc[:, (slice(None), "max")],
+                            dataset.groupby(["UN Region", "Year"], observed=True)[columns].aggregate(["median"])], axis=1)
+
+        return {"UN Sub-Region": self._widen(sub_region.droplevel("UN Region")),
+                "UN Region": self._widen(region)}
+
+
+
+    def update(self, dataset, years, version):
+        """
+        Method to recalculate the aggregate stats of some years only, after the rows of those years
+        have changed in the dataset. The stats of the other years are kept as they are
+
+            Parameters:
+                dataset (dataframe): the whole updated dataset
+                years (list): years having new or changed rows
+                version (int): version of the updated dataset
+
+            Returns:
+                None
+        """
+        changed = self._build(dataset[dataset["Year"].isin(years)])
+
+        for (region_type, aggregates) in changed.items():
+            cube = self._cube[region_type]
+            kept = cube.loc[:, ~cube.columns.get_level_values("Year").isin(years)]
+            cube = pd.concat([kept, aggregates], axis=1).sort_index()
+
+            # back to the layout of a freshly built cube, with the years sorted under every stat
+            all_years = cube.columns.get_level_values("Year").unique().sort_values()
+            self._cube[region_type] = cube.reindex(columns=pd.MultiIndex.from_product(
+                [self._columns, self.stats, all_years], names=cube.columns.names))
+
+        self.version = version
+
+
+
+    def _widen(self, aggregates):
+        """
+        Method to add the mean to the aggregates, and move the years from the rows to the columns
+
+            Parameters:
+                aggregates (dataframe): stats with (region, year) as rows and (column, stat) as columns
+
+            Returns:
+                dataframe: stats with the regions as rows and (column, stat, year) as columns
+        """
+        means = aggregates.loc[:, (slice(None), "sum")].droplevel(1, axis=1) / \
+            aggregates.loc[:, (slice(None), "count")].droplevel(1, axis=1)
+        means.columns = pd.MultiIndex.from_product([means.columns, ["mean"]])
+
+        aggregates = pd.concat([aggregates, means], axis=1)
+        aggregates = aggregates.reindex(columns=pd.MultiIndex.from_product([self._columns, self.stats]))
+
+        return aggregates.unstack("Year")
+
+
+
+    def lookup(self, region_type, column, stat):
+        """
+        Method to get the aggregate stats of a column
+
+            Parameters:
+                region_type (str): either "UN Region" or "UN Sub-Region"
+                column (str): numeric column of the dataset
+                stat (str or list): one stat of the cube, or a list of them
+
+            Returns:
+                dataframe: stats with the regions as rows, and the years as columns for one stat or
+                           (stat, year) as columns for a list of stats
+        """
+        return self._cube[region_type][column][stat]
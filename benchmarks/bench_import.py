@@ -0,0 +1,65 @@
+# File:        bench_import.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Benchmark of the startup cost of the modules of the program, measured by python -X importtime
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def import_times(module):
+    """
+    Function to import a module in a fresh interpreter with -X importtime, and read the time taken
+    by every module it imported
+
+        Parameters:
+            module (str): name of the module to import
+
+        Returns:
+            dict: cumulative microseconds keyed by the name of every imported module
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", "import " + module],
+                            cwd=ROOT, capture_output=True, text=True, check=True)
+    times = {}
+
+    # the lines look like "import time:       self |  cumulative | name", with the name indented by depth
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        (_, cumulative, name) = line[len("import time:"):].split("|")
+        times[name.strip()] = int(cumulative)
+
+    return times
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Measure the import time of the modules of the program")
+    parser.add_argument("--modules", nargs="+", default=["data_analysis", "launch"],
+                        help="modules to import (default: %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5,
+                        help="number of fresh interpreters per module, the fastest is reported (default: %(default)s)")
+    parser.add_argument("--top", type=int, default=8,
+                        help="number of the slowest third-party packages to list (default: %(default)s)")
+    arguments = parser.parse_args()
+
+    # a first import compiles the bytecode, which is not part of the startup cost
+    for module in arguments.modules:
+        import_times(module)
+
+    for module in arguments.modules:
+        runs = [import_times(module) for _ in range(arguments.repeat)]
+        best = min(runs, key=lambda times: times[module])
+
+        # the modules of the program import the packages, so only the packages themselves are listed
+        packages = {name: cumulative for (name, cumulative) in best.items()
+                    if "." not in name and not os.path.exists(os.path.join(ROOT, name + ".py"))}
+
+        print("import {}: {:.1f} ms, {} modules, matplotlib {}loaded".format(
+            module, best[module] / 1000, len(best), "" if "matplotlib" in best else "not "))
+
+        for (name, cumulative) in sorted(packages.items(), key=lambda item: -item[1])[:arguments.top]:
+            print("  {:<24} {:>8.1f} ms".format(name, cumulative / 1000))
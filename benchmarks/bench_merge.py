@@ -0,0 +1,117 @@
+# File:        bench_merge.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Benchmark comparing the single-join merge of DataAnalysis against the previous chained merges
+
+import contextlib
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib                               # noqa: E402
+matplotlib.use("Agg")
+
+import data_analysis as da                      # noqa: E402
+from synthetic import scale_imported            # noqa: E402
+
+
+def chained_merges(unc_data, liv_data, pop_data, gdp_data):
+    """
+    Function reproducing the previous merge: three left merges, then the index is set and sorted,
+    and the null values dropped at the end
+
+        Parameters:
+            unc_data (dataframe): "UN Codes"
+            liv_data (dataframe): "UN Population Dataset 1"
+            pop_data (dataframe): "UN Population Dataset 2"
+            gdp_data (dataframe): "UN GDP Data"
+
+        Returns:
+            dataframe: the merged dataset
+    """
+    dataset = pd.merge(unc_data, liv_data, how="left", left_on="Country",
+                       right_on="Region/Country/Area").drop("Region/Country/Area", axis=1)
+
+    for source in (pop_data, gdp_data):
+        dataset = pd.merge(dataset, source, how="left", left_on=["Country", "Year"],
+                           right_on=["Region/Country/Area", "Year"]).drop("Region/Country/Area", axis=1)
+
+    dataset.set_index(["UN Region", "UN Sub-Region", "Country"], inplace=True)
+    dataset.sort_index(inplace=True)
+    dataset.dropna(inplace=True)
+
+    return dataset
+
+
+def single_join(analysis):
+    """
+    Function running DataAnalysis._merge_data on the imported dataframes of an object
+
+        Parameters:
+            analysis (DataAnalysis): object with the imported dataframes
+
+        Returns:
+            dataframe: the merged dataset
+    """
+    analysis._merge_data()
+
+    return analysis.__dict__.pop("_dataset")
+
+
+def measure(function, *args, repeat=5):
+    """
+    Function to measure the best wall time of a function, and the peak memory it allocates in a separate run
+
+        Parameters:
+            function (function): function to measure
+            args (tuple): arguments of the function
+            repeat (int): number of timed runs
+
+        Returns:
+            tuple: best seconds, peak bytes and the result of the function
+    """
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    function(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return (best, peak, result)
+
+
+if __name__ == '__main__':
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    default_location = os.path.join(ROOT, "UN Population Datasets")
+    custom_location = os.path.join(ROOT, "CustomUNData")
+
+    with tempfile.TemporaryDirectory() as work_dir, open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        analysis = da.DataAnalysis(default_location, custom_location, cache_dir=os.path.join(work_dir, ".cache"),
+                                   rebuild_cache=True, interactive=False)
+        analysis._import_data(default_location, custom_location)
+
+    frames = scale_imported(analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data, scale)
+    (analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data) = frames
+
+    (merge_time, merge_peak, merged) = measure(chained_merges, *frames)
+    (join_time, join_peak, joined) = measure(single_join, analysis)
+
+    # both plans must produce the same dataset
+    pd.testing.assert_frame_equal(merged, joined, check_dtype=False)
+
+    print("Synthetic sources at {}x: {:,} rows merged".format(scale, len(joined)))
+    print("{:<16} {:>10} {:>10}".format("", "ms", "peak MiB"))
+    print("{:<16} {:>10.1f} {:>10.1f}".format("chained merges", merge_time * 1000, merge_peak / 2 ** 20))
+    print("{:<16} {:>10.1f} {:>10.1f}".format("single join", join_time * 1000, join_peak / 2 ** 20))
+    print("speedup: {:.2f}x, memory: {:.2f}x less".format(merge_time / join_time, merge_peak / join_peak))
@@ -0,0 +1,227 @@
+# File:        bench_pipeline.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Benchmark of the wall time and peak memory of every stage of DataAnalysis, on the bundled and synthetic datasets
+
+import argparse
+import builtins
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import matplotlib                               # noqa: E402
+matplotlib.use("Agg")
+
+import data_analysis as da                      # noqa: E402
+import synthetic                                # noqa: E402
+
+
+# answers to the prompts of the interactive menu options
+group_by_answers = ["UN Sub-Region", "GDP per capita (US dollars)", "all"]
+pivot_plot_answers = ["Canada", "Chile", "India", "Kenya", "", "n"]
+
+
+@contextlib.contextmanager
+def stubbed_prompts(answers):
+    """
+    Function to answer the prompts of an interactive method from a list, and discard everything
+    it prints
+
+        Parameters:
+            answers (list): answers to the prompts, in order
+
+        Returns:
+            None
+    """
+    answers = iter(answers)
+    original_input = builtins.input
+    builtins.input = lambda prompt="": next(answers)
+
+    try:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            yield
+
+    finally:
+        builtins.input = original_input
+
+
+def measure(function, answers=(), trace_memory=False):
+    """
+    Function to measure either the wall time or the peak memory allocated by a function. Tracing
+    the allocations slows down pure Python code a lot, so the two are never measured together
+
+        Parameters:
+            function (function): function to measure, called without arguments
+            answers (list): answers to the prompts of the function
+            trace_memory (bool): if True measure the peak memory, else the wall time
+
+        Returns:
+            dict: either the seconds taken or the peak bytes allocated
+    """
+    if trace_memory:
+        tracemalloc.start()
+
+    start = time.perf_counter()
+
+    with stubbed_prompts(answers):
+        function()
+
+    seconds = time.perf_counter() - start
+
+    if not trace_memory:
+        return {"seconds": seconds}
+
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    return {"peak_bytes": peak}
+
+
+def run_scale(scale, work_dir, with_import, trace_memory):
+    """
+    Function to run every stage of the pipeline on one scale of the dataset
+
+        Parameters:
+            scale (int): 1 for the bundled dataset, or one of the synthetic scales
+            work_dir (str): temporary directory for the scaled files and the exports
+            with_import (bool): whether to also import scaled source files, instead of scaling the imported dataframes
+            trace_memory (bool): if True measure the peak memory of every stage, else the wall time
+
+        Returns:
+            dict: measurements keyed by stage
+    """
+    results = {}
+
+    default_location = os.path.join(ROOT, "UN Population Datasets")
+    custom_location = os.path.join(ROOT, "CustomUNData")
+
+    if scale != 1 and with_import:
+        source_dir = os.path.join(work_dir, "sources " + str(scale))
+
+        # the files are written by the first of the two passes only
+        if os.path.isdir(source_dir) or synthetic.write_scaled_sources(ROOT, source_dir, scale):
+            default_location = custom_location = source_dir
+
+        else:
+            if not trace_memory:
+                print("  scale " + str(scale) + "x does not fit into Excel, scaling the imported dataframes instead",
+                      file=sys.stderr)
+
+            with_import = False
+
+    analysis = da.DataAnalysis(default_location, custom_location,
+                               cache_dir=os.path.join(work_dir, ".cache"), rebuild_cache=True, interactive=False)
+
+    results["_import_data"] = measure(
+        lambda: analysis._import_data(default_location, custom_location), trace_memory=trace_memory)
+
+    if scale != 1 and not with_import:
+        (analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data) = synthetic.scale_imported(
+            analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data, scale)
+
+        # the import above ran on the bundled files, so it says nothing about this scale
+        del results["_import_data"]
+
+    results["_merge_data"] = measure(analysis._merge_data, trace_memory=trace_memory)
+    results["_additional_statistics"] = measure(analysis._additional_statistics, trace_memory=trace_memory)
+    results["group_by_stats"] = measure(lambda: analysis.group_by_stats(4), group_by_answers, trace_memory)
+    results["pivot_plot"] = measure(lambda: analysis.pivot_plot(6), pivot_plot_answers, trace_memory)
+    results["export_dataset"] = measure(
+        lambda: analysis.export_dataset(filename=os.path.join(work_dir, "Export UN Data.xlsx")), trace_memory=trace_memory)
+
+    results["rows"] = len(analysis._dataset)
+
+    return results
+
+
+def print_results(results, baseline, threshold):
+    """
+    Function to print the measurements, compared with the baseline if there is one
+
+        Parameters:
+            results (dict): measurements keyed by scale and stage
+            baseline (dict): measurements of the baseline keyed by scale and stage, or None
+            threshold (float): ratio of the wall time to the baseline above which a stage has regressed
+
+        Returns:
+            bool: True if any stage has regressed
+    """
+    regressed = False
+
+    print("{:>6} {:>9}  {:<24} {:>10} {:>11} {:>10}".format(
+        "scale", "rows", "stage", "seconds", "peak MiB", "vs base"))
+
+    for scale, stages in results.items():
+        for stage, measured in stages.items():
+            if stage == "rows":
+                continue
+
+            comparison = ""
+            base = (baseline or {}).get(scale, {}).get(stage)
+
+            if base is not None:
+                ratio = measured["seconds"] / base["seconds"]
+                comparison = "{:.2f}x".format(ratio)
+
+                if ratio > threshold:
+                    comparison += " SLOWER"
+                    regressed = True
+
+            print("{:>6} {:>9,}  {:<24} {:>10.3f} {:>11.1f} {:>10}".format(
+                scale + "x", stages["rows"], stage, measured["seconds"], measured["peak_bytes"] / 2 ** 20, comparison))
+
+    return regressed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark every stage of the DataAnalysis pipeline")
+    parser.add_argument("--scales", type=int, nargs="+", choices=sorted(synthetic.scales), default=[1, 10, 100],
+                        help="1 for the bundled dataset, and the synthetic scales (default: 1 10 100)")
+    parser.add_argument("--with-import", action="store_true",
+                        help="write the scaled source files and benchmark importing them too")
+    parser.add_argument("--baseline", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json"),
+                        help="file holding the baseline measurements (default: %(default)s)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store the measurements as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="ratio of the wall time to the baseline reported as a regression (default: %(default)s)")
+    arguments = parser.parse_args()
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        # pivot_plot saves its plot in the working directory
+        os.chdir(work_dir)
+
+        for scale in arguments.scales:
+            print("Running scale " + str(scale) + "x", file=sys.stderr)
+            results[str(scale)] = run_scale(scale, work_dir, arguments.with_import, False)
+
+            # second pass tracing the allocations
+            for (stage, measured) in run_scale(scale, work_dir, arguments.with_import, True).items():
+                if stage != "rows":
+                    results[str(scale)][stage].update(measured)
+
+        os.chdir(ROOT)
+
+    baseline = None
+
+    if os.path.exists(arguments.baseline) and not arguments.save_baseline:
+        with open(arguments.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    regressed = print_results(results, baseline, arguments.threshold)
+
+    if arguments.save_baseline:
+        with open(arguments.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+        print("\nBaseline saved as \'" + arguments.baseline + "\'")
+
+    sys.exit(1 if regressed else 0)
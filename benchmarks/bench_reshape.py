@@ -0,0 +1,76 @@
+# File:        bench_reshape.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Benchmark comparing the single-pass series_to_columns reshape against per-Series filter-and-merge
+
+import os
+import sys
+import time
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from data_analysis import series_to_columns     # noqa: E402
+from synthetic import scale_frame               # noqa: E402
+
+
+KEYS = ["Region/Country/Area", "Year"]
+
+SERIES = ["Population annual rate of increase (percent)",
+          "Total fertility rate (children per women)",
+          "Life expectancy at birth for males (years)",
+          "Life expectancy at birth for females (years)",
+          "Life expectancy at birth for both sexes (years)"]
+
+
+def filter_and_merge(raw, series):
+    """
+    Function reproducing the previous import: one filter per Series followed by chained inner merges
+
+        Parameters:
+            raw (dataframe): long-format sheet
+            series (list): Series to turn into columns
+
+        Returns:
+            dataframe: wide layout
+    """
+    wide = None
+
+    for filter_series in series:
+        single = raw[raw["Series"] == filter_series].drop(
+            "Series", axis=1).rename(columns={"Value": filter_series})
+        wide = single if wide is None else pd.merge(wide, single, how="inner", on=KEYS)
+
+    return wide
+
+
+def best_of(function, repeat, *args):
+    best = float("inf")
+
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+
+    return best, result
+
+
+if __name__ == '__main__':
+    factor = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+
+    raw = pd.read_excel(os.path.join(ROOT, "UN Population Datasets",
+                                     "UN Population Dataset 1.xlsx"), usecols="B:E")
+    sheet = scale_frame(raw, "Region/Country/Area", factor)
+
+    merge_time, merged = best_of(filter_and_merge, 5, sheet, SERIES)
+    pivot_time, pivoted = best_of(series_to_columns, 5, sheet, SERIES)
+
+    # both approaches must produce the same table, apart from the row order
+    pd.testing.assert_frame_equal(merged.sort_values(KEYS).reset_index(drop=True),
+                                  pivoted.reset_index(drop=True))
+
+    print("Synthetic sheet: {:,} rows ({}x bundled), {:,} rows after reshape".format(
+        len(sheet), factor, len(pivoted)))
+    print("filter and merge:  {:8.1f} ms".format(merge_time * 1000))
+    print("series_to_columns: {:8.1f} ms".format(pivot_time * 1000))
+    print("speedup:           {:8.2f}x".format(merge_time / pivot_time))
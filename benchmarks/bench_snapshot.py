@@ -0,0 +1,145 @@
+# File:        bench_snapshot.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Benchmark of the memory of worker processes reading the whole dataset, unpickled versus attached to the snapshot
+
+import contextlib
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import data_analysis as da                      # noqa: E402
+from dataset_snapshot import attach_snapshot    # noqa: E402
+from synthetic import scale_imported            # noqa: E402
+
+
+def memory_usage():
+    """
+    Function to read the memory of this process from /proc, so it only runs on Linux
+
+        Parameters:
+            none
+
+        Returns:
+            dict: resident, proportional (shared pages divided among the processes sharing them) and
+                  anonymous memory, in KiB
+    """
+    usage = {}
+
+    with open("/proc/self/smaps_rollup", "r") as f:
+        for line in f:
+            fields = line.split()
+
+            if fields[0] in ("Rss:", "Pss:", "Anonymous:"):
+                usage[fields[0][:-1]] = int(fields[1])
+
+    return usage
+
+
+def worker(mode, path, barrier, results):
+    """
+    Function run by every worker process: it gets the whole dataset, reads every value of it, and
+    measures its memory once all the workers hold the dataset
+
+        Parameters:
+            mode (str): "pickle" to unpickle a copy of the dataset, "snapshot" to attach the snapshot
+            path (str): the pickle or the directory of the snapshot
+            barrier (Barrier): barrier of all the workers
+            results (Queue): queue receiving the seconds taken to get the dataset and the memory
+
+        Returns:
+            None
+    """
+    import pandas as pd
+
+    before = memory_usage()
+    start = time.perf_counter()
+    dataset = pd.read_pickle(path) if mode == "pickle" else attach_snapshot(path)
+    seconds = time.perf_counter() - start
+
+    # a chart or query reads the values, which loads the pages of the snapshot
+    dataset.sum().sum()
+
+    barrier.wait()
+    after = memory_usage()
+    barrier.wait()
+
+    results.put((seconds, {name: after[name] - before[name] for name in after}))
+
+
+def run_workers(mode, path, workers):
+    """
+    Function to run worker processes all holding the dataset at the same time
+
+        Parameters:
+            mode (str): "pickle" or "snapshot"
+            path (str): the pickle or the directory of the snapshot
+            workers (int): number of worker processes
+
+        Returns:
+            tuple: the slowest seconds taken to get the dataset, and the mean memory added by a worker in KiB
+    """
+    # spawned like on Windows and macOS, so the workers do not start with the pages of this process
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Queue()
+
+    processes = [context.Process(target=worker, args=(mode, path, barrier, results)) for _ in range(workers)]
+
+    for process in processes:
+        process.start()
+
+    measures = [results.get() for _ in processes]
+
+    for process in processes:
+        process.join()
+
+    usage = {name: sum(measure[1][name] for measure in measures) / workers for name in measures[0][1]}
+
+    return (max(measure[0] for measure in measures), usage)
+
+
+if __name__ == '__main__':
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    counts = [int(count) for count in sys.argv[2:]] or [1, 2, 4]
+
+    default_location = os.path.join(ROOT, "UN Population Datasets")
+    custom_location = os.path.join(ROOT, "CustomUNData")
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+            analysis = da.DataAnalysis(default_location, custom_location, cache_dir=os.path.join(work_dir, ".cache"),
+                                       rebuild_cache=True, interactive=False)
+            analysis._import_data(default_location, custom_location)
+
+            if scale != 1:
+                (analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data) = scale_imported(
+                    analysis._unc_data, analysis._liv_data, analysis._pop_data, analysis._gdp_data, scale)
+
+            analysis._merge_data()
+            analysis._optimize_dtypes()
+            analysis._additional_statistics()
+
+        pickle_path = os.path.join(work_dir, "_dataset.pkl")
+        analysis._dataset.to_pickle(pickle_path)
+        snapshot = analysis.publish_snapshot()
+
+        print("Synthetic dataset at {}x: {:,} rows, {:.1f} MiB".format(
+            scale, len(analysis._dataset), analysis._dataset.memory_usage(deep=True).sum() / 2 ** 20))
+        print("{:>8} {:<10} {:>10} {:>10} {:>10} {:>14}".format(
+            "workers", "", "load ms", "RSS MiB", "PSS MiB", "private MiB"))
+
+        for workers in counts:
+            for mode in ("pickle", "snapshot"):
+                (seconds, usage) = run_workers(mode, pickle_path if mode == "pickle" else snapshot, workers)
+
+                # memory added by every worker, PSS counting a page shared by n workers as 1/n
+                print("{:>8} {:<10} {:>10.1f} {:>10.1f} {:>10.1f} {:>14.1f}".format(
+                    workers, mode, seconds * 1000, usage["Rss"] / 1024, usage["Pss"] / 1024,
+                    usage["Anonymous"] / 1024))
+
+        analysis._remove_snapshot()
@@ -0,0 +1,362 @@
+# File:        synthetic.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the functions scaling the bundled UN data, or generating UN-shaped data, into larger synthetic datasets for benchmarks
+
+import argparse
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from indicators import default_registry         # noqa: E402
+from indicators import indicator_sources        # noqa: E402
+from indicators import registered_series        # noqa: E402
+
+
+# (countries factor, years factor) of every supported scale
+scales = {1: (1, 1), 10: (5, 2), 100: (25, 4), 1000: (125, 8)}
+
+# years added to every copy of the years, large enough for the copies to never overlap
+year_offset = 100
+
+# Excel cannot hold more rows than this in one sheet
+excel_max_rows = 1048575
+
+# UN Regions of the generated countries, the UN Sub-Regions are shared out among them in turn
+un_regions = ["Africa", "Americas", "Asia", "Europe", "Oceania"]
+
+# range of the generated values of the Series found in the UN files, other Series range from 0 to 100
+series_ranges = {"Population annual rate of increase (percent)": (-2.0, 4.0),
+                 "Total fertility rate (children per women)": (1.0, 7.0),
+                 "Life expectancy at birth for males (years)": (45.0, 82.0),
+                 "Life expectancy at birth for females (years)": (48.0, 87.0),
+                 "Life expectancy at birth for both sexes (years)": (46.0, 85.0),
+                 "Urban population (percent)": (10.0, 100.0),
+                 "Capital city population (thousands)": (50.0, 20000.0),
+                 "GDP per capita (US dollars)": (300.0, 100000.0),
+                 "GDP in current prices (millions of US dollars)": (100.0, 20000000.0),
+                 "GDP real rates of growth (percent)": (-10.0, 12.0)}
+
+# Series of the UN files that are not imported, generated as well so the import has rows to filter out
+unimported_series = {"UN Population Dataset 1.xlsx": [],
+                     "UN Population Dataset 2.xlsx": ["Capital city population (thousands)"],
+                     "UNGDPData.csv": ["GDP in current prices (millions of US dollars)",
+                                       "GDP real rates of growth (percent)"]}
+
+# name and numeric code of the rows of the world as a whole, which have no UN Region
+world = ("Total, all countries or areas", 1)
+
+# text of the "Source" column of the generated GDP data
+generated_source = "Synthetic data generated by benchmarks/synthetic.py"
+
+# formats of the generated files, with the extension of the population sheets and of the GDP data
+generated_formats = {"xlsx": (".xlsx", ".csv"), "csv": (".csv", ".csv"), "parquet": (".parquet", ".parquet")}
+
+
+def scale_frame(frame, country_column, countries_factor, years_factor=1):
+    """
+    Function to scale a dataframe by repeating every country under new names, and every year
+    shifted into new years. Frames without a "Year" column are only scaled on the countries
+
+        Parameters:
+            frame (dataframe): dataframe having one row per country, or per country and year
+            country_column (str): column holding the country names
+            countries_factor (int): number of copies of every country
+            years_factor (int): number of copies of every year
+
+        Returns:
+            dataframe: the scaled dataframe
+    """
+    copies = []
+
+    for i in range(countries_factor):
+        for j in range(years_factor if "Year" in frame.columns else 1):
+            copy = frame.copy()
+
+            if i > 0:
+                copy[country_column] = copy[country_column] + " #" + str(i)
+
+            if j > 0:
+                copy["Year"] = copy["Year"] + j * year_offset
+
+            copies.append(copy)
+
+    return pd.concat(copies, ignore_index=True)
+
+
+def scale_imported(unc_data, liv_data, pop_data, gdp_data, scale):
+    """
+    Function to scale the dataframes imported by DataAnalysis._import_data
+
+        Parameters:
+            unc_data (dataframe): UN Codes dataframe
+            liv_data (dataframe): UN Life Expectancy and Fertility dataframe
+            pop_data (dataframe): UN Urban Population dataframe
+            gdp_data (dataframe): UN Gross Domestic Product dataframe
+            scale (int): one of the supported scales
+
+        Returns:
+            tuple: the four scaled dataframes, in the same order
+    """
+    (countries_factor, years_factor) = scales[scale]
+
+    return (scale_frame(unc_data, "Country", countries_factor),
+            scale_frame(liv_data, "Region/Country/Area", countries_factor, years_factor),
+            scale_frame(pop_data, "Region/Country/Area", countries_factor, years_factor),
+            scale_frame(gdp_data, "Region/Country/Area", countries_factor, years_factor))
+
+
+def write_scaled_sources(root, directory, scale):
+    """
+    Function to write the bundled source files scaled up into a directory, with the same file names
+    and column layout, so DataAnalysis can import them from there
+
+        Parameters:
+            root (str): path of the project directory
+            directory (str): directory to write the files into
+            scale (int): one of the supported scales
+
+        Returns:
+            bool: False if the scaled sheets do not fit into Excel, so nothing was written
+    """
+    (countries_factor, years_factor) = scales[scale]
+
+    default_location = os.path.join(root, "UN Population Datasets")
+
+    unc_data = pd.read_excel(os.path.join(default_location, "UN Codes.xlsx"))
+    liv_data = pd.read_excel(os.path.join(default_location, "UN Population Dataset 1.xlsx"))
+    pop_data = pd.read_excel(os.path.join(default_location, "UN Population Dataset 2.xlsx"))
+    gdp_data = pd.read_csv(os.path.join(root, "CustomUNData", "UNGDPData.csv"))
+
+    if max(len(liv_data), len(pop_data)) * countries_factor * years_factor > excel_max_rows:
+        return False
+
+    os.makedirs(directory, exist_ok=True)
+
+    scale_frame(unc_data, "Country", countries_factor).to_excel(
+        os.path.join(directory, "UN Codes.xlsx"), index=False)
+    scale_frame(liv_data, "Region/Country/Area", countries_factor, years_factor).to_excel(
+        os.path.join(directory, "UN Population Dataset 1.xlsx"), index=False)
+    scale_frame(pop_data, "Region/Country/Area", countries_factor, years_factor).to_excel(
+        os.path.join(directory, "UN Population Dataset 2.xlsx"), index=False)
+    scale_frame(gdp_data, "Region/Country/Area", countries_factor, years_factor).to_csv(
+        os.path.join(directory, "UNGDPData.csv"), index=False)
+
+    return True
+
+
+def generate_countries(countries, sub_regions, rng, fixed=()):
+    """
+    Function to generate the countries with their UN Region and UN Sub-Region, laid out like
+    "UN Codes.xlsx". Every UN Sub-Region has at least one country while there are enough of them
+
+        Parameters:
+            countries (int): number of countries
+            sub_regions (int): number of UN Sub-Regions
+            rng (Generator): random numbers of the generator
+            fixed (tuple): names of countries that must be generated, eg. the reference countries
+
+        Returns:
+            dataframe: "Country", "UN Region" and "UN Sub-Region", sorted on the country
+    """
+    fixed = sorted(set(fixed))
+
+    if countries < len(fixed) or countries < 1 or sub_regions < 1:
+        raise ValueError("Please generate at least one UN Sub-Region and " + str(max(len(fixed), 1)) + " country(ies)" +
+                         (", for " + ", ".join(fixed) if fixed else ""))
+
+    names = fixed + ["Country {:05d}".format(number) for number in range(1, countries - len(fixed) + 1)]
+    sub_region_names = ["{} {:03d}".format(un_regions[number % len(un_regions)], number // len(un_regions) + 1)
+                        for number in range(sub_regions)]
+
+    first = np.arange(min(countries, sub_regions))
+    assigned = rng.permutation(np.r_[first, rng.integers(0, sub_regions, countries - len(first))])
+
+    return pd.DataFrame({"Country": names,
+                         "UN Region": [un_regions[number % len(un_regions)] for number in assigned],
+                         "UN Sub-Region": [sub_region_names[number] for number in assigned]}
+                        ).sort_values("Country", ignore_index=True)
+
+
+def generate_series(names, codes, series, years, rng, missing=0.0, complete=()):
+    """
+    Function to generate the values of Series for countries over the years, in the long layout of
+    the UN SYB files, one row per country, year and Series. Every Series of a country starts at a
+    random value in its range, and then takes a random walk over the years within the range
+
+        Parameters:
+            names (list): names of the countries
+            codes (array): numeric code of every country
+            series (list): names of the Series
+            years (array): years of the rows
+            rng (Generator): random numbers of the generator
+            missing (float): share of the rows left out at random
+            complete (tuple): names of countries having all their rows, eg. the reference countries
+
+        Returns:
+            dataframe: "Code", "Region/Country/Area", "Year", "Series" and "Value", sorted on the
+                       country, the year and the Series, with categorical names
+    """
+    values = np.empty((len(names), len(years), len(series)))
+
+    for (number, name) in enumerate(series):
+        (low, high) = series_ranges.get(name, (0.0, 100.0))
+
+        start = rng.uniform(low, high, (len(names), 1))
+        steps = rng.normal(0.0, (high - low) / 100, (len(names), len(years)))
+        values[:, :, number] = np.clip(start + np.cumsum(steps, axis=1), low, high).round(4)
+
+    # the rows are the cells of the array in order, so the positions give the country, year and Series
+    kept = rng.random(values.size) >= missing
+    kept[np.repeat(np.isin(names, complete), len(years) * len(series))] = True
+    rows = np.flatnonzero(kept)
+
+    (country_rows, year_rows, series_rows) = np.unravel_index(rows, values.shape)
+
+    return pd.DataFrame({"Code": np.asarray(codes, dtype="int32")[country_rows],
+                         "Region/Country/Area": pd.Categorical.from_codes(country_rows, names),
+                         "Year": np.asarray(years, dtype="int16")[year_rows],
+                         "Series": pd.Categorical.from_codes(series_rows, series),
+                         "Value": values.ravel()[rows]})
+
+
+def generate_sources(countries=200, sub_regions=20, years=20, first_year=2000, extra_series=0, missing=0.0, seed=0,
+                     registry=None):
+    """
+    Function to generate UN-shaped source files of any size, holding the Series of a registry with
+    the columns of the UN files, so DataAnalysis imports them like the bundled ones. The same
+    arguments always generate the same data, and the reference countries of the registry, eg. the
+    United States of America, are always among the countries and have all their rows
+
+        Parameters:
+            countries (int): number of countries
+            sub_regions (int): number of UN Sub-Regions
+            years (int): number of years
+            first_year (int): first year of the data
+            extra_series (int): number of Series added to every file besides those of the UN files
+            missing (float): share of the rows of the other countries left out at random
+            seed (int): seed of the random numbers
+            registry (dict): indicators, references and derived columns, the default registry if None
+
+        Returns:
+            dict: dataframes laid out like the source files, keyed by the name of the file
+    """
+    registry = default_registry if registry is None else registry
+    references = tuple(reference["country"] for reference in registry["references"].values())
+
+    # one stream of random numbers per file, so one file does not change when another one grows
+    unc_data = generate_countries(countries, sub_regions, np.random.default_rng([seed, 0]), references)
+
+    names = [world[0]] + list(unc_data["Country"])
+    codes = np.r_[world[1], np.arange(len(unc_data)) + 4]
+    year_range = np.arange(first_year, first_year + years)
+
+    sources = {"UN Codes.xlsx": unc_data}
+
+    for (number, source) in enumerate(indicator_sources.values(), start=1):
+        series = (registered_series(registry, source) + unimported_series.get(source, []) +
+                  ["Synthetic indicator {}-{} (index)".format(number, extra) for extra in range(1, extra_series + 1)])
+
+        raw = generate_series(names, codes, series, year_range, np.random.default_rng([seed, number]), missing,
+                              references + (world[0],))
+
+        if source == "UN Population Dataset 2.xlsx":
+            # the numeric code has no header in this file, and the capital city is named on the rows of its population
+            capitals = np.where((raw["Series"] == "Capital city population (thousands)") & (raw["Code"] != world[1]),
+                                raw["Region/Country/Area"].cat.codes, -1)
+
+            raw.insert(4, "Capital City", pd.Categorical.from_codes(capitals, [name + " City" for name in names]))
+            raw = raw.rename(columns={"Code": ""})
+
+        elif source == "UNGDPData.csv":
+            raw["Footnotes"] = np.nan
+            raw["Source"] = pd.Categorical.from_codes(np.zeros(len(raw), dtype="int8"), [generated_source])
+
+        sources[source] = raw
+
+    return sources
+
+
+def write_sources(sources, default_location, custom_location=None, file_format="xlsx"):
+    """
+    Function to write generated source files where DataAnalysis imports them from. In the "xlsx"
+    format the population sheets are Excel files and the GDP data a CSV file, like the bundled
+    ones. In the other formats all the files are CSV or Parquet exports, with the same names
+
+        Parameters:
+            sources (dict): dataframes keyed by the name of the file, as generated by generate_sources
+            default_location (str): directory of the population sheets
+            custom_location (str): directory of the GDP data, the default_location if None
+            file_format (str): one of "xlsx", "csv" or "parquet"
+
+        Returns:
+            list: paths of the written files
+    """
+    custom_location = default_location if custom_location is None else custom_location
+    (sheet_extension, gdp_extension) = generated_formats[file_format]
+
+    if file_format == "xlsx":
+        too_long = [name for (name, frame) in sources.items() if name.endswith(".xlsx") and len(frame) > excel_max_rows]
+
+        if too_long:
+            raise ValueError(", ".join(too_long) + " would not fit into Excel. Please write CSV or Parquet files instead")
+
+    paths = []
+
+    for (name, frame) in sources.items():
+        if name == "UNGDPData.csv":
+            path = os.path.join(custom_location, os.path.splitext(name)[0] + gdp_extension)
+
+        else:
+            path = os.path.join(default_location, os.path.splitext(name)[0] + sheet_extension)
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        if path.endswith(".xlsx"):
+            frame.to_excel(path, index=False)
+
+        elif path.endswith(".csv"):
+            frame.to_csv(path, index=False)
+
+        else:
+            try:
+                frame.to_parquet(path, index=False)
+
+            except ImportError:
+                raise ImportError("Writing Parquet files needs the pyarrow or fastparquet package")
+
+        paths.append(path)
+
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate UN-shaped source files of any size for load tests")
+    parser.add_argument("directory",
+                        help="directory to write the files into, to be used as both locations of DataAnalysis")
+    parser.add_argument("--countries", type=int, default=200,
+                        help="number of countries (default: %(default)s)")
+    parser.add_argument("--sub-regions", type=int, default=20,
+                        help="number of UN Sub-Regions (default: %(default)s)")
+    parser.add_argument("--years", type=int, default=20,
+                        help="number of years (default: %(default)s)")
+    parser.add_argument("--first-year", type=int, default=2000,
+                        help="first year of the data (default: %(default)s)")
+    parser.add_argument("--extra-series", type=int, default=0,
+                        help="number of Series added to every file besides the Series of the UN files (default: %(default)s)")
+    parser.add_argument("--missing", type=float, default=0.0,
+                        help="share of the rows left out at random (default: %(default)s)")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="seed of the random numbers, the same seed gives the same files (default: %(default)s)")
+    parser.add_argument("--format", choices=list(generated_formats), default="xlsx",
+                        help="format of the files, the GDP data is CSV with xlsx (default: %(default)s)")
+    arguments = parser.parse_args()
+
+    generated = generate_sources(arguments.countries, arguments.sub_regions, arguments.years, arguments.first_year,
+                                 arguments.extra_series, arguments.missing, arguments.seed)
+
+    for path in write_sources(generated, arguments.directory, file_format=arguments.format):
+        print("{} ({:,} bytes)".format(path, os.path.getsize(path)))
@@ -0,0 +1,216 @@
+# File:        comparison_figure.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class ComparisonFigure rendering the comparison of countries into images, reusing one figure
+
+import math
+import time
+
+
+# figure reused by render_comparison for all the charts rendered in this process
+_process_figure = None
+
+
+def pivot_countries(subset):
+    """
+    Function to build the pivot table comparing the countries of a slice of the dataset
+
+        Parameters:
+            subset (dataframe): rows of the dataset for the countries, with "Year" and the data columns
+
+        Returns:
+            dataframe: pivot table with the years as rows, and the data column and country as columns
+    """
+    return subset.pivot_table(index="Year", columns="Country", observed=True)
+
+
+def render_comparison(subset, columns, filename):
+    """
+    Function to pivot a slice of the dataset and save the comparison of its countries as an image.
+    It is the job run by DataAnalysis.plot_sub_regions, and every process reuses its own figure
+
+        Parameters:
+            subset (dataframe): rows of the dataset for the countries, with "Year" and the data columns
+            columns (list): data columns to plot, one subplot each
+            filename (str): path of the image to save
+
+        Returns:
+            float: seconds taken to pivot and render the chart
+    """
+    global _process_figure
+
+    start = time.perf_counter()
+
+    if _process_figure is None:
+        _process_figure = ComparisonFigure()
+
+    _process_figure.render(pivot_countries(subset), columns, filename)
+
+    return time.perf_counter() - start
+
+
+def render_snapshot_rows(snapshot, start, stop, columns, filename):
+    """
+    Function to render the comparison of a slice of rows of a snapshot of the dataset published by
+    DataAnalysis.publish_snapshot. The worker process attaches the snapshot once, and only reads
+    the rows of the slice from it, so the dataset is never copied into the workers
+
+        Parameters:
+            snapshot (str): directory of the snapshot
+            start (int): position of the first row of the slice
+            stop (int): position after the last row of the slice
+            columns (list): data columns to plot, one subplot each
+            filename (str): path of the image to save
+
+        Returns:
+            float: seconds taken to pivot and render the chart
+    """
+    # only the worker processes need the snapshot
+    from dataset_snapshot import attach_snapshot
+
+    return render_comparison(attach_snapshot(snapshot).iloc[start:stop][["Year"] + columns], columns, filename)
+
+
+def axis_label(column):
+    """
+    Function to make the label of the y axis from the unit in the name of a column,
+    eg. "Urban population (percent)" gives "Percentage"
+
+        Parameters:
+            column (str): name of the data column
+
+        Returns:
+            str: label of the y axis
+    """
+    if not column.endswith(")") or "(" not in column:
+        return column
+
+    unit = column[column.rindex("(") + 1:-1]
+
+    if unit == "percent":
+        return "Percentage"
+
+    return unit[:1].upper() + unit[1:]
+
+
+class ComparisonFigure:
+    """
+    Class to render the pivot tables comparing countries into images, with one subplot per data
+    column and one line per country. The figure is drawn by the non-interactive Agg canvas, without
+    pyplot, and is kept between renders: the subplots are only created again when the data columns
+    change, and the lines are updated in place, so rendering many comparisons costs little more
+    than drawing them.
+
+    Attributes:
+        _figure (Figure):               matplotlib figure, drawn by the Agg canvas
+        _columns (tuple):               data columns the subplots were created for
+        _axes (list):                   one subplot per data column
+        _lines (list):                  lines of every subplot, one per country
+
+    Methods:
+        render(pivot_data, columns, filename):      Method to draw a pivot table and save it as an image
+        _layout(columns):                           Method to create the subplots for the data columns
+    """
+
+    # size of one subplot, in inches
+    subplot_size = (10, 5)
+
+    # line styles, one for every ten countries
+    line_styles = ["-", "--", ":", "-."]
+
+    # largest number of countries in one column of a legend
+    legend_rows = 12
+
+    def __init__(self):
+        # matplotlib takes longer to import than the rest of the program, so it is only loaded with the first figure
+        from matplotlib.figure import Figure
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+        self._figure = Figure()
+        FigureCanvasAgg(self._figure)
+        self._columns = None
+        self._axes = []
+        self._lines = []
+
+
+
+    def _layout(self, columns):
+        """
+        Method to create the subplots for the data columns, two per row, unless they are already there
+
+            Parameters:
+                columns (tuple): data columns to plot
+
+            Returns:
+                None
+        """
+        if columns == self._columns:
+            return
+
+        ncols = min(len(columns), 2)
+        nrows = math.ceil(len(columns) / ncols)
+
+        self._figure.clear()
+        self._figure.set_size_inches(self.subplot_size[0] * ncols, self.subplot_size[1] * nrows)
+        self._figure.suptitle("Comparison of countries on various statistical data")
+
+        axes = self._figure.subplots(nrows, ncols, squeeze=False).flatten()
+
+        # an odd number of data columns leaves the last subplot empty
+        for unused in axes[len(columns):]:
+            unused.remove()
+
+        for (ax, column) in zip(axes, columns):
+            ax.set_title(column)
+            ax.set(xlabel="Year", ylabel=axis_label(column))
+
+        self._columns = columns
+        self._axes = list(axes[:len(columns)])
+        self._lines = [[] for _ in columns]
+
+
+
+    def render(self, pivot_data, columns, filename):
+        """
+        Method to draw a pivot table built by DataAnalysis.compare_countries and save it as an image
+
+            Parameters:
+                pivot_data (dataframe): pivot table with the years as rows, and the data column and country as columns
+                columns (list): data columns of the pivot table to plot, one subplot each
+                filename (str): path of the image to save
+
+            Returns:
+                Figure: matplotlib figure of the plot
+        """
+        self._layout(tuple(columns))
+
+        # legends follow the column order of the pivot table, which is sorted on the country
+        countries = list(pivot_data.columns.get_level_values("Country").unique())
+        years = pivot_data.index.to_numpy()
+
+        for (ax, lines, column) in zip(self._axes, self._lines, self._columns):
+            values = pivot_data[column].reindex(columns=countries)
+
+            # lines are reused for the countries, and only added or removed when their number changes
+            while len(lines) < len(countries):
+                lines.extend(ax.plot([], []))
+
+            while len(lines) > len(countries):
+                lines.pop().remove()
+
+            # colors by position, as the color cycle of the subplot keeps moving when lines are added again,
+            # and another line style for every ten countries, as there are only ten colors
+            for (i, (line, country)) in enumerate(zip(lines, countries)):
+                line.set_data(years, values[country].to_numpy())
+                line.set_label(country)
+                line.set_color("C" + str(i % 10))
+                line.set_linestyle(self.line_styles[i // 10 % len(self.line_styles)])
+
+            ax.relim()
+            ax.autoscale_view()
+            # long legends are split into columns of at most legend_rows countries
+            ax.legend(loc="upper right", ncol=math.ceil(len(countries) / self.legend_rows),
+                      fontsize="x-small" if len(countries) > self.legend_rows else None)
+
+        self._figure.savefig(filename, dpi=100)
+
+        return self._figure
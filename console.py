@@ -0,0 +1,15 @@
+# File:        console.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Helper functions for the console of the interactive menu
+
+
+def clear_console():
+    """Function to clear the console
+
+        Parameters:
+            none
+
+        Returns:
+            None
+    """
+    print("\033\143")
@@ -0,0 +1,139 @@
+# File:        country_index.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class CountryIndex providing lookup of countries by name, alias or code, and suggestions for mistyped names
+
+import bisect
+import difflib
+
+
+# other names of the countries, mapped to the names used by the UN SYB datasets
+country_aliases = {"Bolivia": "Bolivia (Plurin. State of)",
+                   "Brunei": "Brunei Darussalam",
+                   "Cape Verde": "Cabo Verde",
+                   "Congo, Dem. Rep.": "Dem. Rep. of the Congo",
+                   "Congo, Rep.": "Congo",
+                   "Cote d'Ivoire": "Côte d’Ivoire",
+                   "Czech Republic": "Czechia",
+                   "Iran": "Iran (Islamic Republic of)",
+                   "Kyrgyz Republic": "Kyrgyzstan",
+                   "Lao": "Lao People's Dem. Rep.",
+                   "Laos": "Lao People's Dem. Rep.",
+                   "Micronesia, Fed. Sts.": "Micronesia (Fed. States of)",
+                   "Moldova": "Republic of Moldova",
+                   "North Korea": "Dem. People's Rep. Korea",
+                   "Palestine": "State of Palestine",
+                   "Russia": "Russian Federation",
+                   "Slovak Republic": "Slovakia",
+                   "South Korea": "Republic of Korea",
+                   "St. Kitts and Nevis": "Saint Kitts and Nevis",
+                   "St. Lucia": "Saint Lucia",
+                   "St. Vincent and the Grenadines": "Saint Vincent & Grenadines",
+                   "Syria": "Syrian Arab Republic",
+                   "Tanzania": "United Rep. of Tanzania",
+                   "United States": "United States of America",
+                   "USA": "United States of America",
+                   "US": "United States of America",
+                   "UK": "United Kingdom",
+                   "Venezuela": "Venezuela (Boliv. Rep. of)",
+                   "Vietnam": "Viet Nam"}
+
+
+class CountryIndex:
+    """
+    Class to look up countries by their name, one of their aliases, or their numeric UN M49 code
+    (which is also the ISO 3166-1 numeric code), ignoring the letter case. Exact lookups are
+    dictionary lookups, and the names are also kept sorted for prefix suggestions.
+
+    Constructor:
+        Parameters:
+            names (iterable):           names of the countries
+            aliases (dict):             country keyed by alias, the default aliases if None. Aliases of
+                                        countries missing from names are ignored
+            codes (dict):               numeric code keyed by country, codes of countries missing from names are ignored
+
+    Attributes:
+        _lookup (dict):                 country keyed by the case-folded name, alias or code
+        _sorted_keys (list):            case-folded names, sorted
+        _names (dict):                  country keyed by the case-folded name
+
+    Methods:
+        resolve(text):                  Method to find the country for a name, alias or code
+        suggest(text, limit):           Method to suggest countries for a mistyped name
+    """
+
+    def __init__(self, names, aliases=None, codes=None):
+        self._names = {str(name).casefold(): str(name) for name in names}
+        self._sorted_keys = sorted(self._names)
+        self._lookup = dict(self._names)
+
+        for (alias, country) in (country_aliases if aliases is None else aliases).items():
+            if country.casefold() in self._names:
+                self._lookup.setdefault(alias.casefold(), country)
+
+        for (country, code) in ({} if codes is None else codes).items():
+            if str(country).casefold() in self._names:
+                self._lookup.setdefault(str(int(code)), str(country))
+
+
+
+    def __contains__(self, text):
+        return self.resolve(text) is not None
+
+
+
+    def __len__(self):
+        return len(self._names)
+
+
+
+    def resolve(self, text):
+        """
+        Method to find the country for a name, alias or code
+
+            Parameters:
+                text (str): name, alias or numeric code of the country
+
+            Returns:
+                str: name of the country, None if there is no such country
+        """
+        key = str(text).strip().casefold()
+
+        # codes may be typed with leading zeros, eg. 004 for Afghanistan
+        if key.isdigit():
+            key = str(int(key))
+
+        return self._lookup.get(key)
+
+
+
+    def suggest(self, text, limit=5):
+        """
+        Method to suggest countries for a mistyped name: first the countries starting with it, then
+        the countries with the closest names
+
+            Parameters:
+                text (str): name typed by the user
+                limit (int): largest number of suggestions
+
+            Returns:
+                list: names of the suggested countries
+        """
+        key = str(text).strip().casefold()
+
+        if not key:
+            return []
+
+        suggestions = []
+
+        # the names starting with the key are next to each other in the sorted names
+        position = bisect.bisect_left(self._sorted_keys, key)
+
+        while position < len(self._sorted_keys) and self._sorted_keys[position].startswith(key) and len(suggestions) < limit:
+            suggestions.append(self._names[self._sorted_keys[position]])
+            position += 1
+
+        for match in difflib.get_close_matches(key, self._sorted_keys, n=limit):
+            if len(suggestions) < limit and self._names[match] not in suggestions:
+                suggestions.append(self._names[match])
+
+        return suggestions
@@ -4,12 +4,131 @@
 
 from custom_errors import ValueOutOfRange
 from custom_errors import ValueDuplicate
+from data_cache import DataCache
+from data_export import export_frame
+from country_index import CountryIndex
+from aggregate_cube import AggregateCube
+from indicators import default_registry
+from indicators import indicator_sources
+from indicators import registered_series
+from indicators import compared_series
+from comparison_figure import ComparisonFigure
+from comparison_figure import pivot_countries
+from comparison_figure import render_comparison
+from comparison_figure import render_snapshot_rows
+from dataset_snapshot import write_snapshot
+from time_series import country_rows
+from time_series import growth_over_years
+from time_series import compound_growth
+from rank_index import RankIndex
+from rank_index import comparators
+from query_cache import QueryCache
+from instrumentation import StageProfiler
+from instrumentation import profiled_stage
+import numpy as np
 import pandas as pd
 from ansi_colors import Color as color
-import time
+from contextlib import redirect_stdout
+import sys
 import os
-import matplotlib.pyplot as plt
-from launch import clear_console
+import re
+import atexit
+import shutil
+import time
+from console import clear_console
+
+
+def series_to_columns(raw, series, keys=("Region/Country/Area", "Year")):
+    """
+    Function to reshape a long-format UN SYB sheet, having one row per country, year and Series,
+    into the wide layout having one column per Series. The sheet is filtered and pivoted in a
+    single pass, and only the key combinations having a value for every requested Series are kept
+
+        Parameters:
+            raw (dataframe): long-format sheet with the key columns, "Series" and "Value"
+            series (list): Series to turn into columns, in the order of the resulting columns
+            keys (tuple): columns identifying a row of the wide layout
+
+        Returns:
+            dataframe: the key columns followed by one column per Series, sorted on the keys
+    """
+    keys = list(keys)
+
+    wide = raw.loc[raw["Series"].isin(series), keys + ["Series", "Value"]].set_index(
+        keys + ["Series"])["Value"].unstack("Series")
+
+    # reindex also creates the columns of Series missing from the sheet, so they drop every row like an inner join would
+    wide = wide.reindex(columns=list(series)).dropna(how="any")
+    wide.columns.name = None
+
+    return wide.reset_index()
+
+
+# types of the columns of the long-format UN SYB files, fixed so that every chunk is parsed alike
+syb_dtypes = {"Code": "int32", "Region/Country/Area": "object", "Year": "int16", "Series": "object", "Value": "float64"}
+
+
+def stream_series(path, series, columns=("Region/Country/Area", "Year", "Series", "Value"), chunksize=100000):
+    """
+    Function to read the rows of some Series from a long-format UN SYB CSV file, which may hold many
+    more Series than needed. The file is read in chunks of the needed columns only, and every chunk
+    is filtered on the Series before the next one is read, so the memory needed depends on the rows
+    kept rather than on the size of the file. A Parquet file is read whole, but only the needed columns
+
+        Parameters:
+            path (str): path of the CSV or Parquet file
+            series (list): Series to keep
+            columns (tuple): columns to read, with the types given by syb_dtypes
+            chunksize (int): number of lines read at a time
+
+        Returns:
+            dataframe: the rows of the Series, with the requested columns
+    """
+    dtype = {column: syb_dtypes[column] for column in columns if column in syb_dtypes}
+
+    if path.lower().endswith(".parquet"):
+        raw = pd.read_parquet(path, columns=list(columns)).astype(dtype)
+
+        return raw[raw["Series"].isin(series)].reset_index(drop=True)
+
+    # values above a thousand may be written with thousands separators in the UN SYB files
+    chunks = [chunk[chunk["Series"].isin(series)]
+              for chunk in pd.read_csv(path, usecols=list(columns), dtype=dtype, thousands=",", chunksize=chunksize)]
+
+    if not chunks:
+        return pd.DataFrame({column: pd.Series(dtype=dtype.get(column, "object")) for column in columns})
+
+    return pd.concat(chunks, ignore_index=True)
+
+
+def load_source(path, series=None, read_options=None):
+    """
+    Function to read one source file, and reshape it when Series are given. It is the task run by
+    the worker processes importing the files concurrently, so the reshaping also happens there and
+    only the smaller wide dataframe is sent back
+
+        Parameters:
+            path (str): path of the Excel, CSV or Parquet file
+            series (list): Series to turn into columns with series_to_columns, the file is returned as read if None
+            read_options (dict): keyword arguments of pd.read_excel, CSV and Parquet files are read whole or with
+                                 stream_series
+
+        Returns:
+            dataframe: the file as read, or its Series as columns
+    """
+    if not path.lower().endswith((".csv", ".parquet")):
+        raw = pd.read_excel(path, **(read_options or {}))
+
+    elif series is None:
+        raw = pd.read_csv(path) if path.lower().endswith(".csv") else pd.read_parquet(path)
+
+    else:
+        raw = stream_series(path, series)
+
+    if series is None:
+        return raw
+
+    return series_to_columns(raw, series)
 
 
 class DataAnalysis:
@@ -17,158 +136,246 @@ class DataAnalysis:
     Class to facilitate data import, aggregation, analysis, and reporting
 
     Constructor:
-        The constructor performs the following functions -
+        The data is processed by the following stages, each of which runs on the first access to
+        the dataframes it produces, so a query only pays for the stages it needs -
         - imports the data from Excel/CSV files into panda dataframes
         - merges the data together into one dataframe, indexes it, and sorts the indexes
         - add additional columns into the dataframe
         - checks the null values and data mismatches
-        - exports the entire merged hierarchical dataset into excel
+        The constructor only exports the entire merged hierarchical dataset into excel on request.
+
+        The imported and merged dataframes are cached on disk, and while none of the source files
+        have changed, the stages are replaced by loading the cached dataframes.
+
+        Parameters:
+            default_location (str):     relative path to location of provided files
+            custom_location (str):      relative path to location of additional files
+            cache_dir (str):            relative path to the directory holding the cached dataframes
+            rebuild_cache (bool):       if True, ignore the cached dataframes and rebuild them from the source files
+            interactive (bool):         if False, run without prompts and report the progress on stderr
+            export_on_start (bool):     if True, export the entire merged hierarchical dataset into excel right away
+            profile (bool):             if True, measure the time, memory and rows of every stage of the pipeline
+            float32_tolerance (float):  largest relative error allowed when downcasting the indicators to float32,
+                                        the indicators stay float64 if None
+            import_workers (int):       number of processes parsing the Excel files concurrently, the number of
+                                        CPUs if None, and 1 imports the files one after another
+            registry (dict):            indicators to import, references and derived columns, laid out like
+                                        indicators.default_registry, which is used if None
+            query_cache_size (int):     largest number of answers of the queries kept, 0 to calculate them every time
 
     Attributes:
         _unc_data (dataframe):          pandas dataframe to hold data imported from 'UN Codes.xlsx'
         _liv_data (dataframe):          pandas dataframe to hold data imported from 'UN Population Dataset 1.xlsx'
         _pop_data (dataframe):          pandas dataframe to hold data imported from 'UN Population Dataset 2.xlsx'
         _gdp_data (dataframe):          pandas dataframe to hold data imported from 'UNGDPData.csv'
+        _country_codes (series):        numeric UN code of every country and area in 'UNGDPData.csv'
         _dataset  (dataframe):          pandas dataframe to hold merged, indexed dataset
+        _cache (DataCache):             on-disk cache of the above dataframes
+        _source_fingerprints (dict):    fingerprints of the source files the dataframes were read from, saved with them
+        _default_location (str):        relative path to location of provided files
+        _custom_location (str):         relative path to location of additional files
+        _rebuild_cache (bool):          whether the cached dataframes are ignored
+        _interactive (bool):            whether the program runs the interactive menu or a batch command
+        _dataset_version (int):         incremented every time the dataset is replaced or modified in place
+        _cube (AggregateCube):          aggregate stats of the dataset, built on the first grouped query
+        _ranking (RankIndex):           sorted rows of every year of the dataset, built on the first rank or threshold query
+        _countries (CountryIndex):      index of the countries of the dataset, built on the first lookup
+        _countries_version (int):       version of the dataset the index of the countries was built from
+        _queries (QueryCache):          latest answers of the queries, keyed by the query and its normalized arguments
+        _comparison_figure (ComparisonFigure):  figure reused by plot_countries, created on the first plot
+        _snapshot (str):                directory of the memory-mapped snapshot of the dataset, None until published
+        _snapshot_version (int):        version of the dataset the snapshot was published from
+        _profiler (StageProfiler):      measurements of the stages, None unless profiling was requested
+        _float32_tolerance (float):     largest relative error allowed when downcasting the indicators to float32
+        _import_workers (int):          number of processes parsing the Excel files concurrently
+        _registry (dict):               indicators to import, references and derived columns
 
     Methods:
+        __getattr__(name):                                  Method to run the stage of the pipeline producing an attribute on its first access
+        __setattr__(name, value):                           Method to set an attribute, recording when the dataset is replaced
+        _dataset_changed():                                 Method to record that the dataset has been replaced or modified in place
+        profiler():                                         Method to get the measurements of the stages
+        _import_stage():                                    Method to produce the imported dataframes
+        _dataset_stage():                                   Method to produce the merged dataset with the additional columns
+        _source_files(default_location, custom_location):   Method to get the paths of the source files
+        _load_cached_data(names):                           Method to load dataframes from the on-disk cache
+        _save_cached_data():                                Method to store all the dataframes in the on-disk cache
         _import_data(default_location, custom_location):    Method to import the known files from the
                                                             relative locations in the project directory
+        _read_gdp_data(path):                               Method to read the UN GDP Data file
         _merge_data():                                      Method to merge the data from different dataframes into one dataframe
-        _additional_statistics():                           Method to add additional columns to the dataframe
+        _optimize_dtypes(dataset):                          Method to convert the dataset into compact data types
+        _additional_statistics(dataset, reference_rows):    Method to add the derived columns of the indicator registry to the dataframe
+        ratio_to_reference(column, reference_country, dataset):     Method to calculate the ratio of a column to that of a reference country in the same year
+        reference_values(column, reference_country, dataset):       Method to get the value of a column of a reference country in the same year
+        _reference_by_year(column, reference_country, dataset):     Method to get the values of a column of a reference country keyed by the year
+        refresh(default_location, custom_location):         Method to ingest a newer release of the source files incrementally
         _check_null():                                      Method to check null values in the dataframe.
-        export_dataset(option_num=0):                       Method to export the entire merged hierarchical dataframe into Excel file
+        export_dataset(option_num=0, filename, ...):        Method to export the entire merged hierarchical dataframe into CSV, Parquet or Excel file
+        imported_dataframes():                              Method to get the dataframes imported from Excel or CSV
         print_imported_dataframes(option_num):              Method to print dataframes imported from Excel or CSV
+        _memoized(key, calculate):                          Method to get the answer of a query from the query cache, calculating it if needed
+        query_cache_info():                                 Method to get the hits and misses of the query cache
+        aggregate_stats():                                  Method to get aggregate stats for the entire dataset
         print_aggregate_stats(option_num):                  Method to print aggregate stats for the entire dataset
+        group_by(region_type, column, stat):                Method to get aggregate stats grouped by UN Region/UN Sub-Region
+        _aggregate_cube():                                  Method to get the aggregate cube of the dataset, rebuilt when the dataset changes
         group_by_stats(option_num):                         Method to print aggregate stats grouped by UN Region/UN Sub-Region
+        higher_gdp_countries():                             Method to get countries having GDP per capita higher than the USA
         higher_gdp_than_usa(option_num):                    Method to list countries having GDP per capita than the USA
-        pivot_plot(option_num):                             Method to plot graphs on for four different countries on various aspects
+        _rank_index():                                      Method to get the rank index of the dataset, rebuilt when the dataset changes
+        select_countries(column, comparator, threshold, reference_country):    Method to find the rows whose value satisfies a comparison
+        top_countries(column, n, region_type, ascending):   Method to find the countries ranked first in every year or region
+        rank_changes(column, ascending):                    Method to get the rank of every country in every year and its change
+        country_index():                                    Method to get the index of the countries of the dataset
+        resolve_country(text):                              Method to find the country of the dataset for a name, alias or numeric code
+        compared_data_columns(columns):                     Method to validate the data columns the countries are compared on
+        compare_countries(countries, columns):              Method to build the pivot table comparing countries on various aspects
+        plot_countries(pivot_data, filename, columns):      Method to plot the pivot table built by compare_countries
+        publish_snapshot(directory):                        Method to publish a memory-mapped snapshot of the dataset for worker processes
+        _remove_snapshot():                                 Method to delete the published snapshot
+        plot_sub_regions(output_dir, columns, workers):     Method to plot the comparison of the countries of every UN Sub-Region in parallel
+        pivot_plot(option_num):                             Method to plot graphs for several countries on various aspects
+        time_series(columns, window):                       Method to get the growth of every country over the years
+        print_time_series(option_num):                      Method to print the growth of every country over the years
     """
 
-    def __init__(self):
-        print("\n" + color.yellow +
-              "Please wait while the program initializes..." + color.reset)
-        time.sleep(1.5)
-        print("\n[Step 1/5] Importing data from excel and csv files")
-        self._import_data("UN Population Datasets", "CustomUNData")
-        print("[Step 1/5] " + color.green + "complete" + color.reset)
+    # names of the dataframes stored in the on-disk cache
+    _imported_frames = ["_unc_data", "_liv_data", "_pop_data", "_gdp_data", "_country_codes"]
+    _cached_frames = _imported_frames + ["_dataset"]
+
+    # lazily evaluated stages of the pipeline, and the attributes each of them produces
+    _stages = {"_unc_data": "_import_stage",
+               "_liv_data": "_import_stage",
+               "_pop_data": "_import_stage",
+               "_gdp_data": "_import_stage",
+               "_country_codes": "_import_stage",
+               "_dataset": "_dataset_stage"}
+
+    # bits of the integer keys joining the sources taken by the year, the rest holding the country
+    _year_bits = 16
+
+    # choices for the aggregate stats grouped by UN Region/UN Sub-Region
+    available_region_types = ["UN Region", "UN Sub-Region"]
+    available_stats = ["mean", "median", "min", "max", "all"]
+
+    # data columns the countries are compared on, unless others are requested, for the default registry
+    compared_columns = compared_series(default_registry)
+
+    # data columns of the time series, unless others are requested
+    growth_columns = ["GDP per capita (US dollars)", "Life expectancy at birth for both sexes (years)"]
+
+    def __init__(self, default_location="UN Population Datasets", custom_location="CustomUNData",
+                 cache_dir=".cache", rebuild_cache=False, interactive=True, export_on_start=False, profile=False,
+                 float32_tolerance=None, import_workers=None, registry=None, query_cache_size=128):
+        self._registry = default_registry if registry is None else registry
+
+        if not self._registry.get("indicators"):
+            raise ValueOutOfRange(
+                "The indicator registry has no indicators. Please register at least one Series to import")
+
+        for indicator in self._registry["indicators"]:
+            if indicator["source"] not in indicator_sources.values():
+                raise ValueOutOfRange(
+                    "\'" + str(indicator["source"]) + "\' is not a source file of the indicators. Please choose one of " +
+                    ", ".join(indicator_sources.values()))
+
+        if registry is not None:
+            self.compared_columns = compared_series(registry)
+
+        self._float32_tolerance = float32_tolerance
+        self._import_workers = import_workers
+        self._profiler = StageProfiler() if profile else None
+        self._dataset_version = 0
+        self._cube = None
+        self._ranking = None
+        self._countries = None
+        self._countries_version = None
+        self._queries = QueryCache(query_cache_size)
+        self._comparison_figure = None
+        self._snapshot = None
+        self._snapshot_version = None
+        self._source_fingerprints = None
+        self._default_location = default_location
+        self._custom_location = custom_location
+        self._rebuild_cache = rebuild_cache
+        self._interactive = interactive
+
+        # the registry decides what the cached dataframes hold, so it is part of the settings
+        self._cache = DataCache(cache_dir, self._source_files(default_location, custom_location),
+                                {"float32_tolerance": float32_tolerance, "registry": self._registry})
+
+        if export_on_start:
+            print("\n" + color.yellow +
+                  "Please wait while the program initializes..." + color.reset)
 
-        print("\n[Step 2/5] Merging all data into one dataframe")
-        self._merge_data()
-        print("[Step 2/5] " + color.green + "complete" + color.reset)
+            # exporting needs the dataset, so this runs all the stages of the pipeline
+            print("\nExporting entire merged hierarchical dataset into excel")
+            self.export_dataset()
+
+            if interactive:
+                input("\n\n" + color.cyan +
+                      "Press enter to enter program menu " + color.reset)
 
-        print("\n[Step 3/5] Adding extra columns to the entire combined dataframe")
-        self._additional_statistics()
-        print("\n[Step 3/5] " + color.green + "complete" + color.reset)
 
-        print("\n[Step 4/5] Checking null values\n")
-        self._check_null()
-        print("\n[Step 4/5] " + color.green + "complete" + color.reset)
 
-        print("\n[Step 5/5] Exporting entire merged hierarchical dataset into excel")
-        self.export_dataset()
-        print("[Step 5/5] " + color.green + "complete" + color.reset)
+    def __getattr__(self, name):
+        """
+        Method to run the stage of the pipeline producing an attribute on its first access. Python
+        calls it only for attributes missing from the object, so a stage runs at most once and the
+        later accesses read the stored attribute directly
+
+            Parameters:
+                name (str): name of the missing attribute
+
+            Returns:
+                the attribute produced by the stage
+        """
+        stage = DataAnalysis._stages.get(name)
 
-        input("\n\n" + color.cyan +
-              "Press enter to enter program menu " + color.reset)
+        if stage is None:
+            raise AttributeError("'" + type(self).__name__ + "' object has no attribute '" + name + "'")
 
+        if self._interactive:
+            getattr(self, stage)()
 
+        else:
+            # in batch mode the progress report goes to stderr, keeping stdout for the results
+            with redirect_stdout(sys.stderr):
+                getattr(self, stage)()
 
-    def _import_data(self, default_location, custom_location):
+        return self.__dict__[name]
+
+
+
+    @property
+    def profiler(self):
         """
-        Method to import the known files from the relative locations in the project directory
+        Method to get the measurements of the stages of the pipeline
 
             Parameters:
-                default_location (str): relative path to location of provided files
-                custom_location (str): relative path to location of additional files
+                none
 
             Returns:
-                None
+                StageProfiler: measurements of the stages, None unless profiling was requested
         """
-        # Importing UN Codes dataset
-        # ----------------------------------------
-        self._unc_data = pd.read_excel(
-            os.path.join(default_location, "UN Codes.xlsx"))
+        return self._profiler
 
-        # fixing incompatible name of "United States of America" in the "UN Codes.xlsx" file
-        self._unc_data.loc[self._unc_data["Country"] ==
-                           "United States", "Country"] = "United States of America"
-        # ----------------------------------------
-
-        # Importing UN Population Dataset 1
-        # ----------------------------------------
-        liv_data_raw = pd.read_excel(os.path.join(
-            default_location, "UN Population Dataset 1.xlsx"), usecols="B:E")
-
-        # creating temporary dataframe with Series filtered on "Population annual rate of increase (percent)"
-        filter_series = "Population annual rate of increase (percent)"
-        liv_data_population = liv_data_raw[liv_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series})
-
-        # creating temporary dataframe with Series filtered on "Total fertility rate (children per women)"
-        filter_series = "Total fertility rate (children per women)"
-        liv_data_fertility = liv_data_raw[liv_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series})
-
-        # creating temporary dataframe with Series filtered on "Life expectancy at birth for both sexes (years)"
-        filter_series = "Life expectancy at birth for both sexes (years)"
-        liv_data_expectancy = liv_data_raw[liv_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series})
-
-        # creating temporary dataframe with Series filtered on "Life expectancy at birth for males (years)"
-        filter_series = "Life expectancy at birth for males (years)"
-        liv_data_expectancy_males = liv_data_raw[liv_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series})
-
-        # creating temporary dataframe with Series filtered on "Life expectancy at birth for females (years)"
-        filter_series = "Life expectancy at birth for females (years)"
-        liv_data_expectancy_females = liv_data_raw[liv_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series})
-
-        # join dataframe liv_data_population and liv_data_fertility
-        liv_data_temp = pd.merge(liv_data_population, liv_data_fertility, how="inner", on=[
-                                 "Region/Country/Area", "Year"])
-
-        # join dataframe liv_data_temp and liv_data_expectancy_males
-        liv_data_temp = pd.merge(liv_data_temp, liv_data_expectancy_males, how="inner", on=[
-                                 "Region/Country/Area", "Year"])
-
-        # join dataframe liv_data_temp and liv_data_expectancy_females
-        liv_data_temp = pd.merge(liv_data_temp, liv_data_expectancy_females, how="inner", on=[
-                                 "Region/Country/Area", "Year"])
-
-        # join dataframe liv_data_temp and liv_data_expectancy
-        self._liv_data = pd.merge(liv_data_temp, liv_data_expectancy, how="inner", on=[
-                                  "Region/Country/Area", "Year"])
-        # ----------------------------------------
 
-        # Importing UN Population Dataset 2
-        # ----------------------------------------
-        pop_data_raw = pd.read_excel(os.path.join(
-            default_location, "UN Population Dataset 2.xlsx"), usecols="B:D, F")
-
-        # creating dataframe with Series filtered on "Urban population (percent)"
-        filter_series = "Urban population (percent)"
-        self._pop_data = pop_data_raw[pop_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series}).reset_index(drop=True)
-        # ----------------------------------------
 
-        # Importing UN GDP Data
-        # ----------------------------------------
-        gdp_data_raw = pd.read_csv(os.path.join(custom_location, "UNGDPData.csv"), usecols=[
-                                   "Region/Country/Area", "Year", "Series", "Value"])
+    def __setattr__(self, name, value):
+        # replacing the dataset invalidates everything derived from it
+        if name == "_dataset":
+            self._dataset_changed()
 
-        # creating dataframe with Series filtered on "Urban population (percent)"
-        filter_series = "GDP per capita (US dollars)"
-        self._gdp_data = gdp_data_raw[gdp_data_raw["Series"] == filter_series].drop(
-            "Series", axis=1).rename(columns={"Value": filter_series}).reset_index(drop=True)
-        # ----------------------------------------
+        object.__setattr__(self, name, value)
 
 
 
-    def _merge_data(self):
+    def _dataset_changed(self):
         """
-        Method to merge the data from different dataframes into one dataframe
+        Method to record that the dataset has been replaced or modified in place, which invalidates
+        the aggregates derived from it
 
             Parameters:
                 none
@@ -176,33 +383,42 @@ class DataAnalysis:
             Returns:
                 None
         """
-        # merging "UN Codes" and "UN Population Dataset 1" into dataset_temp
-        dataset_temp = pd.merge(self._unc_data, self._liv_data, how="left", left_on="Country",
-                                right_on="Region/Country/Area").drop("Region/Country/Area", axis=1)
+        self.__dict__["_dataset_version"] = self.__dict__.get("_dataset_version", 0) + 1
+
+
+
+    def _source_files(self, default_location, custom_location):
+        """
+        Method to get the paths of the source files imported by _import_data. An Excel file exported
+        as CSV or Parquet, with the same name, is used when the Excel file itself is missing, and so is
+        the UN GDP Data file exported as Parquet
 
-        # merging dataset_temp and "UN Population Dataset 2" into dataset_temp
-        dataset_temp = pd.merge(dataset_temp, self._pop_data, how="left", left_on=[
-                                "Country", "Year"], right_on=["Region/Country/Area", "Year"]).drop("Region/Country/Area", axis=1)
+            Parameters:
+                default_location (str): relative path to location of provided files
+                custom_location (str): relative path to location of additional files
 
-        # merging dataset_temp and "UN GDP Data" into dataset
-        self._dataset = pd.merge(dataset_temp, self._gdp_data, how="left", left_on=[
-                                 "Country", "Year"], right_on=["Region/Country/Area", "Year"]).drop("Region/Country/Area", axis=1)
+            Returns:
+                list: paths of UN Codes, UN Population Dataset 1 and 2, and UN GDP Data
+        """
+        paths = []
 
-        # create the index on Region, Sub-Region and Country
-        self._dataset.set_index(
-            ["UN Region", "UN Sub-Region", "Country"], inplace=True)
+        for path in [os.path.join(default_location, "UN Codes.xlsx"),
+                     os.path.join(default_location, "UN Population Dataset 1.xlsx"),
+                     os.path.join(default_location, "UN Population Dataset 2.xlsx"),
+                     os.path.join(custom_location, "UNGDPData.csv")]:
+            exported = [os.path.splitext(path)[0] + extension for extension in (".csv", ".parquet")]
+            exported = [name for name in exported if name != path and os.path.exists(name)]
 
-        # sort the indexes
-        self._dataset.sort_index(inplace=True)
+            paths.append(exported[0] if not os.path.exists(path) and exported else path)
 
-        # dropping the null values
-        self._dataset.dropna(inplace=True)
+        return paths
 
 
 
-    def _additional_statistics(self):
+    @profiled_stage(outputs=("_unc_data", "_liv_data", "_pop_data", "_gdp_data", "_country_codes"))
+    def _import_stage(self):
         """
-        Method to add additional columns to the dataframe
+        Method to produce the imported dataframes, from the on-disk cache if the source files are unchanged
 
             Parameters:
                 none
@@ -210,406 +426,1480 @@ class DataAnalysis:
             Returns:
                 None
         """
-        # creating IndexSlice object
-        idx = pd.IndexSlice
-
-        # Extra column 1
-        # ----------------------------------------
-        # Adding extra column "GDP per capita wrt USA", which is ratio of "GDP per capita (US dollars)"
-        # of the country and "GDP per capita (US dollars)" of the "United States of America"
+        if not self._rebuild_cache and self._load_cached_data(self._imported_frames):
+            print("\n[Step 1/5] Loaded imported dataframes from cache, source files are unchanged")
 
-        usa = "United States of America"
+        else:
+            print("\n[Step 1/5] Importing data from excel and csv files")
+            self._import_data(self._default_location, self._custom_location)
 
-        # get the GDP for United States
-        us_gdp_capita = self._dataset.loc[idx[:, :, usa],
-                                          idx["Year", "GDP per capita (US dollars)"]]
-        us_gdp_capita.reset_index(drop=True, inplace=True)
+        print("[Step 1/5] " + color.green + "complete" + color.reset)
 
-        # get all the different years in the self._dataset for the "United States of America"
-        different_years = self._dataset.loc[idx[:, :, usa], idx["Year"]]
 
-        # loop to fill the values in the column
-        for y in different_years:
-            # fetch the gdp of US for "Year" = y
-            us_gdp_capita_y = float(
-                us_gdp_capita[us_gdp_capita["Year"] == y]["GDP per capita (US dollars)"])
 
-            # for the "Year" = y, calculate GDP per capita wrt USA = GDP per capita / GDP per capita of USA
-            self._dataset.loc[idx[self._dataset["Year"] == y], idx["GDP per capita wrt USA"]
-                              ] = self._dataset.loc[idx[self._dataset["Year"] == y], idx["GDP per capita (US dollars)"]] / us_gdp_capita_y
+    @profiled_stage(outputs=("_dataset",))
+    def _dataset_stage(self):
+        """
+        Method to produce the merged dataset with the additional columns, from the on-disk cache if
+        the source files are unchanged. A freshly built dataset is checked for null values and cached
+        along with the imported dataframes
 
-        # printing what column has been added - to make it easy for TAs
-        print("\nAdded column \'GDP per capita wrt USA\' to the dataset")
-        # ----------------------------------------
+            Parameters:
+                none
 
-        # Extra column 2
-        # ----------------------------------------
-        # Column to compare the Ratio of Urban Population to GDP per Capita
+            Returns:
+                None
+        """
+        if not self._rebuild_cache and self._load_cached_data(["_dataset"]):
+            print("\n[Step 2-5/5] Loaded merged dataset from cache, source files are unchanged")
+            print("[Step 2-5/5] " + color.green + "complete" + color.reset)
+            return
 
-        self._dataset.insert(8, "Ratio of Urban Population to GDP per Capita",
-                             self._dataset['Urban population (percent)'] / self._dataset['GDP per capita (US dollars)'])
+        # producing the imported dataframes first, so the steps are reported in order
+        for name in self._imported_frames:
+            getattr(self, name)
 
-        print("Added column \'Ratio of Urban Population to GDP per capita\' to the dataset")
-        # ----------------------------------------
+        print("\n[Step 2/5] Merging all data into one dataframe")
+        self._merge_data()
+        print("[Step 2/5] " + color.green + "complete" + color.reset)
 
-        # Extra column 3
-        # ----------------------------------------
-        # Column to compare the Ratio of Annual Rate of Population Increase to GDP per Capita
+        print("\n[Step 3/5] Converting the dataset into compact data types")
+        self._optimize_dtypes()
+        print("[Step 3/5] " + color.green + "complete" + color.reset)
 
-        self._dataset.insert(9, "Ratio of Annual Rate of Population Increase to GDP per Capita",
-                             self._dataset['Population annual rate of increase (percent)'] / self._dataset['GDP per capita (US dollars)'])
+        print("\n[Step 4/5] Adding extra columns to the entire combined dataframe")
+        self._additional_statistics()
+        print("\n[Step 4/5] " + color.green + "complete" + color.reset)
 
-        print("Added column \'Ratio of Annual Rate of Population Increase to GDP per Capita\' to the dataset")
-        # ----------------------------------------
+        print("\n[Step 5/5] Checking null values\n")
+        self._check_null()
+        print("\n[Step 5/5] " + color.green + "complete" + color.reset)
 
-        # dropping the null values which may arise after adding column 1
-        self._dataset.dropna(inplace=True)
+        self._save_cached_data()
 
 
 
-    def _check_null(self):
+    def _load_cached_data(self, names):
         """
-        Method to check null values in the dataframe.
+        Method to load dataframes from the on-disk cache
 
             Parameters:
-                none
+                names (list): names of the dataframes to load
 
             Returns:
-                None
+                bool: True if the dataframes were loaded, False if the cache is missing or stale
         """
-        print(self._dataset.isnull().any())
+        frames = self._cache.load(names)
+
+        if frames is None:
+            return False
+
+        for name, frame in frames.items():
+            setattr(self, name, frame)
+
+        self._source_fingerprints = self._cache.loaded_fingerprints
 
+        return True
 
 
-    def export_dataset(self, option_num=0):
+
+    def _save_cached_data(self):
         """
-        Method to export the entire merged hierarchical dataframe into Excel files with default filename
+        Method to store all the dataframes in the on-disk cache. Failing to write the cache is
+        reported but does not stop the program, as the dataframes are already in memory
 
             Parameters:
-                option_num (int): program menu option number
+                none
 
             Returns:
                 None
         """
-        if option_num != 0:
-            clear_console()
-
-            print("\n" + color.yellow +
-                  "Menu option " + str(int(option_num)) + ": Exporting merged hierarchical dataframe" + color.reset)
-
         try:
-            self._dataset.to_excel("Export UN Data.xlsx",
-                                   index=True, header=True)
-            print("\nFile \'Export UN Data.xlsx\' created\n")
+            self._cache.save({name: getattr(self, name) for name in self._cached_frames}, self._source_fingerprints)
 
         except Exception as e:
-            print("\n" + color.red + "An exception occurred during export. Please check the below message and try again" + color.reset + "\n")
+            print("\n" + color.red + "Could not write the cache, the next start will import the files again" + color.reset)
             print(e)
 
 
 
-    def print_imported_dataframes(self, option_num):
+    @profiled_stage(outputs=("_unc_data", "_liv_data", "_pop_data", "_gdp_data", "_country_codes"))
+    def _import_data(self, default_location, custom_location):
         """
-        Method to print dataframes imported from Excel or CSV
+        Method to import the known files from the relative locations in the project directory. The
+        Excel files are parsed concurrently by a pool of processes while the CSV file is read in this
+        one, and the files are imported one after another if the pool cannot be used
 
             Parameters:
-                option_num (int): program menu option number
+                default_location (str): relative path to location of provided files
+                custom_location (str): relative path to location of additional files
 
             Returns:
                 None
         """
-        clear_console()
+        (unc_path, liv_path, pop_path, gdp_path) = self._source_files(default_location, custom_location)
 
-        print("\n" + color.yellow +
-              "Menu option " + str(int(option_num)) + ": Printing imported dataframes" + color.reset)
+        # the files are fingerprinted before they are read, so one modified while being read invalidates the cache
+        self._source_fingerprints = self._cache.fingerprints([unc_path, liv_path, pop_path, gdp_path])
 
-        print("\n\n" + color.green + "UN Codes dataframe" + color.reset + "\n")
-        print(self._unc_data)
+        # the Excel files (or their CSV or Parquet exports) to parse, with the registered Series reshaped into one column each,
+        # keeping only the country-years having all of them, and the names of UN Codes fixed once all the files are imported
+        excel_tasks = {"_unc_data": (unc_path,),
+                       "_liv_data": (liv_path, registered_series(self._registry, indicator_sources["_liv_data"]),
+                                     {"usecols": "B:E"}),
+                       "_pop_data": (pop_path, registered_series(self._registry, indicator_sources["_pop_data"]),
+                                     {"usecols": "B:D, F"})}
 
-        print("\n\n" + color.green +
-              "UN Life Expectancy and Fertility dataframe" + color.reset + "\n")
-        print(self._liv_data)
+        workers = min(self._import_workers or os.cpu_count() or 1, len(excel_tasks))
+        frames = None
 
-        print("\n\n" + color.green +
-              "UN Urban Population dataframe" + color.reset + "\n")
-        print(self._pop_data)
+        # Importing UN Codes dataset, and UN Population Datasets 1 and 2, concurrently
+        # ----------------------------------------
+        if workers > 1:
+            # the process pool is only loaded when it is used, like the plotting modules
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures.process import BrokenProcessPool
 
-        print("\n\n" + color.green +
-              "UN Gross Domestic Product dataframe" + color.reset + "\n")
-        print(self._gdp_data)
+            try:
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    futures = {name: executor.submit(load_source, *task) for (name, task) in excel_tasks.items()}
 
+                    # the CSV file is read here while the pool parses the Excel files
+                    gdp_data_raw = self._read_gdp_data(gdp_path)
 
+                    frames = {name: future.result() for (name, future) in futures.items()}
 
-    def print_aggregate_stats(self, option_num):
+            except FileNotFoundError:
+                raise
+
+            except (OSError, NotImplementedError, BrokenProcessPool) as e:
+                # eg. no support for process pools on the platform, or a worker process that died
+                print("\n" + color.red + "Could not import the files concurrently (" + str(e) +
+                      "), importing them one after another" + color.reset)
+
+        if frames is None:
+            frames = {name: load_source(*task) for (name, task) in excel_tasks.items()}
+            gdp_data_raw = self._read_gdp_data(gdp_path)
+
+        (self._unc_data, self._liv_data, self._pop_data) = (frames["_unc_data"], frames["_liv_data"],
+                                                            frames["_pop_data"])
+        # ----------------------------------------
+
+        # Importing UN GDP Data
+        # ----------------------------------------
+        # keeping the numeric UN code of every country and area having the registered Series
+        self._country_codes = gdp_data_raw.drop_duplicates("Region/Country/Area").set_index(
+            "Region/Country/Area")["Code"]
+
+        # creating dataframe with the registered Series, eg. "GDP per capita (US dollars)", as columns
+        self._gdp_data = series_to_columns(gdp_data_raw, registered_series(self._registry, indicator_sources["_gdp_data"]))
+        # ----------------------------------------
+
+        # Reconciling the country names of the UN Codes dataset
+        # ----------------------------------------
+        # the names in the "UN Codes.xlsx" file are resolved against the names used by the other files,
+        # eg. "United States" becomes "United States of America", and unknown names are kept as they are
+        names = CountryIndex(pd.concat([self._liv_data["Region/Country/Area"], self._pop_data["Region/Country/Area"],
+                                        self._gdp_data["Region/Country/Area"]]).unique(), codes=self._country_codes)
+        self._unc_data["Country"] = [names.resolve(country) or country for country in self._unc_data["Country"]]
+        # ----------------------------------------
+
+
+
+    def _read_gdp_data(self, path):
         """
-        Method to print aggregate stats for the entire dataset
+        Method to read the rows of the Series needed by _import_data from the UN GDP Data file, which
+        is streamed so that a full UN SYB dump can be used in its place
 
             Parameters:
-                option_num (int): program menu option number
+                path (str): path of the UN GDP Data file
 
             Returns:
-                None
+                dataframe: the GDP Data as read, one row per country, year and Series
         """
-        clear_console()
-
-        print("\n" + color.yellow +
-              "Menu option " + str(int(option_num)) + ": Printing aggregate statistics for the entire dataset" + color.reset)
-
-        print("\n\n" + color.green +
-              "Aggregate statistics for the entire dataset" + color.reset + "\n")
-        print(self._dataset.describe())
+        return stream_series(path, registered_series(self._registry, indicator_sources["_gdp_data"]),
+                             columns=("Code", "Region/Country/Area", "Year", "Series", "Value"))
 
 
 
-    def group_by_stats(self, option_num):
+    @profiled_stage(inputs=("_unc_data", "_liv_data", "_pop_data", "_gdp_data"), outputs=("_dataset",))
+    def _merge_data(self):
         """
-        Method to print the one or several aggregate stats grouped by UN Region/UN Sub-Region ranging in years for the dataframe.
+        Method to merge the data from different dataframes into one dataframe
 
             Parameters:
-                option_num (int): program menu option number
+                none
 
             Returns:
                 None
         """
-        clear_console()
+        index_names = ["UN Region", "UN Sub-Region", "Country"]
 
-        print("\n" + color.yellow +
-              "Menu option " + str(int(option_num)) + ": Aggregation stats grouped by UN Region/UN Sub-Region" + color.reset)
+        # "UN Codes" sorted on the index of the dataset, so the position of a country in it sorts the rows
+        codes = self._unc_data.drop_duplicates("Country").sort_values(index_names, ignore_index=True)
+        countries = pd.Index(codes["Country"])
 
-        while(True):
-            try:
-                print("\n\n" + color.magenta +
-                      "[Q1] How do you want to get aggregate stats? By \"UN Region\" or By \"UN Sub-Region\"" + color.reset)
-                choice_region_type = input(
-                    "\nEnter either \"UN Region\" or \"UN Sub-Region\" (without the quotes): ")
+        # every source keyed on one integer made of the position of the country and the year, so the join
+        # compares integers rather than the names. The countries missing from "UN Codes" are dropped first,
+        # and the sources without any registered Series are left out rather than dropping every row
+        sources = []
+        common = None
 
-                if choice_region_type == "UN Region" or choice_region_type == "UN Sub-Region":
-                    break
+        for name in indicator_sources:
+            source = getattr(self, name)
 
-                else:
-                    raise ValueOutOfRange(
-                        "This option is not supported. Please choose a valid menu option")
+            if len(source.columns) <= 2:
+                continue
 
-            except ValueOutOfRange as e:
-                print("\n" + color.red + str(e) + color.reset)
+            positions = countries.get_indexer(source["Region/Country/Area"])
+            rows = (positions >= 0).nonzero()[0]
+            keys = (positions[rows].astype("int64") << self._year_bits) | source["Year"].to_numpy()[rows]
+            sources.append((source, rows, keys))
 
-        # here we have got choice_region_type
+            # the sources only hold the country-years having all their Series, so the keys found in all
+            # of them are the rows of the dataset, without null values to drop. They are sorted, even when
+            # there is only one source, which sorts the rows on the index and the year
+            common = np.sort(keys) if common is None else np.intersect1d(common, keys, assume_unique=True)
 
-        while(True):
-            try:
-                print("\n" + color.magenta + "[Q2] Which data column you want the aggregate stats for?" +
-                      color.reset + "\n\nPlease enter one of the below possible options (dont enter leading hypen):\n")
+        if common is None:
+            raise ValueOutOfRange(
+                "None of the source files has a registered Series, so there is no data to merge")
 
-                for col in range(1, self._dataset.columns.size):
-                    print(" - " + self._dataset.columns[col])
+        # only the rows of the dataset are copied out of the sources, straight into its columns
+        columns = {"Year": common & ((1 << self._year_bits) - 1)}
 
-                choice_column = input("\nEnter your choice: ")
+        for (source, rows, keys) in sources:
+            taken = rows[pd.Index(keys).get_indexer(common)]
 
-                if choice_column in self._dataset.columns and choice_column != "Year":
-                    break
+            for column in source.columns[2:]:
+                columns[column] = source[column].to_numpy()[taken]
 
-                else:
-                    raise ValueOutOfRange(
-                        "This option is not supported. Please choose a valid menu option")
+        positions = common >> self._year_bits
 
-            except ValueOutOfRange as e:
-                print("\n" + color.red + str(e) + color.reset)
+        # the index is built once from its codes. Its levels keep every region, sub-region and country
+        # of "UN Codes", even the ones without data, like setting the index on the merged dataframes did
+        levels = [pd.Index(self._unc_data[name].unique()).sort_values() for name in index_names]
+        level_codes = [level.get_indexer(codes[name])[positions] for (level, name) in zip(levels, index_names)]
 
-        # now we have got choice_region_type and choice_column
+        self._dataset = pd.DataFrame(columns, index=pd.MultiIndex(levels=levels, codes=level_codes,
+                                                                  names=index_names, verify_integrity=False))
 
-        while(True):
-            try:
-                print("\n" + color.magenta + "[Q3] What aggregate stats you want?" + color.reset +
-                      "\n\nPlease enter one of the below possible options (dont enter leading hypen):\n")
 
-                available_stat = ["mean", "median", "min", "max", "all"]
 
-                for col in range(0, len(available_stat)):
-                    print(" - " + available_stat[col])
+    @profiled_stage(inputs=("_dataset",), outputs=("_dataset",))
+    def _optimize_dtypes(self, dataset=None):
+        """
+        Method to convert the dataset into compact data types: the index levels and any string columns
+        into categoricals, and the year into a small integer. The indicators are downcast to float32
+        only if a tolerance was given, and every value of the column stays within that relative error
 
-                choice_stat = input("\nEnter your choice: ")
+            Parameters:
+                dataset (dataframe): merged rows to convert, the dataset if None
 
-                if choice_stat not in available_stat:
-                    raise ValueOutOfRange(
-                        "This option is not supported. Please choose a valid menu option")
+            Returns:
+                None
+        """
+        if dataset is None:
+            dataset = self._dataset
 
-                elif choice_stat == "all":
-                    # changing to what "all" actually stands for
-                    choice_stat = ["mean", "median", "min", "max"]
-                    break
+        memory_before = dataset.memory_usage(deep=True).sum()
 
-                else:
-                    break
+        # the index levels hold every name once already, so only their type changes
+        dataset.index = dataset.index.set_levels([pd.CategoricalIndex(level) for level in dataset.index.levels])
 
-            except ValueOutOfRange as e:
-                print("\n" + color.red + str(e) + color.reset)
+        for column in dataset.columns:
+            values = dataset[column]
 
-        # now we have got all three choice_region_type, choice_column, and choice_stat. So running the aggregate
+            if column == "Year":
+                dataset[column] = pd.to_numeric(values, downcast="integer")
 
-        print("\n" + color.green +
-              "Here are the requested stats" + color.reset + "\n")
-        print(self._dataset.groupby([choice_region_type, "Year"])[
-              choice_column].aggregate(choice_stat).unstack())
+            elif pd.api.types.is_object_dtype(values) or pd.api.types.is_string_dtype(values):
+                dataset[column] = values.astype("category")
 
+            elif pd.api.types.is_float_dtype(values) and self._float32_tolerance is not None:
+                downcast = values.astype("float32")
+                nonzero = values != 0
+                error = ((downcast[nonzero] - values[nonzero]) / values[nonzero]).abs().max()
 
+                if not error > self._float32_tolerance:
+                    dataset[column] = downcast
 
-    def higher_gdp_than_usa(self, option_num):
+        # reading the dataset from __dict__, so converting other rows never runs a lazy stage
+        if dataset is self.__dict__.get("_dataset"):
+            self._dataset_changed()
+
+        memory_after = dataset.memory_usage(deep=True).sum()
+
+        print("Memory of the dataset: {:,} bytes before, {:,} bytes after".format(memory_before, memory_after))
+
+
+
+    @profiled_stage(inputs=("_dataset",), outputs=("_dataset",))
+    def _additional_statistics(self, dataset=None, reference_rows=None):
         """
-        Method to show use of additional column "GDP per capita wrt USA". This method lists the
-        countries that have had higher GDP per capita than the USA, and the years in which
-        the said figure was higher
+        Method to add the derived columns of the indicator registry to the dataframe, calculated by
+        DataFrame.eval in one pass
 
             Parameters:
-                option_num (int): program menu option number
+                dataset (dataframe): merged rows to add the columns to, the dataset if None. The rows of
+                                     a year must all be there, as some columns compare the countries of a year
+                reference_rows (dataframe): merged rows the values of the reference countries are looked up in,
+                                            the rows the columns are added to if None
 
             Returns:
                 None
         """
-        clear_console()
+        if dataset is None:
+            dataset = self._dataset
 
-        print("\n" + color.yellow +
-              "Menu option " + str(int(option_num)) +
-              ": Countries with higher GDP per capita than United States of America and the corresponding year" + color.reset)
+        if reference_rows is None:
+            reference_rows = dataset
 
-        higher_gdp = self._dataset[self._dataset["GDP per capita wrt USA"] > 1].reset_index(
-        )
+        derived_columns = self._registry["derived_columns"]
 
-        print("\n\n" + color.green +
-              "Here are the requested stats" + color.reset + "\n")
+        # values of the reference countries in the same year as every row, for the expressions
+        references = {name: dataset["Year"].map(self._reference_by_year(reference["column"], reference["country"],
+                                                                         reference_rows))
+                      for (name, reference) in self._registry["references"].items()}
 
-        higher_gdp = higher_gdp[["Country", "Year"]
-                                ].sort_values(by=["Country", "Year"])
-        print(higher_gdp.to_string(index=False))
+        # DataFrame.eval cannot assign to names needing backticks, so the columns are calculated in one
+        # pass under plain names, and then renamed. A registry may declare no derived columns at all
+        expressions = ["_derived_" + str(i) + " = " + expression for (i, expression) in enumerate(derived_columns.values())]
 
+        if expressions:
+            dataset.eval("\n".join(expressions), local_dict=references, inplace=True)
+            dataset.rename(columns={"_derived_" + str(i): name for (i, name) in enumerate(derived_columns)}, inplace=True)
 
+        # printing what column has been added - to make it easy for TAs
+        for name in derived_columns:
+            print("Added column \'" + name + "\' to the dataset")
 
-    def pivot_plot(self, option_num):
+        # dropping the null values which may arise for the years without the reference countries
+        dataset.dropna(inplace=True)
+
+        # reading the dataset from __dict__, so calculating other rows never runs a lazy stage
+        if dataset is self.__dict__.get("_dataset"):
+            self._dataset_changed()
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def ratio_to_reference(self, column, reference_country, dataset=None):
         """
-        Method to plot graphs on Population Rate, Fertility Rate, Life Expectancy, and Urban Population
-        for four different countries
+        Method to calculate the ratio of a numeric column of every row to the same column of a reference
+        country in the same year
 
             Parameters:
-                option_num (int): program menu option number
+                column (str): numeric column of the dataset
+                reference_country (str): country whose value is the denominator of the ratio
+                dataset (dataframe): rows to calculate the ratio of, the dataset if None
 
             Returns:
-                None
+                series: ratio aligned with the rows, NaN for the years the reference country has no data
         """
-        clear_console()
+        if dataset is None:
+            dataset = self._dataset
 
-        print("\n" + color.yellow +
-              "Menu option " + str(int(option_num)) + ": Plotting graphs using pivot table" + color.reset)
-        print("\nWe will compare four countries on the basis of -")
-        print(" - Population annual rate of increase (percent)")
-        print(" - Total fertility rate (children per women)")
-        print(" - Life expectancy at birth for both sexes (years)")
-        print(" - Urban population (percent)")
+        return dataset[column] / self.reference_values(column, reference_country, dataset)
 
-        print("\n" + color.magenta +
-              "Please enter four distinct countries, one at a time. eg. United States of America" + color.reset + "\n")
 
-        # creating an empty list of countries that will hold user inputs
-        countries = []
 
-        for i in range(0, 4):
-            while(True):
-                try:
-                    choice_country = input("Enter country " + str(i+1) + ": ")
+    @profiled_stage(inputs=("_dataset",))
+    def reference_values(self, column, reference_country, dataset=None):
+        """
+        Method to get the value of a numeric column of a reference country in the same year as every
+        row. The values of the reference country are looked up once per year and mapped onto all the
+        rows in one operation
 
-                    # if its a valid country
-                    if(choice_country in self._dataset.index.get_level_values(2).values):
-                        # now check if its not already added
-                        if(choice_country not in countries):
-                            countries.append(choice_country)
-                            i = i + 1
-                            break
+            Parameters:
+                column (str): numeric column of the dataset
+                reference_country (str): country whose values are looked up
+                dataset (dataframe): rows to get the values for, the dataset if None
 
-                        # oops, user tried to re-enter a country
-                        else:
-                            raise ValueDuplicate(
-                                "You have already entered this country. Please enter a different country")
+            Returns:
+                series: values aligned with the rows, NaN for the years the reference country has no data
+        """
+        if dataset is None:
+            dataset = self._dataset
 
-                    # if its an invalid country
-                    else:
-                        raise ValueOutOfRange(
-                            "This is not a valid country. Please enter a valid country")
+        return dataset["Year"].map(self._reference_by_year(column, reference_country, dataset))
 
-                except ValueOutOfRange as e:
-                    print("\n" + color.red + str(e) + color.reset + "\n")
 
-                except ValueDuplicate as e:
-                    print("\n" + color.red + str(e) + color.reset + "\n")
 
-        # sort the list countries. Sorting makes sure plotting and legends are aligned
-        countries.sort()
+    def _reference_by_year(self, column, reference_country, dataset):
+        """
+        Method to get the values of a numeric column of a reference country, keyed by the year
 
-        # now we have got four different countries, lets plot the graphs
+            Parameters:
+                column (str): numeric column of the dataset
+                reference_country (str): country whose values are looked up
+                dataset (dataframe): rows holding the reference country
 
-        # creating IndexSlice object
-        idx = pd.IndexSlice
+            Returns:
+                series: values of the reference country, with the years as index
+        """
+        if column not in dataset.columns or column == "Year" or not pd.api.types.is_numeric_dtype(dataset[column]):
+            raise ValueOutOfRange("\'" + str(column) + "\' is not a numeric column of the dataset")
 
-        # get a subset of dataframe with only four countries and required columns
-        subset = self._dataset.loc[idx[:, :, countries, idx[:]]]
+        if reference_country not in dataset.index.get_level_values("Country"):
+            raise ValueOutOfRange("\'" + str(reference_country) + "\' is not a country of the dataset")
 
-        # choose only the required columns from the subset
-        subset = subset.loc[idx[:], idx["Year",
-                                        "Population annual rate of increase (percent)",
-                                        "Total fertility rate (children per women)",
-                                        "Life expectancy at birth for both sexes (years)",
-                                        "Urban population (percent)"]]
+        # lookup table of the reference country's value per year
+        reference = dataset.xs(reference_country, level="Country")
 
-        # creating pivot table
-        pivot_data = subset.pivot_table(index="Year", columns="Country")
+        return pd.Series(reference[column].values, index=reference["Year"].values)
 
-        # printing pivot table
-        print("\n" + color.green +
-              "Pivot table for the above countries" + color.reset + "\n")
-        print(pivot_data)
 
-        # creating plots
-        # plt.style.use('classic')      # not using custom style
-        fig = plt.figure(1)
-        fig.set_size_inches(20, 10)
-        fig.suptitle("Comparison of countries on various statistical data")
-
-        (axs0, axs1) = fig.subplots(2, 2)
-
-        # plot for Population annual rate of increase (percent)
-        axs0[0].set_title("Population annual rate of increase (percent)")
-        axs0[0].set(xlabel="Year", ylabel="Percentage")
-        axs0[0].plot(
-            pivot_data.loc[:, idx["Population annual rate of increase (percent)"]])
-        axs0[0].legend(countries, loc="upper right")
-
-        # plot for Total fertility rate (children per women)
-        axs0[1].set_title("Total fertility rate (children per women)")
-        axs0[1].set(xlabel="Year", ylabel="Children per women")
-        axs0[1].plot(
-            pivot_data.loc[:, idx["Total fertility rate (children per women)"]])
-        axs0[1].legend(countries, loc="upper right")
-
-        # plot for Life expectancy at birth for both sexes (years)
-        axs1[0].set_title("Life expectancy at birth for both sexes (years)")
-        axs1[0].set(xlabel="Year", ylabel="Years")
-        axs1[0].plot(
-            pivot_data.loc[:, idx["Life expectancy at birth for both sexes (years)"]])
-        axs1[0].legend(countries, loc="upper right")
-
-        # plot for Urban population (percent)
-        axs1[1].set_title("Urban population (percent)")
-        axs1[1].set(xlabel="Year", ylabel="Percentage")
-        axs1[1].plot(pivot_data.loc[:, idx["Urban population (percent)"]])
-        axs1[1].legend(countries, loc="upper right")
 
-        # save the plot in project directory
-        fig.savefig("Plots.png", dpi=100)
+    @profiled_stage(inputs=("_dataset",), outputs=("_dataset",))
+    def refresh(self, default_location=None, custom_location=None):
+        """
+        Method to ingest a newer release of the source files incrementally, eg. when a new UN SYB
+        release adds years. The new release is imported and merged, and compared with the dataset
+        on (Country, Year): only the new or changed rows are merged into the dataset, and the
+        additional columns and the aggregate cube are recalculated only for the years having such
+        rows. Rows missing from the new release are kept. The on-disk cache then follows the new
+        source files. The dataset is only replaced once the whole release has been ingested, so a
+        release failing to import or merge leaves it as it was, and it is kept as it is when nothing
+        has changed
+
+            Parameters:
+                default_location (str): relative path to location of the provided files of the new release,
+                                        the current location if None
+                custom_location (str): relative path to location of the additional files of the new release,
+                                       the current location if None
+
+            Returns:
+                dict: number of new and changed rows, and the years having them
+        """
+        default_location = default_location or self._default_location
+        custom_location = custom_location or self._custom_location
+
+        # accessing the dataset first, so the current release is loaded before the new one is imported
+        dataset = self._dataset
+        cube_current = self._cube is not None and self._cube.version == self._dataset_version
+
+        print("\n[Refresh] Importing and merging the new release")
+
+        # the new release is imported and merged by another DataAnalysis, so nothing of this one changes
+        # until the release has been ingested
+        builder = DataAnalysis(default_location, custom_location, cache_dir=self._cache.cache_dir,
+                               interactive=self._interactive, float32_tolerance=self._float32_tolerance,
+                               import_workers=self._import_workers, registry=self._registry, query_cache_size=0)
+        builder._import_data(default_location, custom_location)
+        builder._merge_data()
+        builder._optimize_dtypes()
+        release = builder._dataset
+
+        # Finding the new or changed rows
+        # ----------------------------------------
+        merged_columns = list(release.columns)
+        keys = ["Country", "Year"]
+
+        current = dataset[merged_columns].reset_index()
+        current["Country"] = current["Country"].astype(str)
+        new = release.reset_index()
+        new["Country"] = new["Country"].astype(str)
+
+        compared = new.merge(current, on=keys, how="left", suffixes=("", " current"), indicator=True)
+        added = (compared["_merge"] == "left_only").to_numpy()
+        changed = ~added & (compared[[column + " current" for column in merged_columns if column != "Year"]].to_numpy() !=
+                            compared[[column for column in merged_columns if column != "Year"]].to_numpy()).any(axis=1)
+
+        updates = release[added | changed]
+        years = sorted(updates["Year"].unique().tolist())
+        # ----------------------------------------
+
+        # Recalculating the additional columns of the affected years
+        # ----------------------------------------
+        if years:
+            replaced = pd.MultiIndex.from_frame(updates.reset_index()[keys].astype({"Country": str}))
+            kept = dataset[~pd.MultiIndex.from_arrays([dataset.index.get_level_values("Country").astype(str),
+                                                        dataset["Year"]]).isin(replaced)]
+
+            in_years = kept["Year"].isin(years)
+            recalculated = pd.concat([kept.loc[in_years, merged_columns], updates])
+
+            # the reference countries are looked up in all the rows of the updated dataset, so the rows of a
+            # year without them are dropped, like a full build drops them
+            self._additional_statistics(recalculated, pd.concat([kept[merged_columns], updates]))
+
+            # the rows dropped with their year are neither new nor changed in the dataset
+            survived = replaced.isin(pd.MultiIndex.from_arrays(
+                [recalculated.index.get_level_values("Country").astype(str), recalculated["Year"]]))
+            updated_rows = np.flatnonzero(added | changed)
+            added[updated_rows[~survived]] = False
+            changed[updated_rows[~survived]] = False
+            years = sorted(updates.loc[survived, "Year"].unique().tolist())
+
+            # back to the order of a fully rebuilt dataset, sorted on the index and then the year
+            updated = pd.concat([kept[~in_years], recalculated[dataset.columns]])
+            updated = updated.set_index("Year", append=True).sort_index().reset_index("Year")
+            self._optimize_dtypes(updated)
+        # ----------------------------------------
+
+        print("[Refresh] {:,} new and {:,} changed rows, in the years {}".format(
+            int(added.sum()), int(changed.sum()), ", ".join(str(year) for year in years) or "none"))
+
+        # Replacing the imported dataframes, and the dataset if it has changed
+        # ----------------------------------------
+        for name in self._imported_frames:
+            setattr(self, name, getattr(builder, name))
+
+        self._source_fingerprints = builder._source_fingerprints
+
+        if years:
+            self._dataset = updated
+
+            if cube_current:
+                self._cube.update(self._dataset, years, self._dataset_version)
+        # ----------------------------------------
+
+        # the cache now follows the files of the new release
+        self._default_location = default_location
+        self._custom_location = custom_location
+        self._cache.set_sources(self._source_files(default_location, custom_location))
+        self._save_cached_data()
+
+        print("[Refresh] " + color.green + "complete" + color.reset)
+
+        return {"added": int(added.sum()), "changed": int(changed.sum()), "years": years}
+
+
+
+    def _check_null(self):
+        """
+        Method to check null values in the dataframe.
+
+            Parameters:
+                none
+
+            Returns:
+                None
+        """
+        print(self._dataset.isnull().any())
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def export_dataset(self, option_num=0, filename="Export UN Data.xlsx", export_format=None, columns=None, query=None):
+        """
+        Method to export the entire merged hierarchical dataframe, or a slice of it, into a CSV, Parquet
+        or Excel file, with default filename
+
+            Parameters:
+                option_num (int): program menu option number
+                filename (str): path of the file to create
+                export_format (str): one of "csv", "parquet" or "xlsx", chosen by the file extension if None
+                columns (list): columns to export, "Year" is always kept, all the columns if None
+                query (str): pandas query expression the exported rows must satisfy, all the rows if None
+
+            Returns:
+                dict: report of the export as returned by data_export.export_frame, None if the export failed
+        """
+        if option_num != 0:
+            clear_console()
+
+            print("\n" + color.yellow +
+                  "Menu option " + str(int(option_num)) + ": Exporting merged hierarchical dataframe" + color.reset)
+
+        try:
+            report = export_frame(self._dataset, filename, export_format, columns, query)
+            print("\nFile \'" + filename + "\' created")
+            print("{:,} rows, {:,} bytes written in {:.2f} seconds ({:,.0f} rows/sec)\n".format(
+                report["rows"], report["bytes"], report["seconds"], report["rows_per_sec"]))
+            return report
+
+        except Exception as e:
+            print("\n" + color.red + "An exception occurred during export. Please check the below message and try again" + color.reset + "\n")
+            print(e)
+            return None
+
+
+
+    def imported_dataframes(self):
+        """
+        Method to get the dataframes imported from Excel or CSV
+
+            Parameters:
+                none
+
+            Returns:
+                dict: imported dataframes keyed by their description
+        """
+        return {"UN Codes": self._unc_data,
+                "UN Life Expectancy and Fertility": self._liv_data,
+                "UN Urban Population": self._pop_data,
+                "UN Gross Domestic Product": self._gdp_data}
+
+
+
+    def print_imported_dataframes(self, option_num):
+        """
+        Method to print dataframes imported from Excel or CSV
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) + ": Printing imported dataframes" + color.reset)
+
+        for name, frame in self.imported_dataframes().items():
+            print("\n\n" + color.green + name + " dataframe" + color.reset + "\n")
+            print(frame)
+
+
+
+    def _memoized(self, key, calculate):
+        """
+        Method to get the answer of a query from the query cache, calculating it if it is not cached
+        for the current version of the dataset
+
+            Parameters:
+                key (tuple): name of the query and its arguments, validated and normalized so that
+                             equivalent arguments give the same key
+                calculate (function): function without arguments calculating the answer
+
+            Returns:
+                the answer, shared with later calls, so it must not be modified
+        """
+        # accessing the dataset first, as producing it changes the version
+        self._dataset
+
+        return self._queries.get(key, self._dataset_version, calculate)
+
+
+
+    def query_cache_info(self):
+        """
+        Method to get the hits and misses of the query cache, to choose its size
+
+            Parameters:
+                none
+
+            Returns:
+                dict: hits, misses, evictions, hit rate, number of answers kept and largest number of answers
+        """
+        return self._queries.info()
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def aggregate_stats(self):
+        """
+        Method to get the aggregate stats for the entire dataset
+
+            Parameters:
+                none
+
+            Returns:
+                dataframe: aggregate stats of every column. It is shared with later calls, so it must not be modified
+        """
+        return self._memoized(("aggregate_stats",), self._dataset.describe)
+
+
+
+    def print_aggregate_stats(self, option_num):
+        """
+        Method to print aggregate stats for the entire dataset
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) + ": Printing aggregate statistics for the entire dataset" + color.reset)
+
+        print("\n\n" + color.green +
+              "Aggregate statistics for the entire dataset" + color.reset + "\n")
+        print(self.aggregate_stats())
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def group_by(self, region_type, column, stat):
+        """
+        Method to get one or several aggregate stats of a column grouped by UN Region/UN Sub-Region and year
+
+            Parameters:
+                region_type (str): either "UN Region" or "UN Sub-Region"
+                column (str): data column to aggregate
+                stat (str): one of "mean", "median", "min", "max", or "all" for all four of them
+
+            Returns:
+                dataframe: stats with the regions as rows and the years as columns. It is shared with
+                           later calls, so it must not be modified
+        """
+        if region_type not in self.available_region_types:
+            raise ValueOutOfRange(
+                "\'" + str(region_type) + "\' is not supported. Please choose one of " + ", ".join(self.available_region_types))
+
+        if column not in self._dataset.columns or column == "Year":
+            raise ValueOutOfRange(
+                "\'" + str(column) + "\' is not a data column of the dataset")
+
+        if stat not in self.available_stats:
+            raise ValueOutOfRange(
+                "\'" + str(stat) + "\' is not supported. Please choose one of " + ", ".join(self.available_stats))
+
+        elif stat == "all":
+            # changing to what "all" actually stands for
+            stat = self.available_stats[:-1]
+
+        return self._memoized(("group_by", region_type, column, stat if isinstance(stat, str) else tuple(stat)),
+                              lambda: self._aggregate_cube().lookup(region_type, column, stat))
+
+
+
+    def _aggregate_cube(self):
+        """
+        Method to get the aggregate cube of the dataset, building it again if the dataset has changed
+        since the cube was built
+
+            Parameters:
+                none
+
+            Returns:
+                AggregateCube: aggregate stats of the dataset grouped by UN Region/UN Sub-Region and year
+        """
+        # accessing the dataset first, as producing it changes the version
+        dataset = self._dataset
+
+        if self._cube is None or self._cube.version != self._dataset_version:
+            self._cube = AggregateCube(dataset, self._dataset_version)
+
+        return self._cube
+
+
+
+    def group_by_stats(self, option_num):
+        """
+        Method to print the one or several aggregate stats grouped by UN Region/UN Sub-Region ranging in years for the dataframe.
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) + ": Aggregation stats grouped by UN Region/UN Sub-Region" + color.reset)
+
+        while(True):
+            try:
+                print("\n\n" + color.magenta +
+                      "[Q1] How do you want to get aggregate stats? By \"UN Region\" or By \"UN Sub-Region\"" + color.reset)
+                choice_region_type = input(
+                    "\nEnter either \"UN Region\" or \"UN Sub-Region\" (without the quotes): ")
+
+                if choice_region_type in self.available_region_types:
+                    break
+
+                else:
+                    raise ValueOutOfRange(
+                        "This option is not supported. Please choose a valid menu option")
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+        # here we have got choice_region_type
+
+        while(True):
+            try:
+                print("\n" + color.magenta + "[Q2] Which data column you want the aggregate stats for?" +
+                      color.reset + "\n\nPlease enter one of the below possible options (dont enter leading hypen):\n")
+
+                for col in range(1, self._dataset.columns.size):
+                    print(" - " + self._dataset.columns[col])
+
+                choice_column = input("\nEnter your choice: ")
+
+                if choice_column in self._dataset.columns and choice_column != "Year":
+                    break
+
+                else:
+                    raise ValueOutOfRange(
+                        "This option is not supported. Please choose a valid menu option")
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+        # now we have got choice_region_type and choice_column
+
+        while(True):
+            try:
+                print("\n" + color.magenta + "[Q3] What aggregate stats you want?" + color.reset +
+                      "\n\nPlease enter one of the below possible options (dont enter leading hypen):\n")
+
+                for col in range(0, len(self.available_stats)):
+                    print(" - " + self.available_stats[col])
+
+                choice_stat = input("\nEnter your choice: ")
+
+                if choice_stat not in self.available_stats:
+                    raise ValueOutOfRange(
+                        "This option is not supported. Please choose a valid menu option")
+
+                else:
+                    break
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+        # now we have got all three choice_region_type, choice_column, and choice_stat. So running the aggregate
+
+        print("\n" + color.green +
+              "Here are the requested stats" + color.reset + "\n")
+        print(self.group_by(choice_region_type, choice_column, choice_stat))
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def higher_gdp_countries(self):
+        """
+        Method to get the countries that have had higher GDP per capita than the USA, and the years
+        in which the said figure was higher
+
+            Parameters:
+                none
+
+            Returns:
+                dataframe: "Country" and "Year" columns, sorted on both. It is shared with later calls,
+                           so it must not be modified
+        """
+        def calculate():
+            higher_gdp = self.select_countries("GDP per capita (US dollars)", ">", 1, "United States of America").reset_index()
+
+            return higher_gdp[["Country", "Year"]].sort_values(by=["Country", "Year"])
+
+        return self._memoized(("higher_gdp_countries",), calculate)
+
+
+
+    def higher_gdp_than_usa(self, option_num):
+        """
+        Method to list the countries that have had higher GDP per capita than the USA, and the years
+        in which the said figure was higher. The rows are found by select_countries, comparing
+        "GDP per capita (US dollars)" with the USA in the same year
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) +
+              ": Countries with higher GDP per capita than United States of America and the corresponding year" + color.reset)
+
+        print("\n\n" + color.green +
+              "Here are the requested stats" + color.reset + "\n")
+
+        print(self.higher_gdp_countries().to_string(index=False))
+
+
+
+    def _rank_index(self):
+        """
+        Method to get the rank index of the dataset, building it again if the dataset has changed
+        since the index was built
+
+            Parameters:
+                none
+
+            Returns:
+                RankIndex: sorted rows of every year of the dataset
+        """
+        # accessing the dataset first, as producing it changes the version
+        dataset = self._dataset
+
+        if self._ranking is None or self._ranking.version != self._dataset_version:
+            self._ranking = RankIndex(dataset, self._dataset_version)
+
+        return self._ranking
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def select_countries(self, column, comparator, threshold, reference_country=None):
+        """
+        Method to find the rows of the dataset whose value satisfies a comparison with a threshold.
+        With a reference country, the value is compared with the threshold times the value of the
+        reference country in the same year, eg. GDP per capita > 1 x the USA
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                comparator (str): one of ">", ">=", "<", "<=", "==" or "!="
+                threshold (float): value compared with
+                reference_country (str): country the threshold is relative to, by name, alias or numeric code,
+                                         the threshold is absolute if None
+
+            Returns:
+                dataframe: "Year" and the data column of the rows, in the order of the dataset. It is
+                           shared with later calls, so it must not be modified
+        """
+        self.compared_data_columns([column])
+
+        if comparator not in comparators:
+            raise ValueOutOfRange(
+                "\'" + str(comparator) + "\' is not supported. Please choose one of " + ", ".join(comparators))
+
+        if reference_country is not None:
+            reference_country = self.resolve_country(reference_country)
+
+        def calculate():
+            ranking = self._rank_index()
+            references = None
+
+            if reference_country is not None:
+                references = self._reference_by_year(column, reference_country, ranking.dataset).to_dict()
+
+            return ranking.dataset.iloc[ranking.select(column, comparator, float(threshold), references)][["Year", column]]
+
+        return self._memoized(("select_countries", column, comparator, float(threshold), reference_country), calculate)
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def top_countries(self, column, n=10, region_type=None, ascending=False):
+        """
+        Method to find the n countries ranked first on a data column in every year, or in every
+        UN Region/UN Sub-Region and year
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                n (int): number of countries of every year or region
+                region_type (str): either "UN Region" or "UN Sub-Region", every year as a whole if None
+                ascending (bool): if True the countries with the lowest values come first, else the highest
+
+            Returns:
+                dataframe: "Year", the region, "Rank" within the year or region, "Country" and the data column,
+                           sorted on the year, the region and the rank. It is shared with later calls,
+                           so it must not be modified
+        """
+        self.compared_data_columns([column])
+
+        if region_type is not None and region_type not in self.available_region_types:
+            raise ValueOutOfRange(
+                "\'" + str(region_type) + "\' is not supported. Please choose one of " + ", ".join(self.available_region_types))
+
+        if int(n) != n or n < 1:
+            raise ValueOutOfRange(
+                "\'" + str(n) + "\' is not a valid number of countries. Please choose a whole number of at least 1")
+
+        def calculate():
+            ranking = self._rank_index()
+            (positions, ranks) = ranking.top(column, int(n), region_type, bool(ascending))
+
+            top = ranking.dataset.iloc[positions][["Year", column]].reset_index()
+            top["Rank"] = ranks
+
+            return top[["Year"] + ([region_type] if region_type is not None else []) + ["Rank", "Country", column]]
+
+        return self._memoized(("top_countries", column, int(n), region_type, bool(ascending)), calculate)
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def rank_changes(self, column, ascending=False):
+        """
+        Method to get the rank of every country among the countries of every year on a data column,
+        and how many places it has moved up since its previous year of data
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                ascending (bool): if True the lowest value is ranked 1, else the highest
+
+            Returns:
+                dataframe: "Year", the data column, "Rank" and "Rank change" of every row, in the order
+                           of the dataset. The first year of a country has no rank change. It is shared
+                           with later calls, so it must not be modified
+        """
+        self.compared_data_columns([column])
+
+        def calculate():
+            ranking = self._rank_index()
+
+            ranks = ranking.dataset[["Year", column]].copy()
+            ranks["Rank"] = ranking.ranks(column, bool(ascending))
+            ranks["Rank change"] = ranking.rank_changes(column, bool(ascending))
+
+            return ranks
+
+        return self._memoized(("rank_changes", column, bool(ascending)), calculate)
+
+
+
+    def country_index(self):
+        """
+        Method to get the index of the countries of the dataset, building it again if the dataset has
+        changed since it was built
+
+            Parameters:
+                none
+
+            Returns:
+                CountryIndex: index of the countries having data in the dataset
+        """
+        # accessing the dataset first, as producing it changes the version
+        dataset = self._dataset
+
+        if self._countries is None or self._countries_version != self._dataset_version:
+            self._countries = CountryIndex(dataset.index.levels[2][dataset.index.codes[2]].unique(),
+                                           codes=self._country_codes)
+            self._countries_version = self._dataset_version
+
+        return self._countries
+
+
+
+    def resolve_country(self, text):
+        """
+        Method to find the country of the dataset for a name, alias or numeric code
+
+            Parameters:
+                text (str): name, alias or numeric code of the country
+
+            Returns:
+                str: name of the country in the dataset
+        """
+        country = self.country_index().resolve(text)
+
+        if country is None:
+            message = "\'" + str(text) + "\' is not a valid country. Please enter a valid country"
+            suggestions = self.country_index().suggest(text)
+
+            if suggestions:
+                message += ". Did you mean " + " or ".join("\'" + suggestion + "\'" for suggestion in suggestions) + "?"
+
+            raise ValueOutOfRange(message)
+
+        return country
+
+
+
+    def compared_data_columns(self, columns=None):
+        """
+        Method to validate the data columns the countries are compared on
+
+            Parameters:
+                columns (list): data columns of the dataset, the compared_columns if None
+
+            Returns:
+                list: the data columns, in the same order
+        """
+        if columns is None:
+            return list(self.compared_columns)
+
+        columns = list(columns)
+
+        if not columns:
+            raise ValueOutOfRange(
+                "Please choose at least one data column to compare the countries on")
+
+        for column in columns:
+            if column not in self._dataset.columns or column == "Year" or \
+                    not pd.api.types.is_numeric_dtype(self._dataset[column]):
+                raise ValueOutOfRange(
+                    "\'" + str(column) + "\' is not a data column of the dataset")
+
+        if len(set(columns)) != len(columns):
+            raise ValueDuplicate(
+                "Data columns must be distinct. Please choose different data columns")
+
+        return columns
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def compare_countries(self, countries, columns=None):
+        """
+        Method to build the pivot table comparing any number of countries on any data columns over
+        the years. The pivot table of every selection is kept in the query cache, so it is built only
+        once however many times the same countries are compared or plotted
+
+            Parameters:
+                countries (list): distinct countries of the dataset, by name, alias or numeric code
+                columns (list): data columns to compare the countries on, the compared_columns if None
+
+            Returns:
+                dataframe: pivot table with the years as rows, and the data column and country as
+                           columns. It is shared with later calls, so it must not be modified
+        """
+        countries = [self.resolve_country(country) for country in countries]
+        columns = self.compared_data_columns(columns)
+
+        if not countries:
+            raise ValueOutOfRange(
+                "Please enter at least one country to compare")
+
+        if len(set(countries)) != len(countries):
+            raise ValueDuplicate(
+                "Countries must be distinct. Please enter different countries")
+
+        # the pivot table does not depend on the order the countries were entered in
+        countries = sorted(countries)
+
+        def calculate():
+            # creating IndexSlice object
+            idx = pd.IndexSlice
+
+            # get a subset of dataframe with only the countries and required columns
+            subset = self._dataset.loc[idx[:, :, countries], ["Year"] + columns]
+
+            # creating pivot table
+            return pivot_countries(subset)
+
+        return self._memoized(("compare_countries", tuple(countries), tuple(columns)), calculate)
+
+
+
+    def plot_countries(self, pivot_data, filename="Plots.png", columns=None):
+        """
+        Method to plot the pivot table built by compare_countries and save the plot as an image. The
+        plot is drawn off-screen, reusing the same figure for every call
+
+            Parameters:
+                pivot_data (dataframe): pivot table built by compare_countries
+                filename (str): path of the image to save
+                columns (list): data columns of the pivot table to plot, the compared_columns if None
+
+            Returns:
+                figure: matplotlib figure of the plot
+        """
+        if self._comparison_figure is None:
+            self._comparison_figure = ComparisonFigure()
+
+        return self._comparison_figure.render(pivot_data, self.compared_columns if columns is None else columns,
+                                              filename)
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def publish_snapshot(self, directory=None):
+        """
+        Method to publish a read-only snapshot of the dataset as memory-mapped NumPy arrays, which
+        worker processes attach with dataset_snapshot.attach_snapshot instead of unpickling their
+        own copy of the rows. The snapshot is published once per version of the dataset, into a new
+        directory, and the previous one is deleted, which leaves it mapped in the processes still
+        attached to it. The last one is deleted when the program exits
+
+            Parameters:
+                directory (str): directory holding the snapshots, "snapshot" in the cache directory if None
+
+            Returns:
+                str: the directory of the snapshot, whose rows are sorted on the index and the year
+        """
+        if self._snapshot is not None and self._snapshot_version == self._dataset_version and \
+                os.path.isdir(self._snapshot):
+            return self._snapshot
+
+        if directory is None:
+            directory = os.path.join(self._cache.cache_dir, "snapshot")
+
+        # the rows are sorted first, so the rows of every UN Sub-Region are next to each other
+        (dataset, _) = country_rows(self._dataset)
+        name = "{}-{}-{}".format(self._dataset_version, os.getpid(), time.time_ns())
+        snapshot = write_snapshot(dataset, os.path.join(directory, name))
+
+        if self._snapshot is None:
+            # the snapshots are only shared with the workers of this process, so they go when it exits
+            atexit.register(self._remove_snapshot)
+
+        self._remove_snapshot()
+        self._snapshot = snapshot
+        self._snapshot_version = self._dataset_version
+
+        return snapshot
+
+
+
+    def _remove_snapshot(self):
+        """
+        Method to delete the snapshot published by publish_snapshot, if any. Processes attached to
+        it keep their mapping of the arrays
+
+            Parameters:
+                none
+
+            Returns:
+                None
+        """
+        if self._snapshot is not None:
+            shutil.rmtree(self._snapshot, ignore_errors=True)
+
+
+
+    def plot_sub_regions(self, output_dir="Plots", columns=None, workers=None):
+        """
+        Method to plot the comparison of all the countries of every UN Sub-Region, one image per
+        UN Sub-Region. The charts are rendered by a pool of worker processes, which attach the
+        memory-mapped snapshot of the dataset and each read only the rows of its UN Sub-Region,
+        and the progress is printed as they finish
+
+            Parameters:
+                output_dir (str): directory to save the images into, created if missing
+                columns (list): data columns to compare the countries on, the compared_columns if None
+                workers (int): number of worker processes, the number of CPUs if None, and 1 renders
+                               the charts in this process
+
+            Returns:
+                list: one dict per chart, with the UN Sub-Region, its number of countries, the image
+                      and the seconds taken to render it
+        """
+        columns = self.compared_data_columns(columns)
+
+        if workers is not None and workers < 1:
+            raise ValueOutOfRange(
+                "\'" + str(workers) + "\' is not a valid number of worker processes")
+
+        os.makedirs(output_dir, exist_ok=True)
+
+        # the rows of a UN Sub-Region are next to each other once sorted, so a job is a slice of rows
+        (dataset, _) = country_rows(self._dataset)
+        sub_regions = dataset.index.codes[1]
+        bounds = np.r_[np.flatnonzero(np.r_[True, sub_regions[1:] != sub_regions[:-1]]), len(dataset)]
+        jobs = []
+
+        for (start, stop) in zip(bounds[:-1], bounds[1:]):
+            sub_region = str(dataset.index.levels[1][sub_regions[start]])
+            filename = os.path.join(output_dir, re.sub(r"[^\w-]+", "_", sub_region).strip("_") + ".png")
+            jobs.append((sub_region, int(start), int(stop), filename))
+
+        print("\nPlotting " + str(len(jobs)) + " UN Sub-Regions into \'" + output_dir + "\' with " +
+              str(workers or os.cpu_count()) + " worker process(es)\n")
+
+        report = []
+        start = time.perf_counter()
+
+        def finished(job, seconds):
+            report.append({"UN Sub-Region": job[0],
+                           "countries": len(np.unique(dataset.index.codes[2][job[1]:job[2]])),
+                           "file": job[3],
+                           "seconds": seconds})
+            print("[{}/{}] {} ({} countries) saved as \'{}\' in {:.2f} seconds".format(
+                len(report), len(jobs), job[0], report[-1]["countries"], job[3], seconds))
+
+        if workers == 1:
+            for job in jobs:
+                finished(job, render_comparison(dataset.iloc[job[1]:job[2]][["Year"] + columns], columns, job[3]))
+
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            from concurrent.futures import as_completed
+
+            snapshot = self.publish_snapshot()
+
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = {executor.submit(render_snapshot_rows, snapshot, job[1], job[2], columns, job[3]): job
+                           for job in jobs}
+
+                for future in as_completed(futures):
+                    finished(futures[future], future.result())
+
+        print("\n{} charts saved in {:.2f} seconds\n".format(len(report), time.perf_counter() - start))
+
+        return report
+
+
+
+    def pivot_plot(self, option_num):
+        """
+        Method to plot graphs on Population Rate, Fertility Rate, Life Expectancy, and Urban Population
+        for several different countries
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) + ": Plotting graphs using pivot table" + color.reset)
+        print("\nWe will compare the countries on the basis of -")
+
+        for column in self.compared_columns:
+            print(" - " + column)
+
+        print("\n" + color.magenta +
+              "Please enter at least two distinct countries, one at a time, and press enter without a country when done. "
+              "eg. United States of America" + color.reset + "\n")
+
+        # creating an empty list of countries that will hold user inputs
+        countries = []
+
+        while(True):
+            try:
+                choice_country = input("Enter country " + str(len(countries) + 1) + ": ")
+
+                if(choice_country.strip() == ""):
+                    if(len(countries) >= 2):
+                        break
+
+                    raise ValueOutOfRange(
+                        "Please enter at least two countries to compare")
+
+                # raises ValueOutOfRange along with suggestions if its an invalid country
+                choice_country = self.resolve_country(choice_country)
+
+                # now check if its not already added
+                if(choice_country not in countries):
+                    countries.append(choice_country)
+
+                # oops, user tried to re-enter a country
+                else:
+                    raise ValueDuplicate(
+                        "You have already entered this country. Please enter a different country")
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset + "\n")
+
+            except ValueDuplicate as e:
+                print("\n" + color.red + str(e) + color.reset + "\n")
+
+        # now we have got the different countries, lets plot the graphs
+        pivot_data = self.compare_countries(countries)
+
+        # printing pivot table
+        print("\n" + color.green +
+              "Pivot table for the above countries" + color.reset + "\n")
+        print(pivot_data)
+
+        # save the plot in project directory
+        self.plot_countries(pivot_data, "Plots.png")
         print("\n\nPlot saved as \'Plots.png\'")
 
         show_now = input("\n" + color.magenta +
                          "Do you want see the plot now? Enter y/Y for yes: " + color.reset)
 
         if(show_now == "y" or show_now == "Y"):
+            # pyplot starts a GUI backend, so it is only loaded when a plot is shown
+            import matplotlib.pyplot as plt
+
+            # the plot is drawn off-screen, so the saved image is what gets shown
+            image = plt.imread("Plots.png")
+            plt.figure(figsize=(image.shape[1] / 100, image.shape[0] / 100))
+            plt.imshow(image)
+            plt.axis("off")
             plt.show()
             return
 
         else:
             return
+
+
+
+    @profiled_stage(inputs=("_dataset",))
+    def time_series(self, columns=None, window=3):
+        """
+        Method to get the growth of every country over the years: the change and the growth per
+        year since the previous year of data of the country, the rolling mean, and the compound
+        annual growth rate from its first to its last year. They are calculated for all the
+        countries at once, and kept in the query cache
+
+            Parameters:
+                columns (list): data columns to calculate the growth of, the growth_columns if None
+                window (int): largest number of years of data of a country in the rolling mean
+
+            Returns:
+                dict: "yearly" time series with one row per country and year, and "cagr" with one
+                      row per country. They are shared with later calls, so they must not be modified
+        """
+        columns = self.compared_data_columns(self.growth_columns if columns is None else columns)
+
+        if int(window) != window or window < 1:
+            raise ValueOutOfRange(
+                "\'" + str(window) + "\' is not a valid window. Please choose a whole number of years of at least 1")
+
+        return self._memoized(("time_series", tuple(columns), int(window)),
+                              lambda: {"yearly": growth_over_years(self._dataset, columns, int(window)),
+                                       "cagr": compound_growth(self._dataset, columns)})
+
+
+
+    def print_time_series(self, option_num):
+        """
+        Method to print the compound annual growth rate, the change, the growth and the rolling mean
+        of every country over the years, for the data columns chosen by the user
+
+            Parameters:
+                option_num (int): program menu option number
+
+            Returns:
+                None
+        """
+        clear_console()
+
+        print("\n" + color.yellow +
+              "Menu option " + str(int(option_num)) + ": Growth of every country over the years" + color.reset)
+
+        print("\n\n" + color.magenta + "[Q1] Which data columns you want the growth of?" + color.reset +
+              "\n\nPlease enter the below possible options one at a time (dont enter leading hypen), " +
+              "and press enter without a column when done:\n")
+
+        for column in self._dataset.columns[1:]:
+            print(" - " + column)
+
+        print("\nPress enter right away for " + " and ".join(self.growth_columns))
+
+        columns = []
+
+        while(True):
+            try:
+                choice_column = input("\nEnter data column " + str(len(columns) + 1) + ": ").strip()
+
+                if choice_column == "":
+                    break
+
+                self.compared_data_columns([choice_column])
+
+                if choice_column in columns:
+                    raise ValueDuplicate(
+                        "You have already entered this data column. Please enter a different data column")
+
+                columns.append(choice_column)
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+            except ValueDuplicate as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+        while(True):
+            try:
+                print("\n" + color.magenta + "[Q2] Over how many years of data should the rolling mean be?" + color.reset)
+                choice_window = input("\nEnter a whole number, or press enter for 3: ").strip()
+                window = 3 if choice_window == "" else int(choice_window)
+
+                growth = self.time_series(columns or None, window)
+                break
+
+            except ValueError:
+                print("\n" + color.red + "Please enter a whole number" + color.reset)
+
+            except ValueOutOfRange as e:
+                print("\n" + color.red + str(e) + color.reset)
+
+        print("\n" + color.green +
+              "Compound annual growth rate (percent per year) from the first to the last year of data" + color.reset + "\n")
+        print(growth["cagr"])
+
+        print("\n" + color.green +
+              "Change and growth per year since the previous year of data, and rolling mean over " +
+              str(window) + " years of data" + color.reset + "\n")
+        print(growth["yearly"])
@@ -0,0 +1,294 @@
+# File:        data_cache.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class DataCache providing a persistent on-disk cache of the imported and merged dataframes
+
+import hashlib
+import json
+import os
+import pandas as pd
+
+
+# bump this whenever the import/merge pipeline changes the shape of the cached dataframes
+CACHE_VERSION = 5
+
+
+class DataCache:
+    """
+    Class to persist the imported and merged dataframes on disk, so that a warm start can skip
+    parsing the Excel/CSV files. The cache is keyed on the size, modification time and SHA-256
+    content hash of every source file, and on the settings the dataframes were built with, and is
+    only considered valid while all of them match.
+
+    Every dataframe is stored as a separate pickle, which keeps the column blocks of the frame
+    (including the MultiIndex of the merged dataset) as-is, so loading needs no re-indexing.
+
+    Attributes:
+        _cache_dir (str):               directory where the cached dataframes and manifest are stored
+        _sources (list):                paths of the source files the cached dataframes are built from
+        _settings (dict):               settings changing the cached dataframes, stored as JSON
+        loaded_fingerprints (dict):     fingerprints of the sources the dataframes last loaded were built from
+
+    Methods:
+        cache_dir:                      Method to get the directory where the cached dataframes are stored
+        fingerprints(paths):            Method to take the fingerprints of source files, before they are read
+        load(names):                    Method to load the cached dataframes if the cache is still valid
+        save(frames, fingerprints):     Method to store the dataframes in the cache along with the fingerprints of the sources
+        set_sources(sources):           Method to change the source files the cached dataframes are built from
+        clear():                        Method to delete every cached dataframe and the manifest
+    """
+
+    _manifest_name = "manifest.json"
+
+    def __init__(self, cache_dir, sources, settings=None):
+        self._cache_dir = cache_dir
+        self._sources = list(sources)
+        self._settings = settings or {}
+        self.loaded_fingerprints = None
+
+
+
+    @property
+    def cache_dir(self):
+        """
+        Method to get the directory where the cached dataframes and manifest are stored
+
+            Parameters:
+                none
+
+            Returns:
+                str: path of the cache directory
+        """
+        return self._cache_dir
+
+
+
+    def _manifest_path(self):
+        return os.path.join(self._cache_dir, self._manifest_name)
+
+
+
+    def _frame_path(self, name):
+        return os.path.join(self._cache_dir, name + ".pkl")
+
+
+
+    @staticmethod
+    def _content_hash(path):
+        """
+        Method to calculate the SHA-256 hash of a file, reading it in chunks
+
+            Parameters:
+                path (str): path of the file
+
+            Returns:
+                str: hexadecimal digest of the file contents
+        """
+        digest = hashlib.sha256()
+
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+
+
+    def _fingerprint(self, path):
+        """
+        Method to build the fingerprint (size, modification time, content hash) of a source file
+
+            Parameters:
+                path (str): path of the source file
+
+            Returns:
+                dict: fingerprint of the file
+        """
+        stat = os.stat(path)
+
+        return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": self._content_hash(path)}
+
+
+
+    def fingerprints(self, paths=None):
+        """
+        Method to take the fingerprints of source files. They are taken before the files are read,
+        and saved along with the dataframes built from them, so a file modified while it is being
+        read invalidates the cache
+
+            Parameters:
+                paths (list): paths of the source files, the sources of the cache if None
+
+            Returns:
+                dict: fingerprint of every file, keyed by its path
+        """
+        return {path: self._fingerprint(path) for path in (self._sources if paths is None else paths)}
+
+
+
+    def _read_manifest(self):
+        try:
+            with open(self._manifest_path(), "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        except (OSError, ValueError):
+            return None
+
+
+
+    def _write_manifest(self, manifest):
+        # write to a temporary file first, so an interrupted write never leaves a half manifest behind
+        temp_path = self._manifest_path() + ".tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+
+        os.replace(temp_path, self._manifest_path())
+
+
+
+    def _is_valid(self, manifest):
+        """
+        Method to check whether the manifest still matches every source file. The content hash is
+        only recalculated when the size matches but the modification time does not, and if the
+        contents turn out to be unchanged the new modification time is recorded in the manifest
+
+            Parameters:
+                manifest (dict): manifest read from the cache directory
+
+            Returns:
+                bool: True if the cached dataframes were built from the current source files
+        """
+        if manifest is None or manifest.get("version") != CACHE_VERSION or manifest.get("settings") != self._settings:
+            return False
+
+        recorded = manifest.get("sources", {})
+
+        if sorted(recorded) != sorted(self._sources):
+            return False
+
+        touched = False
+
+        for path in self._sources:
+            try:
+                stat = os.stat(path)
+
+            except OSError:
+                return False
+
+            fingerprint = recorded[path]
+
+            if stat.st_size != fingerprint["size"]:
+                return False
+
+            if stat.st_mtime_ns != fingerprint["mtime_ns"]:
+                # same size but modified, so only the contents can tell if it really changed
+                if self._content_hash(path) != fingerprint["sha256"]:
+                    return False
+
+                fingerprint["mtime_ns"] = stat.st_mtime_ns
+                touched = True
+
+        if touched:
+            self._write_manifest(manifest)
+
+        return True
+
+
+
+    def load(self, names):
+        """
+        Method to load the cached dataframes if the cache is still valid, recording the fingerprints
+        of the sources they were built from in loaded_fingerprints
+
+            Parameters:
+                names (list): names of the dataframes to load
+
+            Returns:
+                dict: dataframes keyed by name, or None if the cache is missing, stale or incomplete
+        """
+        manifest = self._read_manifest()
+
+        if not self._is_valid(manifest) or not set(names).issubset(manifest.get("frames", [])):
+            return None
+
+        try:
+            frames = {name: pd.read_pickle(self._frame_path(name)) for name in names}
+
+        except Exception:
+            # a corrupt or unreadable cache is treated just like a stale one
+            return None
+
+        self.loaded_fingerprints = manifest["sources"]
+
+        return frames
+
+
+
+    def save(self, frames, fingerprints=None):
+        """
+        Method to store the dataframes in the cache along with the fingerprints of the sources
+
+            Parameters:
+                frames (dict): dataframes keyed by name
+                fingerprints (dict): fingerprints of the sources taken by fingerprints() before the
+                                     dataframes were read from them, taken now if None
+
+            Returns:
+                None
+        """
+        if fingerprints is None:
+            fingerprints = self.fingerprints()
+
+        if sorted(fingerprints) != sorted(self._sources):
+            raise ValueError("The fingerprints are not those of the sources of the cache")
+
+        os.makedirs(self._cache_dir, exist_ok=True)
+
+        # the fingerprints describe the files as they were read, so a source modified since
+        # invalidates the cache on next load
+        manifest = {"version": CACHE_VERSION,
+                    "settings": self._settings,
+                    "sources": fingerprints,
+                    "frames": sorted(frames)}
+
+        for name, frame in frames.items():
+            frame.to_pickle(self._frame_path(name))
+
+        # the manifest is written last, so it only ever describes completely written frames
+        self._write_manifest(manifest)
+
+
+
+    def set_sources(self, sources):
+        """
+        Method to change the source files the cached dataframes are built from, eg. after ingesting
+        a newer release from another location. The cache is stale until the dataframes are saved again
+
+            Parameters:
+                sources (list): paths of the source files
+
+            Returns:
+                None
+        """
+        self._sources = list(sources)
+
+
+
+    def clear(self):
+        """
+        Method to delete every cached dataframe and the manifest
+
+            Parameters:
+                none
+
+            Returns:
+                None
+        """
+        manifest = self._read_manifest() or {}
+
+        for name in [self._manifest_name] + [name + ".pkl" for name in manifest.get("frames", [])]:
+            try:
+                os.remove(os.path.join(self._cache_dir, name))
+
+            except OSError:
+                pass
@@ -0,0 +1,154 @@
+# File:        data_export.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the functions exporting a dataframe into CSV, Parquet or Excel files
+
+from custom_errors import ValueOutOfRange
+import json
+import math
+import time
+import os
+
+
+# export formats, and the file extensions they are chosen by
+export_formats = {".csv": "csv", ".parquet": "parquet", ".xlsx": "xlsx"}
+
+
+def _select(frame, columns=None, query=None):
+    """
+    Function to select the slice of the dataframe to export. The rows are selected first, so the
+    query can use any column, and "Year" is always kept, as it tells apart the rows of a country
+
+        Parameters:
+            frame (dataframe): dataframe to export
+            columns (list): columns to keep, all the columns if None
+            query (str): pandas query expression the rows must satisfy, all the rows if None
+
+        Returns:
+            dataframe: the selected slice
+    """
+    if columns is not None:
+        unknown = [column for column in columns if column not in frame.columns]
+
+        if unknown:
+            raise ValueOutOfRange(
+                "\'" + "\', \'".join(unknown) + "\' not a column of the dataset")
+
+    if query is not None:
+        frame = frame.query(query)
+
+    if columns is not None:
+        columns = list(columns)
+
+        if "Year" in frame.columns and "Year" not in columns:
+            columns = ["Year"] + columns
+
+        frame = frame[columns]
+
+    return frame
+
+
+def _write_xlsx(frame, filename):
+    """
+    Function to write a dataframe into an Excel file with openpyxl in write-only mode, which streams
+    the rows to the file instead of building the whole workbook in memory. Every row repeats its
+    index values, instead of merging the cells of the hierarchical index
+
+        Parameters:
+            frame (dataframe): dataframe to write
+            filename (str): path of the Excel file
+
+        Returns:
+            None
+    """
+    from openpyxl import Workbook
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+
+    index_names = [name if name is not None else "" for name in frame.index.names]
+    sheet.append(index_names + [str(column) for column in frame.columns])
+
+    multi_index = frame.index.nlevels > 1
+
+    for row in frame.itertuples(index=True, name=None):
+        values = (list(row[0]) if multi_index else [row[0]]) + list(row[1:])
+
+        # Excel has no NaN, so missing values are written as empty cells
+        sheet.append([None if isinstance(value, float) and math.isnan(value) else value for value in values])
+
+    workbook.save(filename)
+
+
+def export_frame(frame, filename, export_format=None, columns=None, query=None):
+    """
+    Function to export a dataframe, or a slice of it, into a CSV, Parquet or Excel file
+
+        Parameters:
+            frame (dataframe): dataframe to export
+            filename (str): path of the file to create
+            export_format (str): one of "csv", "parquet" or "xlsx", chosen by the file extension if None
+            columns (list): columns to export, "Year" is always kept, all the columns if None
+            query (str): pandas query expression the exported rows must satisfy, all the rows if None
+
+        Returns:
+            dict: file, format, rows and bytes written, seconds taken, and rows written per second
+    """
+    if export_format is None:
+        extension = os.path.splitext(filename)[1].lower()
+
+        if extension not in export_formats:
+            raise ValueOutOfRange(
+                "Cannot tell the export format from \'" + filename + "\'. Please use one of the extensions " + ", ".join(export_formats))
+
+        export_format = export_formats[extension]
+
+    elif export_format not in export_formats.values():
+        raise ValueOutOfRange(
+            "\'" + str(export_format) + "\' is not supported. Please choose one of " + ", ".join(export_formats.values()))
+
+    start = time.perf_counter()
+
+    frame = _select(frame, columns, query)
+
+    if export_format == "csv":
+        frame.to_csv(filename, index=True, header=True)
+
+    elif export_format == "parquet":
+        try:
+            frame.to_parquet(filename, index=True)
+
+        except ImportError:
+            raise ImportError("Exporting into Parquet needs the pyarrow or fastparquet package")
+
+    else:
+        _write_xlsx(frame, filename)
+
+    seconds = time.perf_counter() - start
+
+    return {"file": filename,
+            "format": export_format,
+            "rows": len(frame),
+            "bytes": os.path.getsize(filename),
+            "seconds": seconds,
+            "rows_per_sec": len(frame) / seconds if seconds > 0 else float("inf")}
+
+
+def frame_to_json(frame, index=True):
+    """
+    Function to convert a dataframe into JSON-ready objects, in the "split" layout of pandas along
+    with the index and column names, so MultiIndex rows and columns survive the round trip
+
+        Parameters:
+            frame (dataframe): dataframe to convert
+            index (bool): whether to keep the index of the dataframe
+
+        Returns:
+            dict: "columns", "index" if kept, "data", "column_names" and "index_names" if kept
+    """
+    result = json.loads(frame.to_json(orient="split", index=index))
+    result["column_names"] = list(frame.columns.names)
+
+    if index:
+        result["index_names"] = list(frame.index.names)
+
+    return result
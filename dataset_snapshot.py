@@ -0,0 +1,136 @@
+# File:        dataset_snapshot.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Functions publishing the dataset as memory-mapped NumPy arrays, which worker processes attach without copying
+
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+
+
+# name of the file describing the arrays of a snapshot
+snapshot_manifest = "snapshot.json"
+
+# snapshots attached by this process, keyed by their directory
+_attached = {}
+
+
+def write_snapshot(dataset, directory):
+    """
+    Function to publish a read-only snapshot of the dataset into a new directory. Every run of
+    neighbouring columns of the same data type is saved as one 2-D .npy array, one row per column,
+    which is laid out the way pandas keeps a block of columns, and every level of the index is
+    saved as an array of codes, with its labels in the manifest. The arrays are written into a
+    temporary directory renamed at the end, so a snapshot is never seen half written
+
+        Parameters:
+            dataset (dataframe): rows indexed on UN Region, UN Sub-Region and Country, with numeric columns only
+            directory (str): directory created to hold the snapshot, it must not exist yet
+
+        Returns:
+            str: the directory of the snapshot
+    """
+    parent = os.path.dirname(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    temp_dir = tempfile.mkdtemp(prefix=".writing-", dir=parent)
+
+    try:
+        blocks = []
+        columns = list(dataset.columns)
+
+        for column in columns:
+            if not pd.api.types.is_numeric_dtype(dataset[column]):
+                raise TypeError("\'" + str(column) + "\' is not a numeric column")
+
+            if blocks and blocks[-1]["dtype"] == dataset[column].dtype.str:
+                blocks[-1]["columns"].append(column)
+
+            else:
+                blocks.append({"file": "block" + str(len(blocks)) + ".npy",
+                               "dtype": dataset[column].dtype.str, "columns": [column]})
+
+        for block in blocks:
+            # filled one column at a time, so publishing never holds a second copy of the block
+            values = np.lib.format.open_memmap(os.path.join(temp_dir, block["file"]), mode="w+",
+                                               dtype=block["dtype"], shape=(len(block["columns"]), len(dataset)))
+
+            for (row, column) in enumerate(block["columns"]):
+                values[row] = dataset[column].to_numpy()
+
+            values.flush()
+            del values
+
+        levels = []
+
+        for (number, level) in enumerate(dataset.index.levels):
+            levels.append({"name": dataset.index.names[number], "file": "level" + str(number) + ".npy",
+                           "labels": [str(label) for label in level],
+                           "categorical": isinstance(level, pd.CategoricalIndex)})
+            np.save(os.path.join(temp_dir, levels[-1]["file"]), np.asarray(dataset.index.codes[number]))
+
+        with open(os.path.join(temp_dir, snapshot_manifest), "w", encoding="utf-8") as f:
+            json.dump({"rows": len(dataset), "columns": columns, "blocks": blocks, "levels": levels}, f, indent=2)
+
+        os.replace(temp_dir, directory)
+
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    return directory
+
+
+def attach_snapshot(directory):
+    """
+    Function to attach a snapshot published by write_snapshot. The arrays are memory-mapped
+    read-only and every block of the dataframe is a view of them, so the pages are shared with
+    every other process attached to the same snapshot, and only those read are ever loaded. A
+    process attaching the same snapshot again gets the dataframe it already attached
+
+        Parameters:
+            directory (str): directory of the snapshot
+
+        Returns:
+            dataframe: the dataset, read-only, rows indexed on UN Region, UN Sub-Region and Country
+    """
+    if directory in _attached:
+        return _attached[directory]
+
+    with open(os.path.join(directory, snapshot_manifest), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    levels = []
+    codes = []
+
+    for level in manifest["levels"]:
+        labels = level["labels"]
+        levels.append(pd.CategoricalIndex(labels, categories=labels) if level["categorical"] else pd.Index(labels))
+        codes.append(np.load(os.path.join(directory, level["file"]), mmap_mode="r"))
+
+    index = pd.MultiIndex(levels=levels, codes=codes, names=[level["name"] for level in manifest["levels"]],
+                          verify_integrity=False)
+
+    # a block of columns is the transpose of its array, which pandas keeps as it is
+    frames = [pd.DataFrame(np.load(os.path.join(directory, block["file"]), mmap_mode="r").T, index=index,
+                           columns=block["columns"], copy=False) for block in manifest["blocks"]]
+
+    dataset = pd.concat(frames, axis=1, copy=False) if len(frames) > 1 else frames[0]
+    _attached[directory] = dataset
+
+    return dataset
+
+
+def detach_snapshot(directory):
+    """
+    Function to forget a snapshot attached by this process, so its arrays are unmapped once the
+    dataframe is no longer used
+
+        Parameters:
+            directory (str): directory of the snapshot
+
+        Returns:
+            None
+    """
+    _attached.pop(directory, None)
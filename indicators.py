@@ -0,0 +1,68 @@
+# File:        indicators.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Registry of the indicators imported from the UN source files, and of the columns derived from them
+
+# source files holding the indicators, keyed by the imported dataframe of DataAnalysis they are reshaped into
+indicator_sources = {"_liv_data": "UN Population Dataset 1.xlsx",
+                     "_pop_data": "UN Population Dataset 2.xlsx",
+                     "_gdp_data": "UNGDPData.csv"}
+
+# Series imported from the source files, in the order of the columns of the dataset. Every Series becomes
+# a data column of the same name, and the countries are compared on the "compared" ones
+indicators = [{"series": "Population annual rate of increase (percent)",
+               "source": "UN Population Dataset 1.xlsx", "compared": True},
+              {"series": "Total fertility rate (children per women)",
+               "source": "UN Population Dataset 1.xlsx", "compared": True},
+              {"series": "Life expectancy at birth for males (years)",
+               "source": "UN Population Dataset 1.xlsx"},
+              {"series": "Life expectancy at birth for females (years)",
+               "source": "UN Population Dataset 1.xlsx"},
+              {"series": "Life expectancy at birth for both sexes (years)",
+               "source": "UN Population Dataset 1.xlsx", "compared": True},
+              {"series": "Urban population (percent)",
+               "source": "UN Population Dataset 2.xlsx", "compared": True},
+              {"series": "GDP per capita (US dollars)",
+               "source": "UNGDPData.csv"}]
+
+# values of a data column for a reference country, in the same year as every row, usable in the
+# expressions of the derived columns as @name
+references = {"usa_gdp_per_capita": {"column": "GDP per capita (US dollars)", "country": "United States of America"}}
+
+# columns derived from the data columns and the references, in the order they are added to the dataset,
+# as expressions of DataFrame.eval with the names of the data columns quoted in backticks
+derived_columns = {"Ratio of Urban Population to GDP per Capita":
+                   "`Urban population (percent)` / `GDP per capita (US dollars)`",
+                   "Ratio of Annual Rate of Population Increase to GDP per Capita":
+                   "`Population annual rate of increase (percent)` / `GDP per capita (US dollars)`",
+                   "GDP per capita wrt USA":
+                   "`GDP per capita (US dollars)` / @usa_gdp_per_capita"}
+
+# the registry used unless DataAnalysis is given another one
+default_registry = {"indicators": indicators, "references": references, "derived_columns": derived_columns}
+
+
+def registered_series(registry, source):
+    """
+    Function to get the Series of the registry imported from a source file
+
+        Parameters:
+            registry (dict): indicators, references and derived columns, like default_registry
+            source (str): name of the source file
+
+        Returns:
+            list: the Series, in the order they are registered
+    """
+    return [indicator["series"] for indicator in registry["indicators"] if indicator["source"] == source]
+
+
+def compared_series(registry):
+    """
+    Function to get the Series of the registry the countries are compared on
+
+        Parameters:
+            registry (dict): indicators, references and derived columns, like default_registry
+
+        Returns:
+            list: the Series, in the order they are registered
+    """
+    return [indicator["series"] for indicator in registry["indicators"] if indicator.get("compared")]
@@ -0,0 +1,239 @@
+# File:        instrumentation.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class StageProfiler and the decorator profiled_stage measuring the cost of every stage of the pipeline
+
+from contextlib import contextmanager
+import functools
+import json
+import sys
+import time
+import tracemalloc
+import pandas as pd
+
+try:
+    import resource
+except ImportError:     # not available on Windows
+    resource = None
+
+
+def _peak_rss():
+    """
+    Function to get the peak resident set size of the process so far
+
+        Parameters:
+            none
+
+        Returns:
+            int: peak resident set size in bytes, None where it is not available
+    """
+    if resource is None:
+        return None
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # Linux reports the size in kilobytes, macOS in bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _frames_stats(frames):
+    """
+    Function to count the rows and the memory of the dataframes among the given objects
+
+        Parameters:
+            frames (list): objects, the ones that are not dataframes are ignored
+
+        Returns:
+            tuple: total rows and total bytes, None for both if there is no dataframe
+    """
+    frames = [frame for frame in frames if isinstance(frame, (pd.DataFrame, pd.Series))]
+
+    if not frames:
+        return (None, None)
+
+    # memory_usage is one number for a series, but one per column for a dataframe
+    return (sum(len(frame) for frame in frames),
+            int(sum(frame.memory_usage(deep=True, index=True) if isinstance(frame, pd.Series)
+                    else frame.memory_usage(deep=True, index=True).sum() for frame in frames)))
+
+
+class StageProfiler:
+    """
+    Class to record the cost of the stages of the pipeline: elapsed time, peak traced memory and
+    peak RSS, and the rows and memory of the dataframes going in and out. Stages can be nested,
+    in which case the peak memory of the inner stage also counts towards the outer one.
+
+    Creating a profiler starts tracing the memory allocations with tracemalloc, which slows down
+    pure Python code, so profiling is meant to be switched on only when needed.
+
+    Attributes:
+        records (list):                 one dict per finished stage, in the order the stages started
+        _stack (list):                  records of the stages that have not finished yet
+
+    Methods:
+        stage(name, inputs):            Method returning a context manager measuring one stage
+        summary():                      Method to format the records as a table
+        print_summary(file):            Method to print the table
+        to_json(filename):              Method to dump the records as JSON
+    """
+
+    def __init__(self):
+        self.records = []
+        self._stack = []
+
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+
+
+    @contextmanager
+    def stage(self, name, inputs=()):
+        """
+        Method returning a context manager measuring one stage. The code of the stage can set
+        "outputs" on the yielded record to the dataframes it produced
+
+            Parameters:
+                name (str): name of the stage
+                inputs (list): dataframes going into the stage
+
+            Returns:
+                context manager yielding the record of the stage
+        """
+        (rows_in, bytes_in) = _frames_stats(inputs)
+        record = {"stage": name, "depth": len(self._stack), "rows_in": rows_in, "bytes_in": bytes_in}
+        self.records.append(record)
+
+        # keep the peak of the enclosing stages, before resetting it for this one
+        traced_peak = tracemalloc.get_traced_memory()[1]
+
+        for outer in self._stack:
+            outer["traced_peak"] = max(outer["traced_peak"], traced_peak)
+
+        if hasattr(tracemalloc, "reset_peak"):
+            tracemalloc.reset_peak()
+
+        traced_start = tracemalloc.get_traced_memory()[0]
+        record["traced_peak"] = traced_start
+        self._stack.append(record)
+
+        start = time.perf_counter()
+
+        try:
+            yield record
+
+        finally:
+            record["seconds"] = time.perf_counter() - start
+
+            self._stack.pop()
+            record["traced_peak"] = max(record["traced_peak"], tracemalloc.get_traced_memory()[1])
+
+            for outer in self._stack:
+                outer["traced_peak"] = max(outer["traced_peak"], record["traced_peak"])
+
+            record["traced_peak_delta"] = record["traced_peak"] - traced_start
+            record["peak_rss"] = _peak_rss()
+
+            (record["rows_out"], record["bytes_out"]) = _frames_stats(record.pop("outputs", ()))
+            del record["traced_peak"]
+
+
+
+    def summary(self):
+        """
+        Method to format the records as a table, with the nested stages indented
+
+            Parameters:
+                none
+
+            Returns:
+                str: the table
+        """
+        def optional(value, scale=1):
+            return "-" if value is None else "{:,.1f}".format(value / scale)
+
+        lines = ["{:<34} {:>9} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+            "stage", "seconds", "peak MiB", "RSS MiB", "rows in", "rows out", "out MiB")]
+
+        for record in self.records:
+            lines.append("{:<34} {:>9.3f} {:>10} {:>10} {:>10} {:>10} {:>10}".format(
+                "  " * record["depth"] + record["stage"], record.get("seconds", 0),
+                optional(record.get("traced_peak_delta"), 2 ** 20), optional(record.get("peak_rss"), 2 ** 20),
+                "-" if record["rows_in"] is None else "{:,}".format(record["rows_in"]),
+                "-" if record.get("rows_out") is None else "{:,}".format(record["rows_out"]),
+                optional(record.get("bytes_out"), 2 ** 20)))
+
+        return "\n".join(lines)
+
+
+
+    def print_summary(self, file=None):
+        """
+        Method to print the table of the records
+
+            Parameters:
+                file (file): where to print the table, stdout if None
+
+            Returns:
+                None
+        """
+        print(self.summary(), file=file)
+
+
+
+    def to_json(self, filename=None):
+        """
+        Method to dump the records as JSON
+
+            Parameters:
+                filename (str): file to write the JSON into, none if None
+
+            Returns:
+                str: the JSON
+        """
+        text = json.dumps(self.records, indent=2)
+
+        if filename is not None:
+            with open(filename, "w", encoding="utf-8") as f:
+                f.write(text)
+
+        return text
+
+
+def profiled_stage(inputs=(), outputs=()):
+    """
+    Decorator to measure a method of DataAnalysis as a stage, when its object has a profiler.
+    Objects without a profiler call the method directly
+
+        Parameters:
+            inputs (tuple): names of the dataframe attributes going into the stage
+            outputs (tuple): names of the dataframe attributes produced by the stage, the return
+                             value of the method is used if empty
+
+        Returns:
+            function: the decorator
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.__dict__.get("_profiler")
+
+            if profiler is None:
+                return method(self, *args, **kwargs)
+
+            # reading the attributes from __dict__, so measuring never runs a lazy stage
+            with profiler.stage(method.__name__, [self.__dict__.get(name) for name in inputs]) as record:
+                result = method(self, *args, **kwargs)
+
+                if outputs:
+                    record["outputs"] = [self.__dict__.get(name) for name in outputs]
+
+                elif isinstance(result, dict):
+                    record["outputs"] = list(result.values())
+
+                else:
+                    record["outputs"] = [result]
+
+            return result
+
+        return wrapper
+
+    return decorator
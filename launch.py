@@ -3,24 +3,22 @@
 # Description: Source Code to control the execution flow for the Project
 
 from ansi_colors import Color as color
+from console import clear_console
 from custom_errors import ValueOutOfRange
+from custom_errors import ValueDuplicate
+from contextlib import redirect_stdout
+from data_export import export_formats
+from data_export import frame_to_json
+from rank_index import comparators
 import data_analysis as da
+import pandas as pd
+import argparse
+import json
 import time
+import sys
 import os
 
 
-def clear_console():
-    """Function to clear the console
-
-        Parameters:
-            none
-
-        Returns:
-            None
-    """
-    print("\033\143")
-
-
 def splash_message():
     """
     Function to display the welcome message to the program, and opens up the VT mode
@@ -49,19 +47,55 @@ def splash_message():
     clear_console()
 
 
-def program_menu():
+def print_profile(analysis, profile_json=None):
+    """
+    Function to print the measurements of the stages of the pipeline and the hits and misses of the
+    query cache on stderr, and dump the measurements as JSON
+
+        Parameters:
+            analysis (DataAnalysis): object whose stages were measured
+            profile_json (str): file to dump the measurements into, none if None
+
+        Returns:
+            None
+    """
+    if analysis.profiler is None:
+        return
+
+    print("\n" + color.yellow + "Cost of the stages of the pipeline" + color.reset + "\n", file=sys.stderr)
+    analysis.profiler.print_summary(sys.stderr)
+
+    info = analysis.query_cache_info()
+    print("\nQuery cache: {hits} hits, {misses} misses, {evictions} evictions, {size}/{maxsize} answers kept".format(**info),
+          file=sys.stderr)
+
+    if profile_json is not None:
+        analysis.profiler.to_json(profile_json)
+
+
+def program_menu(rebuild_cache=False, export_on_start=False, profile=False, profile_json=None, float32_tolerance=None,
+                 import_workers=None, registry=None, query_cache_size=128):
     """
     Function to control the flow the whole program by displaying the menu
     and navigation throughtout according to the user input
 
         Parameters:
-            none
+            rebuild_cache (bool): if True, rebuild the cached dataframes from the source files
+            export_on_start (bool): if True, export the merged dataset into Excel before showing the menu
+            profile (bool): if True, print the cost of the stages of the pipeline on exit
+            profile_json (str): file to dump the cost of the stages into, none if None
+            float32_tolerance (float): largest relative error allowed when downcasting the indicators to float32
+            import_workers (int): number of processes parsing the Excel files concurrently, the number of CPUs if None
+            registry (dict): indicators to import, references and derived columns, the default registry if None
+            query_cache_size (int): largest number of answers of the queries kept, 0 to calculate them every time
 
         Returns:
             None
     """
     # creating object of class DataAnalysis
-    analysis = da.DataAnalysis()
+    analysis = da.DataAnalysis(rebuild_cache=rebuild_cache, export_on_start=export_on_start, profile=profile,
+                               float32_tolerance=float32_tolerance, import_workers=import_workers, registry=registry,
+                               query_cache_size=query_cache_size)
 
     # loop to keep printing the menu until Exit
     while(True):
@@ -80,7 +114,9 @@ def program_menu():
         print(
             "\n[5] Print the list of countries that have higher GDP per capita than USA, and the year")
         print(
-            "\n[6] Compare four different countries on various statistical data and plot graphs")
+            "\n[6] Compare different countries on various statistical data and plot graphs")
+        print(
+            "\n[7] Print the growth of every country over the years")
 
         print("\n[0] Exit")
 
@@ -89,11 +125,12 @@ def program_menu():
             try:
                 choice = int(input("\nPlease enter the menu option number: "))
 
-                if choice < 0 or choice > 6:
+                if choice < 0 or choice > 7:
                     raise ValueOutOfRange(
                         "This option is not supported. Please choose a valid menu option")
 
                 elif choice == 0:
+                    print_profile(analysis, profile_json)
                     print("\nBye!\n")
                     return
 
@@ -134,12 +171,335 @@ def program_menu():
             input("\n" + color.cyan +
                   "Press enter to return to the menu " + color.reset)
 
-        else:  # choice == 6:
+        elif choice == 6:
             analysis.pivot_plot(choice)
             input("\n" + color.cyan +
                   "Press enter to return to the menu " + color.reset)
 
+        else:  # choice == 7:
+            analysis.print_time_series(choice)
+            input("\n" + color.cyan +
+                  "Press enter to return to the menu " + color.reset)
+
+
+def write_frame(frame, output_format, index=True):
+    """
+    Function to write a dataframe to stdout in a machine-readable format. JSON is written in the
+    "split" layout of pandas along with the index and column names, so MultiIndex rows and columns
+    survive the round trip
+
+        Parameters:
+            frame (dataframe): dataframe to write
+            output_format (str): either "csv" or "json"
+            index (bool): whether to write the index of the dataframe
+
+        Returns:
+            None
+    """
+    if output_format == "csv":
+        frame.to_csv(sys.stdout, index=index)
+
+    else:
+        json.dump(frame_to_json(frame, index), sys.stdout)
+        print()
+
+
+def load_registry(filename):
+    """
+    Function to read an indicator registry from a JSON file
+
+        Parameters:
+            filename (str): path of the JSON file, none if None
+
+        Returns:
+            dict: the registry, None if no file was given
+    """
+    if filename is None:
+        return None
+
+    with open(filename, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def run_command(arguments):
+    """
+    Function to run one menu option as a batch command, without any pauses, screen clears or
+    prompts. The results are written to stdout, everything else goes to stderr
+
+        Parameters:
+            arguments (argparse.Namespace): parsed command line arguments
+
+        Returns:
+            int: exit status of the program
+    """
+    try:
+        analysis = da.DataAnalysis(rebuild_cache=arguments.rebuild_cache, interactive=False,
+                                   profile=arguments.profile or arguments.profile_json is not None,
+                                   float32_tolerance=arguments.float32_tolerance, import_workers=arguments.import_workers,
+                                   registry=load_registry(arguments.registry), query_cache_size=arguments.query_cache_size)
+
+    except ValueOutOfRange as e:
+        print("error: " + str(e), file=sys.stderr)
+        return 2
+
+    try:
+        if arguments.command == "dataframes":
+            frame = analysis.imported_dataframes()[dataframe_names[arguments.name]]
+            write_frame(frame, arguments.format, index=False)
+
+        elif arguments.command == "export":
+            with redirect_stdout(sys.stderr):
+                report = analysis.export_dataset(filename=arguments.output, export_format=arguments.export_format,
+                                                 columns=arguments.columns, query=arguments.query)
+
+            if report is None:
+                return 1
+
+            write_frame(pd.DataFrame([report]), arguments.format, index=False)
+
+        elif arguments.command == "describe":
+            write_frame(analysis.aggregate_stats(), arguments.format)
+
+        elif arguments.command == "stats":
+            write_frame(analysis.group_by(arguments.by, arguments.column, arguments.stat), arguments.format)
+
+        elif arguments.command == "higher-gdp":
+            write_frame(analysis.higher_gdp_countries(), arguments.format, index=False)
+
+        elif arguments.command == "refresh":
+            with redirect_stdout(sys.stderr):
+                report = analysis.refresh(arguments.location, arguments.custom_location)
+
+            report["years"] = " ".join(str(year) for year in report["years"])
+            write_frame(pd.DataFrame([report]), arguments.format, index=False)
+
+        elif arguments.command == "plot-regions":
+            with redirect_stdout(sys.stderr):
+                report = analysis.plot_sub_regions(arguments.output_dir, arguments.columns, arguments.workers)
+
+            write_frame(pd.DataFrame(report), arguments.format, index=False)
+
+        elif arguments.command == "select":
+            write_frame(analysis.select_countries(arguments.column, arguments.comparator, arguments.threshold,
+                                                  arguments.reference), arguments.format)
+
+        elif arguments.command == "top":
+            write_frame(analysis.top_countries(arguments.column, arguments.n, arguments.by, arguments.ascending),
+                        arguments.format, index=False)
+
+        elif arguments.command == "rank-changes":
+            write_frame(analysis.rank_changes(arguments.column, arguments.ascending), arguments.format)
+
+        elif arguments.command == "serve":
+            # asyncio is only loaded by the server
+            import asyncio
+            from query_server import QueryServer
+
+            server = QueryServer(analysis, arguments.cache_size, arguments.poll_interval)
+
+            try:
+                asyncio.run(server.serve(arguments.host, arguments.port, arguments.socket))
+
+            except KeyboardInterrupt:
+                print("\nBye!\n", file=sys.stderr)
+
+        elif arguments.command == "time-series":
+            write_frame(analysis.time_series(arguments.columns, arguments.window)[arguments.table], arguments.format)
+
+        else:  # arguments.command == "compare"
+            pivot_data = analysis.compare_countries(arguments.countries, arguments.columns)
+
+            if arguments.plot is not None:
+                analysis.plot_countries(pivot_data, arguments.plot, analysis.compared_data_columns(arguments.columns))
+
+            write_frame(pivot_data, arguments.format)
+
+    except (ValueOutOfRange, ValueDuplicate) as e:
+        print("error: " + str(e), file=sys.stderr)
+        return 2
+
+    finally:
+        print_profile(analysis, arguments.profile_json)
+
+    return 0
+
+
+# names of the imported dataframes accepted by the "dataframes" command
+dataframe_names = {"codes": "UN Codes",
+                   "life": "UN Life Expectancy and Fertility",
+                   "urban": "UN Urban Population",
+                   "gdp": "UN Gross Domestic Product"}
+
+
+def parse_arguments():
+    """
+    Function to parse the command line arguments of the program. Without a command the program
+    runs the interactive menu, and with a command it runs the equivalent menu option in batch mode
+
+        Parameters:
+            none
+
+        Returns:
+            argparse.Namespace: parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        description="Process the UN Population and GDP data and display the statistics")
+    parser.add_argument("--rebuild-cache", action="store_true",
+                        help="ignore the cached dataframes and import the source files again")
+    parser.add_argument("--export-on-start", action="store_true",
+                        help="export the merged dataset into Excel before showing the interactive menu")
+    parser.add_argument("--profile", action="store_true",
+                        help="print the time, memory and rows of every stage of the pipeline on stderr at the end")
+    parser.add_argument("--profile-json", metavar="FILE",
+                        help="also dump the measurements of the stages as JSON into a file")
+    parser.add_argument("--float32-tolerance", type=float, metavar="TOLERANCE",
+                        help="store the indicators as float32 when the relative error stays within this tolerance, eg. 1e-6")
+    parser.add_argument("--registry", metavar="FILE",
+                        help="JSON file with the indicators to import and the derived columns, laid out like "
+                             "default_registry in indicators.py")
+    parser.add_argument("--import-workers", type=int, metavar="N",
+                        help="number of processes parsing the Excel files concurrently, 1 to import them one after another "
+                             "(default: number of CPUs)")
+    parser.add_argument("--query-cache-size", type=int, default=128, metavar="N",
+                        help="largest number of answers of the queries kept in memory, 0 to calculate them every time "
+                             "(default: %(default)s)")
+
+    # options shared by all the batch commands
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--format", choices=["csv", "json"], default="csv",
+                        help="format of the results written to stdout (default: csv)")
+
+    commands = parser.add_subparsers(dest="command", metavar="command",
+                                     help="menu option to run in batch mode, the interactive menu runs if omitted")
+
+    command = commands.add_parser("dataframes", parents=[common],
+                                  help="[1] print an imported dataframe")
+    command.add_argument("--name", choices=list(dataframe_names), required=True,
+                         help="imported dataframe to print")
+
+    command = commands.add_parser("export", parents=[common],
+                                  help="[2] export the entire merged hierarchical dataset into CSV, Parquet or Excel")
+    command.add_argument("--output", default="Export UN Data.xlsx",
+                         help="path of the file to create (default: %(default)s)")
+    command.add_argument("--export-format", choices=list(export_formats.values()),
+                         help="format of the file, chosen by the extension of --output if omitted")
+    command.add_argument("--columns", nargs="+", metavar="COLUMN",
+                         help="columns to export, \"Year\" is always kept (default: all)")
+    command.add_argument("--query",
+                         help="pandas query expression the exported rows must satisfy, eg. \"Year >= 2010\"")
+
+    commands.add_parser("describe", parents=[common],
+                        help="[3] print aggregate stats for the entire dataset")
+
+    command = commands.add_parser("stats", parents=[common],
+                                  help="[4] print aggregate stats grouped by UN Region/UN Sub-Region and year")
+    command.add_argument("--by", choices=da.DataAnalysis.available_region_types, required=True,
+                         help="grouping of the countries")
+    command.add_argument("--column", required=True,
+                         help="data column to aggregate")
+    command.add_argument("--stat", choices=da.DataAnalysis.available_stats, default="all",
+                         help="aggregate stat to calculate (default: %(default)s)")
+
+    commands.add_parser("higher-gdp", parents=[common],
+                        help="[5] list the countries that have higher GDP per capita than USA, and the year")
+
+    command = commands.add_parser("compare", parents=[common],
+                                  help="[6] compare different countries on various statistical data")
+    command.add_argument("--countries", nargs="+", required=True, metavar="COUNTRY",
+                         help="distinct countries to compare, by name, alias or numeric code")
+    command.add_argument("--columns", nargs="+", metavar="COLUMN",
+                         help="data columns to compare the countries on (default: " +
+                              ", ".join(da.DataAnalysis.compared_columns) + ")")
+    command.add_argument("--plot", metavar="FILE",
+                         help="also save the plots as an image")
+
+    command = commands.add_parser("select", parents=[common],
+                                  help="list the countries and years whose value of a data column satisfies a comparison")
+    command.add_argument("--column", required=True,
+                         help="data column to compare")
+    command.add_argument("--comparator", choices=comparators, required=True,
+                         help="comparison of the value with the threshold")
+    command.add_argument("--threshold", type=float, required=True,
+                         help="value compared with, or ratio to the reference country if --reference is given")
+    command.add_argument("--reference", metavar="COUNTRY",
+                         help="country whose value in the same year the threshold is relative to, eg. USA")
+
+    command = commands.add_parser("top", parents=[common],
+                                  help="list the countries ranked first on a data column in every year or region")
+    command.add_argument("--column", required=True,
+                         help="data column to rank the countries on")
+    command.add_argument("--n", type=int, default=10,
+                         help="number of countries of every year or region (default: %(default)s)")
+    command.add_argument("--by", choices=da.DataAnalysis.available_region_types,
+                         help="also rank the countries within every UN Region/UN Sub-Region")
+    command.add_argument("--ascending", action="store_true",
+                         help="rank the lowest values first")
+
+    command = commands.add_parser("rank-changes", parents=[common],
+                                  help="print the rank of every country in every year on a data column, and its change")
+    command.add_argument("--column", required=True,
+                         help="data column to rank the countries on")
+    command.add_argument("--ascending", action="store_true",
+                         help="rank the lowest values first")
+
+    command = commands.add_parser("time-series", parents=[common],
+                                  help="[7] print the growth of every country over the years")
+    command.add_argument("--columns", nargs="+", metavar="COLUMN",
+                         help="data columns to calculate the growth of (default: " +
+                              ", ".join(da.DataAnalysis.growth_columns) + ")")
+    command.add_argument("--window", type=int, default=3,
+                         help="largest number of years of data of a country in the rolling mean (default: %(default)s)")
+    command.add_argument("--table", choices=["yearly", "cagr"], default="yearly",
+                         help="either the change, growth and rolling mean of every year, or the compound annual "
+                              "growth rate of every country (default: %(default)s)")
+
+    command = commands.add_parser("serve",
+                                  help="keep the dataset in memory and answer the commands as JSON queries over HTTP",
+                                  description="Keep the dataset in memory and answer the commands as JSON queries over "
+                                              "HTTP. Connections are accepted concurrently, but the queries are "
+                                              "calculated one at a time on a single worker thread, so a slow query "
+                                              "delays the ones behind it. Cached answers are returned right away.")
+    command.add_argument("--host", default="127.0.0.1",
+                         help="address to listen on (default: %(default)s)")
+    command.add_argument("--port", type=int, default=8592,
+                         help="TCP port to listen on (default: %(default)s)")
+    command.add_argument("--socket", metavar="PATH",
+                         help="listen on a Unix socket instead of the TCP port")
+    command.add_argument("--cache-size", type=int, default=256,
+                         help="largest number of cached answers (default: %(default)s)")
+    command.add_argument("--poll-interval", type=float, default=2.0, metavar="SECONDS",
+                         help="seconds between checks of the source files for a hot reload, 0 to never reload "
+                              "(default: %(default)s)")
+
+    command = commands.add_parser("refresh", parents=[common],
+                                  help="ingest a newer release of the source files, updating only the new or changed rows")
+    command.add_argument("--location", metavar="DIR",
+                         help="directory holding the Excel files of the new release (default: the current one)")
+    command.add_argument("--custom-location", metavar="DIR",
+                         help="directory holding the CSV file of the new release (default: the current one)")
+
+    command = commands.add_parser("plot-regions", parents=[common],
+                                  help="plot the comparison of the countries of every UN Sub-Region, in parallel")
+    command.add_argument("--output-dir", default="Plots",
+                         help="directory to save the images into (default: %(default)s)")
+    command.add_argument("--columns", nargs="+", metavar="COLUMN",
+                         help="data columns to compare the countries on (default: " +
+                              ", ".join(da.DataAnalysis.compared_columns) + ")")
+    command.add_argument("--workers", type=int,
+                         help="number of worker processes, 1 to render in the main process (default: number of CPUs)")
+
+    return parser.parse_args()
+
 
 if __name__ == '__main__':
-    splash_message()
-    program_menu()
+    arguments = parse_arguments()
+
+    if arguments.command is None:
+        splash_message()
+        program_menu(arguments.rebuild_cache, arguments.export_on_start,
+                     arguments.profile or arguments.profile_json is not None, arguments.profile_json,
+                     arguments.float32_tolerance, arguments.import_workers, load_registry(arguments.registry),
+                     arguments.query_cache_size)
+
+    else:
+        sys.exit(run_command(arguments))
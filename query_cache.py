@@ -0,0 +1,112 @@
+# File:        query_cache.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class QueryCache keeping the latest answers of the queries of DataAnalysis
+
+from collections import OrderedDict
+
+
+class QueryCache:
+    """
+    Class to keep the answers of the queries of DataAnalysis, keyed by the query and its normalized
+    arguments, for one version of the dataset. The least recently used answer is evicted once the
+    cache is full, and all of them are dropped as soon as an answer is asked for a newer version.
+    The hits and misses are counted, so the size can be chosen from how the queries are used
+
+    Attributes:
+        maxsize (int):                  largest number of answers kept, 0 keeps none
+        version (int):                  version of the dataset the answers were calculated from
+        hits (int):                     number of answers found in the cache
+        misses (int):                   number of answers calculated
+        evictions (int):                number of answers evicted to make room for newer ones
+        _answers (OrderedDict):         answers keyed by the query and its arguments, the least recently used first
+
+    Methods:
+        get(key, version, calculate):   Method to get the answer of a query, calculating it if it is not cached
+        info():                         Method to get the counters and the size of the cache
+        clear():                        Method to drop every answer and reset the counters
+    """
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._answers = OrderedDict()
+
+
+
+    def get(self, key, version, calculate):
+        """
+        Method to get the answer of a query, calculating it if it is not cached for this version of
+        the dataset. A query raising an error is not cached
+
+            Parameters:
+                key (tuple): name of the query and its normalized arguments, all hashable
+                version (int): version of the dataset the answer is for
+                calculate (function): function without arguments calculating the answer
+
+            Returns:
+                the answer, shared with later calls, so it must not be modified
+        """
+        if version != self.version:
+            # the dataset has changed, so no answer can be asked for again
+            self._answers.clear()
+            self.version = version
+
+        if key in self._answers:
+            self.hits += 1
+            self._answers.move_to_end(key)
+
+            return self._answers[key]
+
+        self.misses += 1
+        answer = calculate()
+
+        if self.maxsize > 0:
+            self._answers[key] = answer
+
+            while len(self._answers) > self.maxsize:
+                self._answers.popitem(last=False)
+                self.evictions += 1
+
+        return answer
+
+
+
+    def info(self):
+        """
+        Method to get the counters and the size of the cache
+
+            Parameters:
+                none
+
+            Returns:
+                dict: hits, misses, evictions, hit rate, number of answers kept and largest number of answers
+        """
+        calls = self.hits + self.misses
+
+        return {"hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / calls if calls else 0.0,
+                "size": len(self._answers),
+                "maxsize": self.maxsize}
+
+
+
+    def clear(self):
+        """
+        Method to drop every answer and reset the counters
+
+            Parameters:
+                none
+
+            Returns:
+                None
+        """
+        self._answers.clear()
+        self.version = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
@@ -0,0 +1,471 @@
+# File:        query_server.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class QueryServer answering JSON queries over HTTP or a Unix socket, keeping the dataset in memory
+
+from custom_errors import ValueOutOfRange
+from custom_errors import ValueDuplicate
+from data_export import frame_to_json
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import redirect_stdout
+from urllib.parse import parse_qs
+from urllib.parse import urlsplit
+import asyncio
+import json
+import os
+import sys
+import time
+
+
+# reason phrases of the HTTP status codes the server answers with
+status_reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+                  413: "Payload Too Large", 500: "Internal Server Error"}
+
+# queries answered by the server, named like the batch commands
+queries = ["describe", "stats", "higher-gdp", "compare", "select", "top", "rank-changes", "time-series"]
+
+
+def _parameter(params, name, default=None, convert=str, required=False):
+    """
+    Function to get one parameter of a query, converted to a type
+
+        Parameters:
+            params (dict): lists of values keyed by the parameter name, as parsed from the query string
+            name (str): name of the parameter
+            default: value if the parameter is missing
+            convert (function): conversion of the value
+            required (bool): if True a missing parameter is an error
+
+        Returns:
+            the value of the parameter
+    """
+    values = params.get(name)
+
+    if not values:
+        if required:
+            raise ValueOutOfRange("Please give the parameter \'" + name + "\'")
+
+        return default
+
+    try:
+        return convert(values[-1])
+
+    except ValueError:
+        raise ValueOutOfRange("\'" + str(values[-1]) + "\' is not a valid value of the parameter \'" + name + "\'")
+
+
+def _flag(value):
+    """
+    Function to read a yes/no parameter
+
+        Parameters:
+            value (str): value of the parameter
+
+        Returns:
+            bool: True for "1", "true" or "yes", in any letter case
+    """
+    return str(value).lower() in ("1", "true", "yes")
+
+
+class QueryServer:
+    """
+    Class to answer queries over HTTP or a Unix socket from a DataAnalysis object built once and
+    kept in memory, so other tools can run many small queries without paying for the pipeline.
+    Every query is a GET (or a POST with a JSON object of parameters) on the path named after the
+    batch command, eg. /stats?by=UN%20Region&column=..., and its answer is the dataframe as JSON,
+    in the layout written by the batch commands with --format json.
+
+    The connections are served concurrently by asyncio, but the queries are calculated one at a time
+    on a single worker thread, as DataAnalysis is not thread-safe, so a slow query delays the ones
+    queued behind it. The answers are kept in a bounded cache for
+    the version of the dataset they were calculated from, and identical queries arriving while one
+    is running share its answer. When the source files change, the dataset is refreshed in place
+    and the cached answers are dropped.
+
+    Constructor:
+        Parameters:
+            analysis (DataAnalysis):    object answering the queries
+            cache_size (int):           largest number of cached answers
+            poll_interval (float):      seconds between checks of the source files, they are not watched if 0
+
+    Attributes:
+        hits (int):                     queries answered from the cache
+        misses (int):                   queries not found in the cache, including the ones sharing a running answer
+        reloads (int):                  refreshes of the dataset
+        _analysis (DataAnalysis):       object answering the queries
+        _responses (OrderedDict):       version of the dataset and answer, keyed by the query, least recently used first
+        _pending (dict):                answers being calculated, keyed by the query
+        _worker (ThreadPoolExecutor):   single thread running the queries and the refreshes
+        _sources (tuple):               modification time and size of every source file at the last check
+
+    Methods:
+        serve(host, port, socket_path):         Method to answer queries until the program is stopped
+        reload():                               Method to refresh the dataset from the source files
+        status():                               Method to get the state of the server
+        _handle(reader, writer):                Method to answer one HTTP request
+        _answer(method, target, body):          Method to route a request to its answer
+        _run_query(name, params):               Method to calculate the answer of a query
+        _watch_sources():                       Method to reload the dataset whenever the source files change
+        _fingerprint():                         Method to get the modification time and size of the source files
+    """
+
+    # largest size of the body of a request, in bytes
+    max_body = 1 << 20
+
+    def __init__(self, analysis, cache_size=256, poll_interval=2.0):
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+        self._analysis = analysis
+        self._cache_size = cache_size
+        self._poll_interval = poll_interval
+        self._responses = OrderedDict()
+        self._pending = {}
+        self._worker = ThreadPoolExecutor(max_workers=1)
+        self._sources = None
+        self._started = time.time()
+
+
+
+    async def serve(self, host="127.0.0.1", port=8592, socket_path=None):
+        """
+        Method to build the dataset, and then answer queries until the program is stopped
+
+            Parameters:
+                host (str): address to listen on
+                port (int): TCP port to listen on
+                socket_path (str): path of a Unix socket to listen on instead of the TCP port, none if None
+
+            Returns:
+                None
+        """
+        loop = asyncio.get_running_loop()
+
+        # producing the dataset before accepting queries, so the first one does not wait for the pipeline
+        await loop.run_in_executor(self._worker, getattr, self._analysis, "_dataset")
+        self._sources = self._fingerprint()
+
+        if socket_path is not None:
+            server = await asyncio.start_unix_server(self._handle, path=socket_path)
+            print("Answering queries on the Unix socket \'" + socket_path + "\'", file=sys.stderr)
+
+        else:
+            server = await asyncio.start_server(self._handle, host, port)
+            print("Answering queries on http://" + host + ":" + str(port) + "/", file=sys.stderr)
+
+        try:
+            async with server:
+                tasks = [server.serve_forever()]
+
+                if self._poll_interval:
+                    tasks.append(self._watch_sources())
+
+                await asyncio.gather(*tasks)
+
+        finally:
+            self._worker.shutdown(wait=False)
+
+            if socket_path is not None and os.path.exists(socket_path):
+                os.remove(socket_path)
+
+
+
+    async def _handle(self, reader, writer):
+        """
+        Method to read one HTTP request from a connection, and write its answer
+
+            Parameters:
+                reader (StreamReader): incoming side of the connection
+                writer (StreamWriter): outgoing side of the connection
+
+            Returns:
+                None
+        """
+        try:
+            (method, target, _) = (await reader.readline()).decode("latin-1").split(" ", 2)
+            headers = {}
+
+            while True:
+                line = await reader.readline()
+
+                if line in (b"\r\n", b"\n", b""):
+                    break
+
+                (name, _, value) = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            length = int(headers.get("content-length", 0))
+
+            if length > self.max_body:
+                (status, payload) = (413, {"error": "The request is larger than " + str(self.max_body) + " bytes"})
+
+            else:
+                body = await reader.readexactly(length) if length else b""
+                (status, payload) = await self._answer(method, target, body)
+
+        except (ValueError, asyncio.IncompleteReadError):
+            (status, payload) = (400, {"error": "Malformed HTTP request"})
+
+        # cached answers are already encoded
+        if not isinstance(payload, bytes):
+            payload = json.dumps(payload).encode("utf-8")
+
+        try:
+            writer.write(("HTTP/1.1 " + str(status) + " " + status_reasons[status] + "\r\n" +
+                          "Content-Type: application/json\r\n" +
+                          "Content-Length: " + str(len(payload)) + "\r\n" +
+                          "Connection: close\r\n\r\n").encode("latin-1") + payload)
+            await writer.drain()
+            writer.close()
+            await writer.wait_closed()
+
+        except ConnectionError:
+            # the client went away, which does not concern the other connections
+            pass
+
+
+
+    async def _answer(self, method, target, body):
+        """
+        Method to route a request to its answer: the state of the server, a reload, or a query,
+        answered from the cache when possible
+
+            Parameters:
+                method (str): HTTP method
+                target (str): path and query string of the request
+                body (bytes): body of the request, a JSON object of parameters if not empty
+
+            Returns:
+                tuple: HTTP status, and the answer as an object or already encoded JSON
+        """
+        url = urlsplit(target)
+        name = url.path.strip("/")
+        params = parse_qs(url.query)
+
+        if method not in ("GET", "POST"):
+            return (405, {"error": "Please use GET or POST"})
+
+        if body:
+            try:
+                for (key, value) in json.loads(body).items():
+                    params[key] = [str(item) for item in value] if isinstance(value, list) else [str(value)]
+
+            except (ValueError, AttributeError):
+                return (400, {"error": "The body of the request must be a JSON object of parameters"})
+
+        if name == "status":
+            return (200, self.status())
+
+        if name == "reload":
+            if method != "POST":
+                return (405, {"error": "Please use POST to reload the dataset"})
+
+            try:
+                return (200, await self.reload())
+
+            except Exception as e:
+                return (500, {"error": str(e)})
+
+        if name not in queries:
+            return (404, {"error": "\'" + name + "\' is not a query. Please use one of " + ", ".join(queries + ["status", "reload"])})
+
+        # the parameters are keyed in a fixed order, so the same query always has the same key
+        key = (name, tuple(sorted((param, tuple(values)) for (param, values) in params.items())))
+        cached = self._responses.get(key)
+
+        if cached is not None and cached[0] == self._analysis._dataset_version:
+            self.hits += 1
+            self._responses.move_to_end(key)
+            return (200, cached[1])
+
+        self.misses += 1
+
+        # identical queries arriving meanwhile wait for the same answer instead of calculating it again
+        if key not in self._pending:
+            self._pending[key] = asyncio.get_running_loop().run_in_executor(self._worker, self._run_query, name, params)
+            self._pending[key].add_done_callback(lambda future: self._pending.pop(key, None))
+
+        try:
+            # shielded, so a client going away does not cancel the answer of the others
+            (version, payload) = await asyncio.shield(self._pending[key])
+
+        except (ValueOutOfRange, ValueDuplicate) as e:
+            return (400, {"error": str(e)})
+
+        except Exception as e:
+            return (500, {"error": type(e).__name__ + ": " + str(e)})
+
+        self._responses[key] = (version, payload)
+        self._responses.move_to_end(key)
+
+        while len(self._responses) > self._cache_size:
+            self._responses.popitem(last=False)
+
+        return (200, payload)
+
+
+
+    def _run_query(self, name, params):
+        """
+        Method to calculate the answer of a query, on the worker thread
+
+            Parameters:
+                name (str): one of the queries
+                params (dict): lists of values keyed by the parameter name
+
+            Returns:
+                tuple: version of the dataset the answer was calculated from, and the answer as JSON
+        """
+        analysis = self._analysis
+        index = True
+
+        # the pipeline reports its progress on stdout, which belongs to nobody here
+        with redirect_stdout(sys.stderr):
+            if name == "describe":
+                frame = analysis.aggregate_stats()
+
+            elif name == "stats":
+                frame = analysis.group_by(_parameter(params, "by", required=True), _parameter(params, "column", required=True),
+                                          _parameter(params, "stat", "all"))
+
+            elif name == "higher-gdp":
+                (frame, index) = (analysis.higher_gdp_countries(), False)
+
+            elif name == "compare":
+                # a client must never choose a file the server writes, so the plot option of the batch command is refused
+                if "plot" in params:
+                    raise ValueOutOfRange("The server does not save plots. Please run the compare command with --plot instead")
+
+                frame = analysis.compare_countries(params.get("countries", []), params.get("columns"))
+
+            elif name == "select":
+                frame = analysis.select_countries(_parameter(params, "column", required=True),
+                                                  _parameter(params, "comparator", required=True),
+                                                  _parameter(params, "threshold", convert=float, required=True),
+                                                  _parameter(params, "reference"))
+
+            elif name == "top":
+                (frame, index) = (analysis.top_countries(_parameter(params, "column", required=True),
+                                                         _parameter(params, "n", 10, int), _parameter(params, "by"),
+                                                         _parameter(params, "ascending", False, _flag)), False)
+
+            elif name == "rank-changes":
+                frame = analysis.rank_changes(_parameter(params, "column", required=True),
+                                              _parameter(params, "ascending", False, _flag))
+
+            else:  # name == "time-series"
+                growth = analysis.time_series(params.get("columns"), _parameter(params, "window", 3, int))
+                table = _parameter(params, "table", "yearly")
+
+                if table not in growth:
+                    raise ValueOutOfRange(
+                        "\'" + table + "\' is not a table of the time series. Please choose one of " + ", ".join(growth))
+
+                frame = growth[table]
+
+        return (analysis._dataset_version, json.dumps(frame_to_json(frame, index)).encode("utf-8"))
+
+
+
+    async def reload(self):
+        """
+        Method to refresh the dataset from the source files, updating only the new or changed rows,
+        and drop the cached answers. Queries wait while the dataset is being refreshed
+
+            Parameters:
+                none
+
+            Returns:
+                dict: number of new and changed rows, and the years having them
+        """
+        def refresh():
+            with redirect_stdout(sys.stderr):
+                return self._analysis.refresh()
+
+        report = await asyncio.get_running_loop().run_in_executor(self._worker, refresh)
+
+        self._responses.clear()
+        self._sources = self._fingerprint()
+        self.reloads += 1
+
+        return report
+
+
+
+    def status(self):
+        """
+        Method to get the state of the server
+
+            Parameters:
+                none
+
+            Returns:
+                dict: rows and version of the dataset, cached answers, hits, misses, reloads, uptime,
+                      and the counters of the query cache of the analysis under the responses
+        """
+        return {"rows": len(self._analysis.__dict__.get("_dataset", ())),
+                "dataset_version": self._analysis._dataset_version,
+                "cached_answers": len(self._responses),
+                "hits": self.hits,
+                "misses": self.misses,
+                "reloads": self.reloads,
+                "uptime_seconds": time.time() - self._started,
+                "query_cache": self._analysis.query_cache_info()}
+
+
+
+    async def _watch_sources(self):
+        """
+        Method to reload the dataset whenever the source files change. A file being written changes
+        at every check, so the dataset is only reloaded once the files have stayed the same for one
+        interval, and never while one of them is missing
+
+            Parameters:
+                none
+
+            Returns:
+                None
+        """
+        previous = self._sources
+
+        while True:
+            await asyncio.sleep(self._poll_interval)
+            current = self._fingerprint()
+
+            if current != self._sources and current == previous and None not in current:
+                print("Source files have changed, reloading the dataset", file=sys.stderr)
+
+                try:
+                    await self.reload()
+
+                except Exception as e:
+                    # a failed refresh leaves the dataset as it was, so the current one is kept, and the
+                    # reload is only tried again once the files change, eg. when they are fixed
+                    print("Could not reload the dataset: " + str(e), file=sys.stderr)
+                    self._sources = current
+
+            previous = current
+
+
+
+    def _fingerprint(self):
+        """
+        Method to get the modification time and size of every source file
+
+            Parameters:
+                none
+
+            Returns:
+                tuple: modification time and size of every source file, None for a missing file
+        """
+        fingerprint = []
+
+        for path in self._analysis._source_files(self._analysis._default_location, self._analysis._custom_location):
+            try:
+                stat = os.stat(path)
+                fingerprint.append((stat.st_mtime_ns, stat.st_size))
+
+            except OSError:
+                fingerprint.append(None)
+
+        return tuple(fingerprint)
@@ -0,0 +1,235 @@
+# File:        rank_index.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Source code of the class RankIndex providing threshold, top-N and rank queries over the countries of every year
+
+import numpy as np
+from time_series import country_rows
+
+
+# comparators of the threshold queries
+comparators = [">", ">=", "<", "<=", "==", "!="]
+
+# comparator giving the same rows once both sides are multiplied by a negative number
+_flipped = {">": "<", ">=": "<=", "<": ">", "<=": ">=", "==": "==", "!=": "!="}
+
+
+class RankIndex:
+    """
+    Class to answer threshold, top-N and rank queries over the countries of every year of the
+    dataset. The rows of every data column are sorted once on the year and the value, the first
+    time the column is queried, so a threshold query only does a binary search in every year, and
+    a top-N query only takes the first rows of every year or region. The orders and ranks are kept
+    until the dataset changes, when a new RankIndex is built.
+
+    Attributes:
+        version (int):                  version of the dataset the index was built from
+        dataset (dataframe):            the dataset, sorted on the index and the year. Positions
+                                        returned by the queries are rows of this dataframe
+        _years (array):                 year of every row
+        _first_rows (array):            position of the first row of the country of every row
+        _sorted (dict):                 positions of the rows sorted on the year and the value, keyed by the column
+        _bounds (dict):                 first position of every year in the sorted rows, keyed by the column
+        _grouped (dict):                positions of the rows sorted on the year, the region and the value,
+                                        keyed by the column, the index level of the region and the direction
+        _ranks (dict):                  rank of every row within its year, keyed by the column and the direction
+
+    Methods:
+        select(column, comparator, threshold, references):  Method to find the rows whose value satisfies a comparison
+        top(column, n, level, ascending):                   Method to find the rows ranked first in every year or region, with their ranks
+        ranks(column, ascending):                           Method to get the rank of every row within its year
+        rank_changes(column, ascending):                    Method to get the change of rank of every row since the previous year
+        _sorted_rows(column):                               Method to sort the rows of a data column on the year and the value
+    """
+
+    def __init__(self, dataset, version=0):
+        self.version = version
+        (self.dataset, self._first_rows) = country_rows(dataset)
+        self._years = self.dataset["Year"].to_numpy()
+        self._sorted = {}
+        self._bounds = {}
+        self._grouped = {}
+        self._ranks = {}
+
+
+
+    def _sorted_rows(self, column):
+        """
+        Method to sort the rows of a data column on the year and the value, unless they already are
+
+            Parameters:
+                column (str): numeric data column of the dataset
+
+            Returns:
+                tuple: positions of the rows in ascending order of year and value, the sorted values,
+                       and the first position of every year followed by the number of rows
+        """
+        if column not in self._sorted:
+            order = np.lexsort((self.dataset[column].to_numpy(), self._years))
+            years = self._years[order]
+
+            self._sorted[column] = order
+            self._bounds[column] = np.r_[np.flatnonzero(np.r_[True, years[1:] != years[:-1]]), len(order)]
+
+        order = self._sorted[column]
+
+        return (order, self.dataset[column].to_numpy()[order], self._bounds[column])
+
+
+
+    def select(self, column, comparator, threshold, references=None):
+        """
+        Method to find the rows whose value satisfies a comparison with a threshold, or with the
+        threshold times the value of a reference country in the same year
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                comparator (str): one of the comparators
+                threshold (float): value compared with
+                references (dict): value of the reference country keyed by the year, none if None.
+                                   Years missing from it, or where it is 0, have no rows
+
+            Returns:
+                array: positions of the rows, in the order of the dataset
+        """
+        (order, values, bounds) = self._sorted_rows(column)
+        selected = []
+
+        for (start, end) in zip(bounds[:-1], bounds[1:]):
+            bound = threshold
+            year_comparator = comparator
+
+            if references is not None:
+                reference = references.get(self._years[order[start]])
+
+                if reference is None or reference == 0 or reference != reference:
+                    continue
+
+                bound = threshold * reference
+
+                if reference < 0:
+                    year_comparator = _flipped[comparator]
+
+            # the values of the year are sorted, so the rows satisfying the comparison are one or two slices
+            left = start + np.searchsorted(values[start:end], bound, side="left")
+            right = start + np.searchsorted(values[start:end], bound, side="right")
+
+            slices = {">": [(right, end)], ">=": [(left, end)], "<": [(start, left)], "<=": [(start, right)],
+                      "==": [(left, right)], "!=": [(start, left), (right, end)]}[year_comparator]
+
+            selected.extend(order[first:last] for (first, last) in slices)
+
+        return np.sort(np.concatenate(selected)) if selected else np.array([], dtype="int64")
+
+
+
+    def top(self, column, n, level=None, ascending=False):
+        """
+        Method to find the n rows ranked first in every year, or in every region and year, along with
+        their rank within the year or region. Rows with the same value share the best of their ranks
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                n (int): number of rows of every year or region
+                level (str): index level of the regions, eg. "UN Region", every year as a whole if None
+                ascending (bool): if True the lowest values come first, else the highest
+
+            Returns:
+                tuple: positions of the rows, sorted on the year, the region and the rank, and the rank
+                       of every row within its year or region
+        """
+        key = (column, level, ascending)
+
+        if key not in self._grouped:
+            (order, values, bounds) = self._sorted_rows(column)
+
+            # within every year the rows are sorted on the value, so a stable sort on the regions keeps
+            # them sorted within every region
+            if not ascending:
+                order = np.concatenate([order[start:end][::-1] for (start, end) in zip(bounds[:-1], bounds[1:])])
+
+            if level is not None:
+                regions = self.dataset.index.get_level_values(level).codes[order]
+                order = order[np.lexsort((regions, self._years[order]))]
+
+            self._grouped[key] = order
+
+        order = self._grouped[key]
+        years = self._years[order]
+        regions = None if level is None else self.dataset.index.get_level_values(level).codes[order]
+
+        starts = np.r_[True, years[1:] != years[:-1]]
+
+        if regions is not None:
+            starts |= np.r_[True, regions[1:] != regions[:-1]]
+
+        positions = np.arange(len(order))
+        group_starts = np.maximum.accumulate(np.where(starts, positions, 0))
+        rank_in_group = positions - group_starts
+
+        # runs of equal values within a group, whose rows share the rank of the first one
+        values = self.dataset[column].to_numpy()[order]
+        run_starts = starts | np.r_[True, values[1:] != values[:-1]]
+        ranks = np.maximum.accumulate(np.where(run_starts, positions, 0)) - group_starts + 1
+
+        return (order[rank_in_group < n], ranks[rank_in_group < n])
+
+
+
+    def ranks(self, column, ascending=False):
+        """
+        Method to get the rank of every row among the countries of its year, 1 being the highest value,
+        or the lowest if ascending. Countries with the same value share the best of their ranks
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                ascending (bool): if True the lowest value is ranked 1, else the highest
+
+            Returns:
+                array: rank of every row, in the order of the dataset
+        """
+        key = (column, ascending)
+
+        if key not in self._ranks:
+            (order, values, bounds) = self._sorted_rows(column)
+
+            positions = np.arange(len(order))
+            years = self._years[order]
+            year_starts = np.repeat(bounds[:-1], np.diff(bounds))
+            year_ends = np.repeat(bounds[1:], np.diff(bounds))
+
+            # runs of equal values within a year
+            run_starts = np.r_[True, (values[1:] != values[:-1]) | (years[1:] != years[:-1])]
+            run_ends = np.r_[run_starts[1:], True]
+
+            if ascending:
+                sorted_ranks = np.maximum.accumulate(np.where(run_starts, positions, 0)) - year_starts + 1
+
+            else:
+                last_of_run = np.minimum.accumulate(np.where(run_ends, positions, len(order))[::-1])[::-1]
+                sorted_ranks = year_ends - last_of_run
+
+            ranks = np.empty(len(order), dtype="int64")
+            ranks[order] = sorted_ranks
+            self._ranks[key] = ranks
+
+        return self._ranks[key]
+
+
+
+    def rank_changes(self, column, ascending=False):
+        """
+        Method to get the change of rank of every row since the previous year of data of its country,
+        positive when the country has moved up
+
+            Parameters:
+                column (str): numeric data column of the dataset
+                ascending (bool): if True the lowest value is ranked 1, else the highest
+
+            Returns:
+                array: change of rank of every row, in the order of the dataset, NaN for the first year of a country
+        """
+        ranks = self.ranks(column, ascending).astype("float64")
+        positions = np.arange(len(ranks))
+        previous = np.maximum(positions - 1, 0)
+
+        return np.where(positions > self._first_rows, ranks[previous] - ranks, np.nan)
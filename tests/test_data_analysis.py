@@ -0,0 +1,176 @@
+# File:        test_data_analysis.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Tests of the stages of the DataAnalysis pipeline building the dataset
+
+import os
+import sys
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import data_analysis as da                      # noqa: E402
+from indicators import default_registry         # noqa: E402
+from synthetic import generate_sources          # noqa: E402
+from synthetic import write_sources             # noqa: E402
+
+
+@pytest.fixture
+def dataset():
+    """
+    Function to build a small dataset laid out like the merged dataset, two countries over two years
+    """
+    index = pd.MultiIndex.from_tuples([("Americas", "Northern America", "United States of America")] * 2 +
+                                      [("Europe", "Western Europe", "France")] * 2,
+                                      names=["UN Region", "UN Sub-Region", "Country"])
+
+    return pd.DataFrame({"Year": [2005, 2010, 2005, 2010],
+                         "GDP per capita (US dollars)": [44000.0, 48000.0, 34000.0, 40000.0]}, index=index)
+
+
+@pytest.fixture
+def sources():
+    """
+    Function to generate small UN-shaped source files, eight countries over three years
+    """
+    return generate_sources(countries=8, sub_regions=3, years=3, first_year=2005)
+
+
+def analysis_of(tmp_path, registry=None, location="data", cache=".cache"):
+    """
+    Function to create a DataAnalysis in batch mode, importing from and caching into a temporary directory
+    """
+    return da.DataAnalysis(str(tmp_path / location), str(tmp_path / location), cache_dir=str(tmp_path / cache),
+                           interactive=False, import_workers=1, registry=registry)
+
+
+def new_release(sources, year, without=()):
+    """
+    Function to add a year to generated source files, with the values of the last year raised by a tenth
+
+        Parameters:
+            sources (dict): dataframes keyed by the name of the file, as generated by generate_sources
+            year (int): year to add
+            without (tuple): countries having no GDP data in the added year
+
+        Returns:
+            dict: dataframes of the new release, keyed by the name of the file
+    """
+    release = {}
+
+    for (name, frame) in sources.items():
+        if "Year" in frame.columns:
+            added = frame[frame["Year"] == frame["Year"].max()].copy()
+            added["Year"] = year
+            added["Value"] = added["Value"] * 1.1
+
+            if name == "UNGDPData.csv":
+                added = added[~added["Region/Country/Area"].isin(without)]
+
+            frame = pd.concat([frame, added], ignore_index=True)
+
+        release[name] = frame
+
+    return release
+
+
+def test_derived_columns(dataset, tmp_path):
+    registry = dict(default_registry, derived_columns={
+        "GDP per capita wrt USA": default_registry["derived_columns"]["GDP per capita wrt USA"]})
+    analysis = analysis_of(tmp_path, registry)
+    analysis._dataset = dataset
+    analysis._additional_statistics()
+
+    assert list(analysis._dataset["GDP per capita wrt USA"]) == [1.0, 1.0, 34000.0 / 44000.0, 40000.0 / 48000.0]
+
+
+def test_no_derived_columns(dataset, tmp_path):
+    analysis = analysis_of(tmp_path, dict(default_registry, derived_columns={}))
+    analysis._dataset = dataset
+    analysis._additional_statistics()
+
+    assert list(analysis._dataset.columns) == ["Year", "GDP per capita (US dollars)"]
+    assert len(analysis._dataset) == 4
+
+
+def test_single_source_merge_is_sorted(tmp_path):
+    registry = dict(default_registry, indicators=[indicator for indicator in default_registry["indicators"]
+                                                  if indicator["series"] == "GDP per capita (US dollars)"])
+    analysis = analysis_of(tmp_path, registry)
+
+    # the source files list the countries by name, which is not the order of the UN Regions
+    analysis._unc_data = pd.DataFrame({"Country": ["Albania", "Chile", "Zimbabwe"],
+                                       "UN Region": ["Europe", "Americas", "Africa"],
+                                       "UN Sub-Region": ["Southern Europe", "South America", "Eastern Africa"]})
+    analysis._liv_data = pd.DataFrame({"Region/Country/Area": ["Albania", "Chile", "Zimbabwe"], "Year": [2010] * 3})
+    analysis._pop_data = analysis._liv_data.copy()
+    analysis._gdp_data = pd.DataFrame({"Region/Country/Area": ["Albania", "Albania", "Chile", "Chile", "Zimbabwe"],
+                                       "Year": [2010, 2005, 2005, 2010, 2010],
+                                       "GDP per capita (US dollars)": [4100.0, 2700.0, 7600.0, 12800.0, 950.0]})
+    analysis._merge_data()
+
+    dataset = analysis._dataset
+
+    assert list(dataset.index.get_level_values("Country")) == ["Zimbabwe", "Chile", "Chile", "Albania", "Albania"]
+    assert list(dataset["Year"]) == [2010, 2005, 2010, 2005, 2010]
+    assert dataset.set_index("Year", append=True).index.is_monotonic_increasing
+
+
+def test_refresh_like_a_full_build(sources, tmp_path):
+    write_sources(sources, str(tmp_path / "data"), file_format="csv")
+    analysis = analysis_of(tmp_path)
+    analysis._dataset
+
+    # the USA has no GDP per capita in 2008, so no row of 2008 has a GDP per capita wrt USA
+    write_sources(new_release(sources, 2008, ("United States of America",)), str(tmp_path / "new"), file_format="csv")
+    report = analysis.refresh(str(tmp_path / "new"), str(tmp_path / "new"))
+
+    rebuilt = analysis_of(tmp_path, location="new", cache=".rebuilt")._dataset
+
+    assert report == {"added": 0, "changed": 0, "years": []}
+    pd.testing.assert_frame_equal(analysis._dataset, rebuilt)
+
+    # a year with the USA is added
+    write_sources(new_release(sources, 2009), str(tmp_path / "newer"), file_format="csv")
+    report = analysis.refresh(str(tmp_path / "newer"), str(tmp_path / "newer"))
+
+    rebuilt = analysis_of(tmp_path, location="newer", cache=".rebuilt")._dataset
+
+    assert report["years"] == [2009] and report["added"] == rebuilt["Year"].eq(2009).sum()
+    pd.testing.assert_frame_equal(analysis._dataset, rebuilt)
+
+
+def test_refresh_without_changes(sources, tmp_path):
+    write_sources(sources, str(tmp_path / "data"), file_format="csv")
+    analysis = analysis_of(tmp_path)
+    dataset = analysis._dataset
+    version = analysis._dataset_version
+
+    report = analysis.refresh()
+
+    assert report == {"added": 0, "changed": 0, "years": []}
+    assert analysis._dataset is dataset
+    assert analysis._dataset_version == version
+
+
+def test_failed_refresh(sources, tmp_path):
+    write_sources(sources, str(tmp_path / "data"), file_format="csv")
+    analysis = analysis_of(tmp_path)
+    frames = {name: getattr(analysis, name) for name in analysis._cached_frames}
+    fingerprints = analysis._source_fingerprints
+    version = analysis._dataset_version
+
+    # UN Codes without the UN Sub-Regions is imported, but cannot be merged
+    release = new_release(sources, 2008)
+    release["UN Codes.xlsx"] = release["UN Codes.xlsx"].drop(columns="UN Sub-Region")
+    write_sources(release, str(tmp_path / "new"), file_format="csv")
+
+    with pytest.raises(KeyError):
+        analysis.refresh(str(tmp_path / "new"), str(tmp_path / "new"))
+
+    assert all(getattr(analysis, name) is frame for (name, frame) in frames.items())
+    assert analysis._source_fingerprints is fingerprints
+    assert analysis._dataset_version == version
+    assert analysis._default_location == str(tmp_path / "data")
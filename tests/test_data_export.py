@@ -0,0 +1,55 @@
+# File:        test_data_export.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Tests of the selection of the slice of the dataset exported by data_export
+
+import os
+import sys
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from custom_errors import ValueOutOfRange       # noqa: E402
+from data_export import export_frame            # noqa: E402
+
+
+@pytest.fixture
+def dataset():
+    """
+    Function to build a small dataset laid out like the merged dataset, two countries over two years
+    """
+    index = pd.MultiIndex.from_tuples([("Europe", "Western Europe", "France")] * 2 +
+                                      [("Asia", "Southern Asia", "India")] * 2,
+                                      names=["UN Region", "UN Sub-Region", "Country"])
+
+    return pd.DataFrame({"Year": [2005, 2010, 2005, 2010],
+                         "GDP per capita (US dollars)": [34000.0, 40000.0, 700.0, 1300.0],
+                         "Urban population (percent)": [77.0, 78.0, 29.0, 31.0]}, index=index)
+
+
+def test_columns_with_a_year_query(dataset, tmp_path):
+    filename = str(tmp_path / "export.csv")
+
+    report = export_frame(dataset, filename, columns=["GDP per capita (US dollars)"],
+                          query="`UN Region` == \"Europe\" and Year >= 2010")
+    exported = pd.read_csv(filename)
+
+    assert report["rows"] == 1
+    assert list(exported.columns) == ["UN Region", "UN Sub-Region", "Country", "Year", "GDP per capita (US dollars)"]
+    assert exported.loc[0, "Year"] == 2010
+    assert exported.loc[0, "GDP per capita (US dollars)"] == 40000.0
+
+
+def test_columns_keep_the_year(dataset, tmp_path):
+    filename = str(tmp_path / "export.csv")
+
+    export_frame(dataset, filename, columns=["Urban population (percent)"])
+    exported = pd.read_csv(filename)
+
+    assert list(exported["Year"]) == [2005, 2010, 2005, 2010]
+    assert not exported.duplicated(["Country", "Year"]).any()
+
+
+def test_unknown_column(dataset, tmp_path):
+    with pytest.raises(ValueOutOfRange):
+        export_frame(dataset, str(tmp_path / "export.csv"), columns=["Population"])
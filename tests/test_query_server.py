@@ -0,0 +1,64 @@
+# File:        test_query_server.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Tests of the reloads of the dataset by QueryServer
+
+import asyncio
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import data_analysis as da                      # noqa: E402
+from query_server import QueryServer            # noqa: E402
+from synthetic import generate_sources          # noqa: E402
+from synthetic import write_sources             # noqa: E402
+
+
+def test_reload_of_a_bad_release(tmp_path):
+    location = str(tmp_path / "data")
+    sources = generate_sources(countries=8, sub_regions=3, years=3, first_year=2005)
+    write_sources(sources, location, file_format="csv")
+
+    analysis = da.DataAnalysis(location, location, cache_dir=str(tmp_path / ".cache"), interactive=False,
+                               import_workers=1)
+    server = QueryServer(analysis, poll_interval=0)
+    target = "/top?column=GDP%20per%20capita%20(US%20dollars)&n=2"
+
+    async def requests():
+        (_, answer) = await server._answer("GET", target, b"")
+        status = server.status()
+
+        # a reload without any change keeps the dataset, and the cached answers stay valid
+        assert (await server._answer("POST", "/reload", b""))[0] == 200
+        assert server.status()["dataset_version"] == status["dataset_version"]
+
+        # UN Codes without the UN Sub-Regions is imported, but cannot be merged
+        write_sources({"UN Codes.xlsx": sources["UN Codes.xlsx"].drop(columns="UN Sub-Region")}, location,
+                      file_format="csv")
+
+        (code, error) = await server._answer("POST", "/reload", b"")
+
+        assert code == 500 and "UN Sub-Region" in error["error"]
+        assert server.status()["dataset_version"] == status["dataset_version"]
+        assert server.status()["rows"] == status["rows"]
+        assert await server._answer("GET", target, b"") == (200, answer)
+
+        # once the files are fixed, the next reload succeeds
+        write_sources({"UN Codes.xlsx": sources["UN Codes.xlsx"]}, location, file_format="csv")
+        gdp = sources["UNGDPData.csv"].copy()
+        gdp["Value"] = gdp["Value"] * 2
+        write_sources({"UNGDPData.csv": gdp}, location, file_format="csv")
+
+        (code, report) = await server._answer("POST", "/reload", b"")
+
+        assert code == 200 and report["years"] == [2005, 2006, 2007]
+        assert server.status()["dataset_version"] > status["dataset_version"]
+        assert await server._answer("GET", target, b"") != (200, answer)
+
+        return answer
+
+    # the two first countries of every year
+    assert len(json.loads(asyncio.run(requests()))["data"]) == 6
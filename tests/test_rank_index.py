@@ -0,0 +1,89 @@
+# File:        test_rank_index.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Tests of the threshold, top-N and rank queries of RankIndex against plain pandas
+
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rank_index import RankIndex    # noqa: E402
+from rank_index import comparators  # noqa: E402
+
+
+@pytest.fixture
+def dataset():
+    """
+    Function to build a small dataset laid out like the merged dataset once converted into compact
+    dtypes, six countries of two UN Regions over three years, with two countries sharing a value in 2010
+    """
+    countries = [("Africa", "Northern Africa", "Egypt"), ("Africa", "Southern Africa", "South Africa"),
+                 ("Africa", "Western Africa", "Nigeria"), ("Europe", "Northern Europe", "Norway"),
+                 ("Europe", "Western Europe", "France"), ("Europe", "Western Europe", "Germany")]
+    years = [2005, 2010, 2015]
+
+    index = pd.MultiIndex.from_tuples([country for country in countries for _ in years],
+                                      names=["UN Region", "UN Sub-Region", "Country"])
+    values = [[1200.0, 2600.0, 3500.0], [5400.0, 7300.0, 5700.0], [800.0, 2300.0, 2700.0],
+              [66000.0, 87000.0, 74000.0], [34000.0, 40000.0, 36000.0], [34500.0, 40000.0, 41000.0]]
+
+    index = index.set_levels([pd.CategoricalIndex(level) for level in index.levels])
+
+    return pd.DataFrame({"Year": years * len(countries),
+                         "GDP per capita (US dollars)": [value for row in values for value in row]}, index=index)
+
+
+@pytest.mark.parametrize("comparator", comparators)
+def test_select(dataset, comparator):
+    ranking = RankIndex(dataset)
+    column = "GDP per capita (US dollars)"
+
+    selected = ranking.dataset.iloc[ranking.select(column, comparator, 5400.0)]
+    expected = ranking.dataset.query("`" + column + "` " + comparator + " 5400.0")
+
+    pd.testing.assert_frame_equal(selected, expected)
+
+
+def test_select_with_references(dataset):
+    ranking = RankIndex(dataset)
+    column = "GDP per capita (US dollars)"
+    references = {2005: 34000.0, 2010: 40000.0}
+
+    selected = ranking.dataset.iloc[ranking.select(column, ">=", 1.0, references)]
+    expected = ranking.dataset[ranking.dataset[column] >= ranking.dataset["Year"].map(references)]
+
+    pd.testing.assert_frame_equal(selected, expected)
+
+
+@pytest.mark.parametrize("level", [None, "UN Region"])
+@pytest.mark.parametrize("ascending", [False, True])
+def test_top(dataset, level, ascending):
+    ranking = RankIndex(dataset)
+    column = "GDP per capita (US dollars)"
+    groups = ["Year"] + ([level] if level is not None else [])
+
+    (positions, ranks) = ranking.top(column, 2, level, ascending)
+    top = ranking.dataset.iloc[positions].reset_index()
+
+    rows = ranking.dataset.reset_index()
+    rows["Rank"] = rows.groupby(groups, observed=True)[column].rank(method="min", ascending=ascending).astype("int64")
+    expected = rows.sort_values(groups + [column], ascending=[True] * len(groups) + [ascending], kind="stable")
+    expected = expected.groupby(groups, observed=True).head(2)
+
+    # the rows sharing a value may come in any order, so every row is checked against its own rank
+    assert list(top[groups].itertuples(index=False)) == list(expected[groups].itertuples(index=False))
+    assert list(ranks) == list(expected["Rank"])
+    assert list(ranks) == list(top.merge(rows, on=["Year", "Country"])["Rank"])
+
+
+@pytest.mark.parametrize("ascending", [False, True])
+def test_ranks(dataset, ascending):
+    ranking = RankIndex(dataset)
+    column = "GDP per capita (US dollars)"
+
+    expected = ranking.dataset.groupby("Year")[column].rank(method="min", ascending=ascending)
+
+    assert np.array_equal(ranking.ranks(column, ascending), expected.to_numpy())
@@ -0,0 +1,113 @@
+# File:        time_series.py
+# Authors:     Bhavyai Gupta, Brandon Attai
+# Description: Functions calculating the growth of every country over the years, on the sorted rows of the dataset
+
+import numpy as np
+import pandas as pd
+
+
+def country_rows(dataset):
+    """
+    Function to get the rows of the dataset sorted on the index and the year, along with the first
+    row of the country of every row. The dataset is built sorted that way, so it is only sorted
+    here if it has been reordered since
+
+        Parameters:
+            dataset (dataframe): rows indexed on UN Region, UN Sub-Region and Country, with "Year"
+
+        Returns:
+            tuple: the sorted dataset, and the position of the first row of the country of every row
+    """
+    countries = dataset.index.codes[2]
+    years = dataset["Year"].to_numpy()
+    starts = np.r_[True, countries[1:] != countries[:-1]]
+
+    # within a country the years must be increasing, apart from the first row
+    if not dataset.index.is_monotonic_increasing or (np.diff(years) <= 0)[~starts[1:]].any():
+        dataset = dataset.set_index("Year", append=True).sort_index().reset_index("Year")
+        countries = dataset.index.codes[2]
+        starts = np.r_[True, countries[1:] != countries[:-1]]
+
+    positions = np.arange(len(dataset))
+
+    return (dataset, np.maximum.accumulate(np.where(starts, positions, 0)))
+
+
+def growth_over_years(dataset, columns, window=3):
+    """
+    Function to calculate the time series of data columns for all the countries at once. Every
+    row is compared with the previous year of data of the same country, which may be several
+    years earlier, so the change and the growth are per year over that gap. The rolling mean is
+    the mean of the row and of the previous rows of the country, up to window rows
+
+        Parameters:
+            dataset (dataframe): rows indexed on UN Region, UN Sub-Region and Country, with "Year"
+            columns (list): numeric data columns of the dataset
+            window (int): largest number of rows of a country in the rolling mean
+
+        Returns:
+            dataframe: rows indexed on UN Region, UN Sub-Region, Country and Year, with the data
+                       column and the metric as columns. The first year of a country has no change
+    """
+    (dataset, first_rows) = country_rows(dataset)
+
+    positions = np.arange(len(dataset))
+    years = dataset["Year"].to_numpy().astype("float64")
+    has_previous = positions > first_rows
+    previous = np.maximum(positions - 1, 0)
+    gaps = np.where(has_previous, years - years[previous], np.nan)
+
+    metrics = {}
+
+    for column in columns:
+        values = dataset[column].to_numpy().astype("float64")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            metrics[(column, "change per year")] = (values - values[previous]) / gaps
+            metrics[(column, "growth (percent per year)")] = np.where(
+                has_previous, (np.power(values / values[previous], 1 / gaps) - 1) * 100, np.nan)
+
+        # the rows of a country are next to each other, so the window is made of shifted rows
+        total = np.zeros(len(values))
+        count = np.zeros(len(values))
+
+        for shift in range(window):
+            in_window = positions - shift >= first_rows
+            total += np.where(in_window, values[np.maximum(positions - shift, 0)], 0)
+            count += in_window
+
+        metrics[(column, "rolling mean")] = total / count
+
+    return pd.DataFrame(metrics, index=dataset.set_index("Year", append=True).index).rename_axis(
+        columns=["Data column", "Metric"])
+
+
+def compound_growth(dataset, columns):
+    """
+    Function to calculate the compound annual growth rate of data columns for all the countries
+    at once, from the first to the last year of data of every country
+
+        Parameters:
+            dataset (dataframe): rows indexed on UN Region, UN Sub-Region and Country, with "Year"
+            columns (list): numeric data columns of the dataset
+
+        Returns:
+            dataframe: one row per country, with the first and last year, and the growth of every
+                       data column in percent per year. Countries with one year of data have no growth
+    """
+    (dataset, first_rows) = country_rows(dataset)
+
+    firsts = np.flatnonzero(first_rows == np.arange(len(dataset)))
+    lasts = np.r_[firsts[1:] - 1, len(dataset) - 1].astype("int64")
+    years = dataset["Year"].to_numpy()
+
+    growth = {"First year": years[firsts], "Last year": years[lasts]}
+    spans = (years[lasts] - years[firsts]).astype("float64")
+
+    for column in columns:
+        values = dataset[column].to_numpy().astype("float64")
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            growth[column] = np.where(spans > 0, (np.power(values[lasts] / values[firsts], 1 / spans) - 1) * 100, np.nan)
+
+    return pd.DataFrame(growth, index=dataset.index[firsts])